@@ -1,23 +1,90 @@
+import os
 import time
+import asyncio
+import json
+import gzip
+import base64
+import hashlib
 import random
 import logging
+import queue
+import atexit
+import threading
+import functools
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime, timedelta
 import sys
 import pytz
 import re
 import math
+import socket
+import sqlite3
+import struct
+import statistics
+import shutil
+import subprocess
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from collections import namedtuple, deque
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from urllib.request import urlopen
 
 
 # --- Set up logging ---
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s.%(msecs)03d - %(levelname)s - %(filename)s:%(lineno)d - %(message)s', # Added milliseconds
-    datefmt='%Y-%m-%d %H:%M:%S',
-    handlers=[
+# Hand records to a background listener thread, so formatting and file/console I/O can never
+# stall the hot loops (set False for plain synchronous logging).
+NON_BLOCKING_LOGGING = True
+LOG_FORMAT = '%(asctime)s.%(msecs)03d - %(levelname)s - %(filename)s:%(lineno)d - %(message)s' # Added milliseconds
+LOG_DATEFMT = '%Y-%m-%d %H:%M:%S'
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread (stock prepare() formats eagerly).
+
+    Only records whose args are immutable primitives are deferred; anything else (drivers, dicts,
+    preference objects, ...) could change before the listener runs, so it is rendered here.
+    """
+
+    DEFERRABLE_ARG_TYPES = (str, int, float, bool, type(None))
+
+    def prepare(self, record):
+        args = record.args
+        if args:
+            values = args.values() if isinstance(args, dict) else args
+            if not all(isinstance(value, self.DEFERRABLE_ARG_TYPES) for value in values):
+                record.msg = record.getMessage()
+                record.args = None
+        return record
+
+
+def setup_logging(non_blocking=NON_BLOCKING_LOGGING):
+    """Configures the root logger; returns (queue, listener) in non-blocking mode, else (None, None)."""
+    handlers = [
         logging.FileHandler("ticket_bot.log", encoding='utf-8'),
         logging.StreamHandler()
     ]
-)
+    if not non_blocking:
+        logging.basicConfig(level=logging.INFO, format=LOG_FORMAT, datefmt=LOG_DATEFMT, handlers=handlers)
+        return None, None
+    formatter = logging.Formatter(LOG_FORMAT, datefmt=LOG_DATEFMT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    log_queue = queue.Queue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop) # Drains the queue on exit
+    logging.basicConfig(level=logging.INFO, handlers=[_DeferredQueueHandler(log_queue)])
+    return log_queue, listener
+
+
+def flush_logs():
+    """Blocks until the listener has written every queued record (call before input() prompts)."""
+    if LOG_QUEUE is not None:
+        LOG_QUEUE.join()
+
+
+LOG_QUEUE, LOG_LISTENER = setup_logging()
 logging.Formatter.converter = time.gmtime # Use UTC in logs for consistency
 
 # --- Use undetected_chromedriver if available ---
@@ -33,6 +100,13 @@ except ImportError:
     from webdriver_manager.chrome import ChromeDriverManager
     USE_UNDETECTED = False
 
+# --- Direct DevTools websocket (optional, websocket-client ships with selenium) ---
+try:
+    import websocket
+    HAS_WEBSOCKET_CLIENT = True
+except ImportError:
+    HAS_WEBSOCKET_CLIENT = False
+
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
@@ -43,6 +117,7 @@ from selenium.common.exceptions import (
     WebDriverException,
     ElementClickInterceptedException,
     ElementNotInteractableException,
+    JavascriptException,
     StaleElementReferenceException # Added for handling
 )
 
@@ -57,29 +132,1113 @@ def js_reload(driver):
         logging.error(f"JavaScript reload failed: {e}")
         return False
 
-def precise_wait_until(target_datetime):
-    """Wait until the target datetime using high-precision timing."""
-    # Get the timezone from the target datetime
-    target_tz = target_datetime.tzinfo
-    if target_tz is None:
-        # Fallback or error if target_datetime is unexpectedly naive
-        # This shouldn't happen based on current script logic, but good practice
+class DeadlineWaiter:
+    """Low-jitter waits on the monotonic perf_counter_ns clock.
+
+    The aware target datetime is converted to a perf_counter_ns deadline ONCE; the wait is a
+    coarse time.sleep() up to `spin_threshold` before the deadline followed by a short busy spin.
+    The achieved overshoot of every wait is recorded per label for the jitter histogram.
+    """
+
+    HISTOGRAM_BUCKETS_US = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self, spin_threshold=0.002):
+        self.spin_threshold_ns = int(spin_threshold * 1e9)
+        self.overshoots_ns = {} # label -> [overshoot_ns, ...]
+
+    @staticmethod
+    def deadline_ns(target_datetime, clock_offset=0.0):
+        """Converts an aware datetime (on the reference clock) into a perf_counter_ns deadline."""
+        # Bracket the wall-clock read with two monotonic reads to pin down when it was taken
+        before_ns = time.perf_counter_ns()
+        now_wall = time.time()
+        after_ns = time.perf_counter_ns()
+        remaining = target_datetime.timestamp() - (now_wall + clock_offset)
+        return (before_ns + after_ns) // 2 + int(remaining * 1e9)
+
+    def wait_until_ns(self, deadline_ns, label="wait"):
+        """Blocks until perf_counter_ns() >= deadline_ns and returns the overshoot in ns."""
+        spin_from = deadline_ns - self.spin_threshold_ns
+        while True:
+            now_ns = time.perf_counter_ns()
+            if now_ns >= spin_from:
+                break
+            time.sleep((spin_from - now_ns) / 1e9) # Coarse: may wake late by OS granularity, loop re-checks
+        while time.perf_counter_ns() < deadline_ns:
+            pass # Final spin (<= spin_threshold)
+        overshoot_ns = time.perf_counter_ns() - deadline_ns
+        self.overshoots_ns.setdefault(label, []).append(overshoot_ns)
+        return overshoot_ns
+
+    def wait_until(self, target_datetime, clock_offset=0.0, label="wait"):
+        """Waits until the aware `target_datetime` (reference clock) and returns the overshoot in ns."""
+        return self.wait_until_ns(self.deadline_ns(target_datetime, clock_offset), label)
+
+    def sleep(self, seconds, label="sleep"):
+        """Relative low-jitter sleep, same mechanics as wait_until_ns."""
+        return self.wait_until_ns(time.perf_counter_ns() + int(seconds * 1e9), label)
+
+    def histogram(self, label=None):
+        """Returns [(bucket_upper_us or None for overflow, count), ...] for one label or all waits."""
+        if label is None:
+            values = [v for samples in self.overshoots_ns.values() for v in samples]
+        else:
+            values = self.overshoots_ns.get(label, [])
+        counts = [0] * (len(self.HISTOGRAM_BUCKETS_US) + 1)
+        for value in values:
+            value_us = value / 1000.0
+            for index, upper in enumerate(self.HISTOGRAM_BUCKETS_US):
+                if value_us <= upper:
+                    counts[index] += 1
+                    break
+            else:
+                counts[-1] += 1
+        return list(zip(list(self.HISTOGRAM_BUCKETS_US) + [None], counts))
+
+    def log_summary(self):
+        """Logs per-label overshoot statistics and the overall jitter histogram."""
+        if not self.overshoots_ns:
+            return
+        for label, samples in self.overshoots_ns.items():
+            ordered = sorted(samples)
+            logging.info(f"Wake-up jitter [{label}]: n={len(ordered)} "
+                         f"median={ordered[len(ordered) // 2] / 1000:.1f}us max={ordered[-1] / 1000:.1f}us")
+        logging.info(f"Wake-up jitter histogram: {self.format_histogram()}")
+
+    def format_histogram(self, label=None):
+        """'<=10us: n, <=25us: m, ...' (non-empty buckets) of histogram(label)."""
+        return ", ".join(f"{'<=' + str(upper) + 'us' if upper else '>' + str(self.HISTOGRAM_BUCKETS_US[-1]) + 'us'}: {count}"
+                         for upper, count in self.histogram(label) if count)
+
+
+class PeriodicScheduler:
+    """Ticks on absolute deadlines start + k * interval (no drift from the work done per tick).
+
+    A tick that is already due fires immediately; ticks missed entirely while work was running
+    are skipped instead of being fired back-to-back, so the tick count stays bounded.
+    """
+
+    def __init__(self, start_ns, interval, end_ns=None, waiter=None, label="tick"):
+        self.start_ns = start_ns
+        self.interval_ns = int(interval * 1e9)
+        self.end_ns = end_ns
+        self.waiter = waiter or DEADLINE_WAITER
+        self.label = label
+        self.next_index = 0
+        self.skipped = 0
+        self.ticks = [] # (index, planned_ns, actual_ns)
+
+    @property
+    def max_ticks(self):
+        """Upper bound of ticks in the window (None if the schedule is open-ended)."""
+        if self.end_ns is None:
+            return None
+        return max(0, math.ceil((self.end_ns - self.start_ns) / self.interval_ns))
+
+    def wait_next(self):
+        """Waits for the next tick; returns its index, or None once the window is over."""
+        index = self.next_index
+        now_ns = time.perf_counter_ns()
+        due_index = (now_ns - self.start_ns) // self.interval_ns
+        if due_index > index: # Overran one or more whole intervals: drop those ticks
+            self.skipped += due_index - index
+            index = due_index
+        planned_ns = self.start_ns + index * self.interval_ns
+        if self.end_ns is not None and planned_ns >= self.end_ns:
+            return None
+        if planned_ns > now_ns:
+            self.waiter.wait_until_ns(planned_ns, self.label)
+        self.ticks.append((index, planned_ns, time.perf_counter_ns()))
+        self.next_index = index + 1
+        return index
+
+    def summary(self):
+        """One-line planned-vs-actual report."""
+        if not self.ticks:
+            return f"{self.label}: no ticks"
+        late_ms = sorted((actual - planned) / 1e6 for _, planned, actual in self.ticks)
+        return (f"{self.label}: {len(self.ticks)} ticks (max {self.max_ticks}), {self.skipped} skipped, "
+                f"interval {self.interval_ns / 1e6:.0f}ms, lateness median {late_ms[len(late_ms) // 2]:.2f}ms "
+                f"max {late_ms[-1]:.2f}ms")
+
+
+def precise_wait_until(target_datetime, clock_offset=0.0, label="wait"):
+    """Wait until the target datetime using high-precision timing.
+
+    `clock_offset` is (reference clock - local clock) in seconds, as estimated by ClockSync,
+    so the wait ends when the *reference* clock reaches the target.
+    """
+    if target_datetime.tzinfo is None:
+        # This shouldn't happen based on current script logic
         logging.error("precise_wait_until called with a naive datetime!")
-        # Option 1: Assume local time (less accurate)
-        # target_tz = datetime.now().astimezone().tzinfo
-        # Option 2: Raise an error or return early
         return # Or raise TypeError("Target datetime must be timezone-aware")
+    DEADLINE_WAITER.wait_until(target_datetime, clock_offset, label)
+
+
+# --- Clock Synchronisation ---
+
+NTP_EPOCH_DELTA = 2208988800 # Seconds between 1900-01-01 (NTP era 0) and 1970-01-01
+
+# One measurement against the reference clock: offset = reference - local (seconds),
+# rtt = round trip (seconds), error = max distance of the true offset from `offset`.
+ClockSample = namedtuple("ClockSample", ["offset", "rtt", "error"])
+ClockEstimate = namedtuple("ClockEstimate", ["offset", "uncertainty", "min_rtt", "samples_used", "samples_total", "source"])
+
+
+def ntp_clock_source(server, port=123, timeout=1.0):
+    """Returns a sampler that queries an NTP server with a single SNTP (v4, client mode) packet."""
+    def sample():
+        packet = b"\x23" + 47 * b"\0" # LI=0, VN=4, Mode=3
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.settimeout(timeout)
+            t0 = time.time()
+            sock.sendto(packet, (server, port))
+            data, _ = sock.recvfrom(512)
+            t3 = time.time()
+        if len(data) < 48:
+            raise ValueError(f"Short NTP reply ({len(data)} bytes)")
+        recv_sec, recv_frac, tx_sec, tx_frac = struct.unpack("!4I", data[32:48])
+        t1 = recv_sec - NTP_EPOCH_DELTA + recv_frac / 2**32
+        t2 = tx_sec - NTP_EPOCH_DELTA + tx_frac / 2**32
+        offset = ((t1 - t0) + (t2 - t3)) / 2.0
+        rtt = (t3 - t0) - (t2 - t1)
+        return ClockSample(offset, rtt, rtt / 2.0)
+    sample.description = f"ntp://{server}:{port}"
+    sample.spacing = 0.05
+    return sample
+
+
+def http_date_clock_source(url, timeout=2.0):
+    """Returns a sampler that reads the HTTP `Date` header of `url` over one kept-alive connection.
+
+    `Date` only has 1s resolution: the reference time lies in [Date, Date + 1), so each sample
+    carries an error of 0.5s + rtt/2. ClockSync narrows this by intersecting samples taken at
+    different sub-second phases.
+    """
+    parsed = urlparse(url)
+    connection_cls = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+    path = parsed.path or "/"
+    state = {"conn": None}
+
+    def sample():
+        if state["conn"] is None:
+            state["conn"] = connection_cls(parsed.netloc, timeout=timeout)
+            state["conn"].request("HEAD", path) # Warm-up: TCP/TLS handshake outside the measurement
+            state["conn"].getresponse().read()
+        conn = state["conn"]
+        try:
+            t0 = time.time()
+            conn.request("HEAD", path)
+            response = conn.getresponse()
+            t3 = time.time()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            state["conn"] = None
+            raise
+        date_header = response.getheader("Date")
+        if not date_header:
+            raise ValueError(f"No Date header from {url}")
+        reference = parsedate_to_datetime(date_header).timestamp() + 0.5 # Middle of the 1s bucket
+        rtt = t3 - t0
+        offset = reference - (t0 + t3) / 2.0
+        return ClockSample(offset, rtt, 0.5 + rtt / 2.0)
+    sample.description = f"http-date:{url}"
+    sample.spacing = None # Spread the samples over one second (different sub-second phases)
+    return sample
+
+
+class ClockSync:
+    """Estimates the offset between the local clock and a reference clock from repeated samples."""
+
+    def __init__(self, source, samples=8):
+        self.source = source # Callable returning a ClockSample (see *_clock_source helpers)
+        self.samples = samples
+        # Pause between samples; None spreads them evenly over one second (1s-resolution sources)
+        spacing = getattr(source, "spacing", 0.0)
+        self.spacing = 1.0 / samples + 0.013 if spacing is None else spacing
+        self.history = []
+
+    def collect(self):
+        """Takes `self.samples` measurements, skipping failed ones."""
+        collected = []
+        for i in range(self.samples):
+            try:
+                collected.append(self.source())
+            except Exception as e:
+                logging.debug(f"Clock sample {i + 1}/{self.samples} failed: {e}")
+            if self.spacing and i < self.samples - 1:
+                time.sleep(self.spacing)
+        self.history.extend(collected)
+        return collected
+
+    @staticmethod
+    def filter_outliers(samples):
+        """Keeps the samples whose round trip is close to the best one (queueing delay -> outlier)."""
+        if len(samples) < 3:
+            return list(samples)
+        rtts = sorted(s.rtt for s in samples)
+        limit = max(rtts[0] * 2.0, rtts[0] + 0.002, statistics.median(rtts))
+        kept = [s for s in samples if s.rtt <= limit]
+        # Second pass: drop offsets far away from the median of the survivors
+        median_offset = statistics.median(s.offset for s in kept)
+        spread = statistics.median(abs(s.offset - median_offset) for s in kept)
+        tolerance = max(3.0 * spread, min(s.error for s in kept))
+        return [s for s in kept if abs(s.offset - median_offset) <= tolerance] or kept
+
+    def estimate(self):
+        """Returns a ClockEstimate (or None if no sample succeeded)."""
+        samples = self.collect()
+        if not samples:
+            return None
+        kept = self.filter_outliers(samples)
+        # Each sample bounds the true offset to [offset - error, offset + error]; intersect them
+        low = max(s.offset - s.error for s in kept)
+        high = min(s.offset + s.error for s in kept)
+        if low <= high:
+            offset, uncertainty = (low + high) / 2.0, (high - low) / 2.0
+        else: # Inconsistent bounds (e.g. reference clock stepped) -> fall back to median
+            offset = statistics.median(s.offset for s in kept)
+            uncertainty = max(abs(s.offset - offset) for s in kept) + min(s.error for s in kept)
+        return ClockEstimate(offset, uncertainty, min(s.rtt for s in kept), len(kept), len(samples),
+                             getattr(self.source, "description", repr(self.source)))
+
+
+# --- Phase Tracing ---
+
+class _Span:
+    """One timed region; attributes can be added while it is open via set()."""
+    __slots__ = ("tracer", "name", "attrs", "start_ns")
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.start_ns = 0
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end_ns = time.perf_counter_ns()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.tracer.record(self.name, self.start_ns, end_ns, self.attrs)
+        return False
+
 
-    while True:
-        # Get the current time *in the target's timezone*
-        now_aware = datetime.now(target_tz)
+class _NullSpan:
+    """Shared no-op span used while tracing is disabled."""
+    __slots__ = ()
 
-        wait_seconds = (target_datetime - now_aware).total_seconds()
-        if wait_seconds <= 0:
-            break
-        # Sleep granularity depends on OS, but aim for small sleeps
-        sleep_duration = max(0.001, min(0.01, wait_seconds / 2.0)) # Adaptive sleep
-        time.sleep(sleep_duration)
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Collects perf_counter_ns spans and exports them as JSONL and Chrome trace (about:tracing) files."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.spans = [] # dicts: name, start_ns, end_ns, tid, attrs
+        self._lock = threading.Lock()
+        self.origin_ns = time.perf_counter_ns()
+        self.origin_epoch = time.time()
+
+    def span(self, name, **attrs):
+        """Context manager timing a region: `with TRACER.span("step", key=value) as span: ...`."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, attrs)
+
+    def record(self, name, start_ns, end_ns, attrs=None):
+        entry = {"name": name, "start_ns": start_ns, "end_ns": end_ns, "tid": threading.get_ident(), "attrs": attrs or {}}
+        with self._lock:
+            self.spans.append(entry)
+
+    def traced(self, name):
+        """Decorator form of span() for whole methods."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def instrument_driver(self, driver):
+        """Wraps driver.execute so every WebDriver command (driver AND element calls) becomes a span."""
+        if driver is None or getattr(driver, "_cft_traced", False):
+            return
+        original_execute = driver.execute
+
+        def execute(driver_command, params=None):
+            if not self.enabled:
+                return original_execute(driver_command, params)
+            with self.span(f"webdriver:{driver_command}"):
+                return original_execute(driver_command, params)
+        driver.execute = execute
+        driver._cft_traced = True
+
+    def _epoch(self, perf_ns):
+        return self.origin_epoch + (perf_ns - self.origin_ns) / 1e9
+
+    def export_jsonl(self, path):
+        with self._lock:
+            spans = list(self.spans)
+        with open(path, "w", encoding="utf-8") as fh:
+            for span in spans:
+                fh.write(json.dumps({
+                    "name": span["name"],
+                    "start_epoch": round(self._epoch(span["start_ns"]), 6),
+                    "start_ns": span["start_ns"],
+                    "end_ns": span["end_ns"],
+                    "duration_ms": (span["end_ns"] - span["start_ns"]) / 1e6,
+                    "tid": span["tid"],
+                    "attrs": span["attrs"],
+                }, default=str) + "\n")
+
+    def export_chrome_trace(self, path):
+        with self._lock:
+            spans = list(self.spans)
+        pid = os.getpid()
+        events = [{
+            "name": span["name"],
+            "cat": span["name"].split(":", 1)[0].split(".", 1)[0],
+            "ph": "X",
+            "ts": (span["start_ns"] - self.origin_ns) / 1000.0,
+            "dur": (span["end_ns"] - span["start_ns"]) / 1000.0,
+            "pid": pid,
+            "tid": span["tid"],
+            "args": span["attrs"],
+        } for span in spans]
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms",
+                       "otherData": {"origin_epoch": self.origin_epoch}}, fh, default=str)
+
+    def export(self, jsonl_path=None, chrome_path=None):
+        """Writes both export formats (configured paths by default) if anything was traced."""
+        if not self.enabled or not self.spans:
+            return
+        jsonl_path = jsonl_path or TRACE_JSONL_FILE
+        chrome_path = chrome_path or TRACE_CHROME_FILE
+        try:
+            self.export_jsonl(jsonl_path)
+            self.export_chrome_trace(chrome_path)
+            logging.info(f"Trace written: {len(self.spans)} spans -> {jsonl_path}, {chrome_path} (open in chrome://tracing)")
+        except OSError as e:
+            logging.error(f"Could not write trace files: {e}")
+
+
+# --- Direct DevTools (CDP) Transport ---
+
+class CdpError(Exception):
+    """A CDP command failed (protocol error, JS exception, navigation destroyed the context, ...)."""
+
+
+class CdpConnectionError(CdpError):
+    """The DevTools websocket itself is broken or unresponsive; callers should fall back to WebDriver."""
+
+
+class CdpTimeoutError(CdpConnectionError):
+    """No message arrived in time (a command reply, or an awaited event)."""
+
+
+class CdpTransport:
+    """Persistent DevTools websocket to the page target, bypassing the chromedriver HTTP hop.
+
+    Commands are synchronous (send, then read until the matching id arrives); events seen
+    meanwhile are buffered so wait_event() can consume them.
+    """
+
+    def __init__(self, ws_url, timeout=5.0):
+        self.ws_url = ws_url
+        self.timeout = timeout
+        self.ws = None
+        self._next_id = 0
+        self.events = deque(maxlen=500)
+
+    @classmethod
+    def from_driver(cls, driver, timeout=5.0):
+        """Finds the websocket of the driver's current tab via Chrome's debuggerAddress."""
+        address = (driver.capabilities.get("goog:chromeOptions") or {}).get("debuggerAddress")
+        if not address:
+            raise CdpError("Driver capabilities expose no goog:chromeOptions.debuggerAddress")
+        with urlopen(f"http://{address}/json/list", timeout=timeout) as response:
+            targets = json.load(response)
+        pages = [t for t in targets if t.get("type") == "page" and t.get("webSocketDebuggerUrl")]
+        if not pages:
+            raise CdpError(f"No page target found at {address}")
+        handle = driver.current_window_handle # chromedriver window handles are DevTools target ids
+        target = next((t for t in pages if t.get("id") == handle), pages[0])
+        return cls(target["webSocketDebuggerUrl"], timeout=timeout)
+
+    def connect(self, page_events=True):
+        self.ws = websocket.create_connection(self.ws_url, timeout=self.timeout, suppress_origin=True)
+        self.ws.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if page_events:
+            self.send("Page.enable") # Lifecycle events for reload()
+        return self
+
+    def close(self):
+        if self.ws is not None:
+            try:
+                self.ws.close()
+            finally:
+                self.ws = None
+
+    def _recv(self, deadline):
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            raise CdpTimeoutError("Timed out waiting for DevTools message")
+        self.ws.settimeout(remaining)
+        try:
+            return json.loads(self.ws.recv())
+        except websocket.WebSocketTimeoutException:
+            raise CdpTimeoutError("Timed out waiting for DevTools message") from None
+        except (websocket.WebSocketException, OSError) as e:
+            raise CdpConnectionError(f"DevTools connection error: {e}") from e
+
+    def send(self, method, params=None, timeout=None):
+        """Sends one command and returns its `result` dict."""
+        if self.ws is None:
+            raise CdpConnectionError("CDP transport is not connected")
+        self._next_id += 1
+        message_id = self._next_id
+        try:
+            self.ws.send(json.dumps({"id": message_id, "method": method, "params": params or {}}))
+        except (websocket.WebSocketException, OSError) as e:
+            raise CdpConnectionError(f"DevTools connection error: {e}") from e
+        deadline = time.perf_counter() + (timeout or self.timeout)
+        while True:
+            message = self._recv(deadline)
+            if message.get("id") == message_id:
+                if "error" in message:
+                    raise CdpError(f"{method}: {message['error'].get('message')}")
+                return message.get("result", {})
+            if "method" in message:
+                self.events.append(message)
+
+    def next_event(self, timeout=None):
+        """Returns the next event message of any kind (buffered ones first)."""
+        if self.events:
+            return self.events.popleft()
+        deadline = time.perf_counter() + (timeout or self.timeout)
+        while True:
+            message = self._recv(deadline)
+            if "method" in message:
+                return message
+
+    def wait_event(self, method, timeout=None):
+        """Returns the params of the next `method` event (buffered ones first)."""
+        for index, event in enumerate(self.events):
+            if event["method"] == method:
+                del self.events[index]
+                return event.get("params", {})
+        deadline = time.perf_counter() + (timeout or self.timeout)
+        while True:
+            message = self._recv(deadline)
+            if message.get("method") == method:
+                return message.get("params", {})
+            if "method" in message:
+                self.events.append(message)
+
+    def evaluate(self, expression, await_promise=False, timeout=None):
+        """Runtime.evaluate returning the JSON value of the expression."""
+        result = self.send("Runtime.evaluate", {
+            "expression": expression, "returnByValue": True, "awaitPromise": await_promise,
+        }, timeout=timeout)
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            description = (details.get("exception") or {}).get("description") or details.get("text")
+            raise CdpError(f"JS exception: {description}")
+        return (result.get("result") or {}).get("value")
+
+    def run_script(self, script, *args, timeout=None):
+        """execute_script equivalent: `script` is a function body reading `arguments` (JSON args only)."""
+        return self.evaluate(f"(function(){{{script}\n}}).apply(null, {json.dumps(list(args))})", timeout=timeout)
+
+    def run_async_script(self, script, *args, timeout=None):
+        """execute_async_script equivalent: the callback is appended as the last argument."""
+        expression = (f"new Promise(function (__cftResolve) {{ (function(){{{script}\n}})"
+                      f".apply(null, {json.dumps(list(args))}.concat([__cftResolve])); }})")
+        return self.evaluate(expression, await_promise=True, timeout=timeout)
+
+    def reload(self, ignore_cache=True, wait_event="Page.domContentEventFired", timeout=None):
+        """Page.reload; optionally blocks until `wait_event` of the new document (None = fire and forget).
+
+        Returns False if `wait_event` did not fire within `timeout`, True otherwise.
+        """
+        self.send("Page.reload", {"ignoreCache": ignore_cache}, timeout=timeout)
+        # Everything read up to the reload ack belongs to earlier documents (e.g. WebDriver reloads)
+        self.events.clear()
+        if wait_event:
+            try:
+                self.wait_event(wait_event, timeout=timeout)
+            except CdpTimeoutError:
+                return False
+        return True
+
+    def query_selector_exists(self, selector, timeout=None):
+        return bool(self.evaluate(f"!!document.querySelector({json.dumps(selector)})", timeout=timeout))
+
+
+# --- Driver Binary Cache ---
+# Remembers the resolved (and, for undetected-chromedriver, patched) chromedriver between runs so a
+# restart does not download/patch anything. Entries are validated offline by running `--version`.
+
+def load_driver_cache(path):
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def cached_driver_path(kind, cache_file):
+    """Path of the cached `kind` ("uc"/"standard") driver if it still exists and runs, else None."""
+    entry = load_driver_cache(cache_file).get(kind)
+    if not entry:
+        return None
+    path = entry.get("path")
+    if not path or not os.path.isfile(path) or not os.access(path, os.X_OK):
+        logging.info(f"Cached {kind} chromedriver {path!r} is gone. Resolving again.")
+        return None
+    try:
+        output = subprocess.run([path, "--version"], capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError) as e:
+        logging.warning(f"Cached {kind} chromedriver {path!r} does not run ({e}). Resolving again.")
+        return None
+    logging.info(f"Using cached {kind} chromedriver: {output or path}")
+    return path
+
+
+def store_driver_path(kind, path, cache_file, cache_dir=None):
+    """Records `path` for `kind`. With cache_dir the binary is copied there first (uc deletes its own copy on quit).
+
+    Returns the cached path, or None if the copy or the cache file could not be written (the run goes on uncached).
+    """
+    try:
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            target = os.path.join(cache_dir, os.path.basename(path))
+            if os.path.abspath(target) != os.path.abspath(path):
+                shutil.copy2(path, target)
+            path = target
+        cache = load_driver_cache(cache_file)
+        cache[kind] = {"path": os.path.abspath(path), "stored_at": datetime.now().isoformat(timespec="seconds")}
+        with open(cache_file, "w", encoding="utf-8") as fh:
+            json.dump(cache, fh, indent=2)
+    except OSError as e:
+        logging.warning(f"Could not cache the {kind} chromedriver ({e}). Continuing without the driver cache.")
+        return None
+    logging.info(f"Cached {kind} chromedriver at {path}.")
+    return path
+
+
+def forget_driver_path(kind, cache_file):
+    cache = load_driver_cache(cache_file)
+    if cache.pop(kind, None) is not None:
+        try:
+            with open(cache_file, "w", encoding="utf-8") as fh:
+                json.dump(cache, fh, indent=2)
+        except OSError as e:
+            logging.warning(f"Could not update the driver cache {cache_file} ({e}).")
+
+
+# --- Network Policy ---
+
+class NetworkPolicy:
+    """URL block list with allow exceptions ('*' wildcards matched against the whole URL, allow wins)."""
+
+    def __init__(self, block_patterns, allow_patterns=()):
+        self.block_patterns = list(block_patterns)
+        self.allow_patterns = list(allow_patterns)
+        self._block = self._compile(self.block_patterns)
+        self._allow = self._compile(self.allow_patterns)
+
+    @staticmethod
+    def _compile(patterns):
+        if not patterns:
+            return None
+        return re.compile("|".join("(?:" + ".*".join(map(re.escape, p.split("*"))) + ")" for p in patterns), re.DOTALL)
+
+    def blocks(self, url):
+        if self._block is None or not self._block.fullmatch(url):
+            return False
+        return self._allow is None or not self._allow.fullmatch(url)
+
+
+class NetworkInterceptor:
+    """Enforces a NetworkPolicy with allow exceptions through the Fetch domain.
+
+    Chrome's Network.setBlockedURLs has no exceptions, so requests matching a block pattern are
+    paused instead and answered from a daemon thread on its own DevTools connection: continued if
+    an allow pattern matches, failed as BlockedByClient otherwise. Other requests are never paused.
+    """
+
+    def __init__(self, transport, policy):
+        self.transport = transport
+        self.policy = policy
+        self.active = True # False: continue every paused request (unblocked baseline load)
+        self.blocked = 0
+        self.allowed = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.transport.connect(page_events=False)
+        self.transport.send("Fetch.enable", {"patterns": [{"urlPattern": pattern, "requestStage": "Request"}
+                                                          for pattern in self.policy.block_patterns]})
+        self._thread = threading.Thread(target=self._run, name="network-policy", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                event = self.transport.next_event(timeout=0.25)
+                if event["method"] != "Fetch.requestPaused":
+                    continue
+                request_id = event["params"]["requestId"]
+                if self.active and self.policy.blocks(event["params"]["request"]["url"]):
+                    self.transport.send("Fetch.failRequest", {"requestId": request_id, "errorReason": "BlockedByClient"})
+                    self.blocked += 1
+                else:
+                    self.transport.send("Fetch.continueRequest", {"requestId": request_id})
+                    if self.active:
+                        self.allowed += 1
+            except CdpTimeoutError:
+                continue
+            except CdpConnectionError as e:
+                if not self._stop.is_set():
+                    logging.warning("Network policy interceptor lost its DevTools connection: %s", e)
+                return
+            except CdpError as e:
+                logging.debug("Network policy: %s", e) # Request already gone (navigation, abort)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        try:
+            self.transport.send("Fetch.disable", timeout=1.0)
+        except CdpError:
+            pass
+        self.transport.close()
+
+
+# --- Failure Artifacts ---
+
+class ArtifactRecorder:
+    """Debug artifacts (URL, HTML, timings, screenshots) without stalling the caller.
+
+    capture() only takes the in-page snapshot (one script call); full screenshots are
+    rate-limited or deferred, and compression plus disk writes run on a background thread
+    under a per-run size budget.
+    """
+
+    def __init__(self, directory, max_total_bytes, screenshot_min_interval=5.0):
+        self.directory = directory
+        self.max_total_bytes = max_total_bytes
+        self.screenshot_min_interval = screenshot_min_interval # Seconds between two immediate screenshots
+        self.total_bytes = 0
+        self.written = 0
+        self.dropped = 0
+        self._last_screenshot = None
+        self._deferred = None # Base path of the latest capture whose screenshot was deferred
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def capture(self, driver, prefix, screenshot="now", extra=None):
+        """Grabs the cheap snapshot now; screenshot is "now" (rate-limited, else deferred), "defer" or "none"."""
+        started = time.perf_counter()
+        base = os.path.join(self.directory, f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')[:-3]}")
+        record = {"prefix": prefix, "captured_at": time.time(), **(extra or {})}
+        html = None
+        try:
+            snapshot = driver.execute_script(ARTIFACT_SNAPSHOT_JS)
+            record.update(url=snapshot["url"], title=snapshot["title"], timing=snapshot["timing"])
+            html = snapshot["html"]
+        except Exception as e: # Session gone or navigation in flight: the metadata is still worth keeping
+            record["snapshot_error"] = f"{type(e).__name__}: {e}"
+        png_b64 = None
+        if screenshot == "now" and (self._last_screenshot is None
+                                    or started - self._last_screenshot >= self.screenshot_min_interval):
+            png_b64 = self._screenshot(driver, record)
+        elif screenshot != "none":
+            self._deferred = base
+            record["screenshot"] = "deferred"
+        record["capture_ms"] = (time.perf_counter() - started) * 1000
+        self._submit(base, record, html, png_b64)
+        return base
+
+    def _screenshot(self, driver, record):
+        self._last_screenshot = time.perf_counter()
+        try:
+            return driver.get_screenshot_as_base64()
+        except Exception as e:
+            record["screenshot_error"] = f"{type(e).__name__}: {e}"
+            return None
+
+    def take_deferred_screenshot(self, driver):
+        """Takes the one screenshot owed by deferred captures (call once the hot path is over)."""
+        if self._deferred is None or driver is None:
+            return
+        base, self._deferred = self._deferred, None
+        record = {"deferred_from": os.path.basename(base), "captured_at": time.time()}
+        png_b64 = self._screenshot(driver, record)
+        if png_b64:
+            self._submit(base + "_deferred", record, None, png_b64)
+
+    def _submit(self, base, record, html, png_b64):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="artifact-writer", daemon=True)
+            self._thread.start()
+        self._queue.put((base, record, html, png_b64))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            base, record, html, png_b64 = item
+            try:
+                self._write(base, record, html, png_b64)
+            except Exception as e:
+                logging.error(f"Could not write artifacts '{base}': {e}")
+
+    def _write(self, base, record, html, png_b64):
+        # Smallest first, so the size cap drops the screenshot before the page source
+        files = []
+        if html is not None:
+            files.append((".html.gz", gzip.compress(html.encode("utf-8"), compresslevel=6)))
+        if png_b64:
+            files.append((".png", base64.b64decode(png_b64)))
+        os.makedirs(self.directory or ".", exist_ok=True)
+        saved, skipped = [], []
+        for suffix, data in files:
+            if self.total_bytes + len(data) > self.max_total_bytes:
+                skipped.append(suffix)
+                continue
+            with open(base + suffix, "wb") as fh:
+                fh.write(data)
+            self.total_bytes += len(data)
+            saved.append(suffix)
+        if skipped:
+            record["skipped_over_budget"] = skipped
+            self.dropped += len(skipped)
+        metadata = json.dumps(record, default=str, indent=1).encode("utf-8")
+        with open(base + ".json", "wb") as fh:
+            fh.write(metadata)
+        self.total_bytes += len(metadata)
+        self.written += 1
+        logging.info(f"Saved artifacts: {base} ({', '.join(['.json'] + saved)}"
+                     + (f"; {', '.join(skipped)} skipped, ARTIFACT_MAX_TOTAL_MB reached" if skipped else "") + ")")
+
+    def close(self, timeout=5.0):
+        """Drains the write queue."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+        logging.info("Artifacts: %d captures written (%.1f MiB), %d files skipped over budget.",
+                     self.written, self.total_bytes / (1024 * 1024), self.dropped)
+
+
+# --- DOM Snapshots ---
+
+class DomSnapshotRecorder:
+    """Compact, content-addressed DOM snapshots of each page state (replay: replay_dom_snapshots.py).
+
+    Snapshots are script-free copies of the live DOM (form state kept), gzipped under their hash,
+    so an unchanged page is stored once across runs; index.jsonl lists every state seen.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    def record(self, driver, state, extra=None):
+        started = time.perf_counter()
+        try:
+            snapshot = driver.execute_script(DOM_SNAPSHOT_JS)
+        except WebDriverException as e:
+            logging.warning(f"DOM snapshot '{state}' failed: {e}")
+            return None
+        html = snapshot["html"].encode("utf-8")
+        digest = hashlib.sha256(html).hexdigest()[:16]
+        path = os.path.join(self.directory, digest + ".html.gz")
+        os.makedirs(self.directory, exist_ok=True)
+        is_new = not os.path.exists(path)
+        if is_new:
+            with open(path, "wb") as fh:
+                fh.write(gzip.compress(html, compresslevel=9))
+        entry = {"run": self.run_id, "state": state, "hash": digest, "url": snapshot["url"], "title": snapshot["title"],
+                 "captured_at": time.time(), "bytes": len(html), "new": is_new, **(extra or {})}
+        with open(os.path.join(self.directory, "index.jsonl"), "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(entry) + "\n")
+        logging.info("DOM snapshot '%s': %s (%s, %.1f KiB, %.1fms)", state, digest, "new" if is_new else "already stored",
+                     len(html) / 1024, (time.perf_counter() - started) * 1000)
+        return digest
+
+
+# --- Timing Profile ---
+
+# Constants a timing profile may override (written by tune_timing_parameters.py)
+TUNABLE_TIMING_PARAMETERS = (
+    "MICRO_REFRESH_INTERVAL", "FAST_CHECK_INTERVAL", "FAST_LOOP_WAIT_TIMEOUT", "DELAY_AFTER_SLOT_CLICK",
+    "DELAY_BETWEEN_QTY_SET", "DELAY_BETWEEN_PLUS_CLICKS", "DELAY_AFTER_QTY_SET", "DELAY_AFTER_CONTINUE",
+)
+
+
+def load_timing_profile(path):
+    """Overrides the module timing constants with the "parameters" of a JSON profile; returns the applied values."""
+    with open(path, encoding="utf-8") as fh:
+        profile = json.load(fh)
+    applied = {}
+    for name, value in profile.get("parameters", {}).items():
+        if name not in TUNABLE_TIMING_PARAMETERS:
+            logging.warning(f"Timing profile {path}: ignoring unknown parameter {name!r}.")
+            continue
+        applied[name] = float(value)
+    globals().update(applied)
+    logging.info(f"Timing profile {path} applied: " + ", ".join(f"{k}={v * 1000:.0f}ms" for k, v in applied.items()))
+    return applied
+
+
+# --- Readiness Check ---
+
+def nearest_rank(values, fraction):
+    """Nearest-rank quantile (fraction in 0..1) of a non-empty sequence."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def readiness_window(command_ms, ttfb_ms, reload_ms, clock_uncertainty=0.0):
+    """Micro-refresh lead time and window (seconds) from measured latencies (lists of ms).
+
+    before: a reload sent when the window opens reaches the server by the release even if our
+    clock is off by the sync uncertainty (p90 TTFB + uncertainty + margin).
+    after: READINESS_AFTER_RELOADS reload cycles (p90 reload + p90 command) after the release.
+    lead: the trigger leaves READINESS_ARM_COMMANDS commands + margin before the window opens.
+    Without page samples the configured before/after are kept.
+    """
+    command = nearest_rank(command_ms, 0.9) / 1000.0
+    before, after = MICRO_REFRESH_DURATION_BEFORE, MICRO_REFRESH_DURATION_AFTER
+    if ttfb_ms:
+        before = nearest_rank(ttfb_ms, 0.9) / 1000.0 + clock_uncertainty + READINESS_MARGIN
+        before = min(READINESS_BEFORE_LIMITS[1], max(READINESS_BEFORE_LIMITS[0], before))
+    if reload_ms:
+        after = READINESS_AFTER_RELOADS * (nearest_rank(reload_ms, 0.9) / 1000.0 + command)
+        after = min(READINESS_AFTER_LIMITS[1], max(READINESS_AFTER_LIMITS[0], after))
+    lead = before + READINESS_MARGIN + READINESS_ARM_COMMANDS * command
+    lead = min(READINESS_LEAD_LIMITS[1], max(READINESS_LEAD_LIMITS[0], lead, before))
+    return {"MICRO_REFRESH_LEAD_TIME_SECONDS": round(lead, 3), "MICRO_REFRESH_DURATION_BEFORE": round(before, 3),
+            "MICRO_REFRESH_DURATION_AFTER": round(after, 3)}
+
+
+def describe_latencies(values):
+    """'p50 x / p90 y / max z ms (n=k)' for a list of ms values."""
+    if not values:
+        return "no samples"
+    return f"p50 {nearest_rank(values, 0.5):.1f} / p90 {nearest_rank(values, 0.9):.1f} / max {max(values):.1f}ms (n={len(values)})"
+
+
+# --- CPU Affinity & Priority (Linux) ---
+
+def descendant_pids(root_pid):
+    """PIDs of all processes below `root_pid` (chromedriver, Chrome and its children), from /proc."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", encoding="utf-8", errors="replace") as fh:
+                stat = fh.read()
+        except OSError:
+            continue # Exited meanwhile
+        ppid = int(stat.rsplit(")", 1)[1].split()[1]) # Field 4; the command name may contain spaces
+        children.setdefault(ppid, []).append(int(entry))
+    found, pending = [], [root_pid]
+    while pending:
+        for child in children.get(pending.pop(), []):
+            found.append(child)
+            pending.append(child)
+    return found
+
+
+def lowest_allowed_nice(target):
+    """`target` if this process may use it, else the lowest nice value RLIMIT_NICE allows (never above the current one)."""
+    import resource # Unix only, imported here so the module still loads on Windows
+    current = os.getpriority(os.PRIO_PROCESS, 0)
+    if os.geteuid() == 0 or target >= current:
+        return target
+    soft = resource.getrlimit(resource.RLIMIT_NICE)[0] # The nice floor is 20 - soft limit
+    if soft == resource.RLIM_INFINITY:
+        floor = -20
+    elif soft > 0:
+        floor = 20 - soft
+    else:
+        floor = current
+    return min(current, max(target, floor))
+
+
+def tune_process(pid, cores, nice):
+    """Pins every thread of `pid` to `cores` (affinity and nice are per thread on Linux) and sets `nice`.
+
+    Returns (threads tuned, error or None). Threads started later inherit the settings from their creator.
+    """
+    tuned, error = 0, None
+    try:
+        thread_ids = [int(tid) for tid in os.listdir(f"/proc/{pid}/task")]
+    except OSError as e:
+        return 0, f"{type(e).__name__}: {e}"
+    for tid in thread_ids:
+        try:
+            if cores:
+                os.sched_setaffinity(tid, cores)
+            if nice is not None:
+                os.setpriority(os.PRIO_PROCESS, tid, nice)
+            tuned += 1
+        except ProcessLookupError:
+            continue # Thread exited meanwhile
+        except OSError as e:
+            error = f"{type(e).__name__}: {e}"
+    return tuned, error
+
+
+def default_core_split(available):
+    """(bot cores, browser cores) for the automatic CPU_BOT_CORES / CPU_BROWSER_CORES.
+
+    The bot gets two cores once there are more than two: the spinning deadline waits share the
+    process with the event loop, the WebDriver thread and the log/artifact/interceptor threads.
+    """
+    cores = sorted(available)
+    if len(cores) == 1:
+        return None, None # Nothing to separate: only the priority is raised
+    if len(cores) == 2:
+        return [cores[1]], [cores[0]]
+    rest = cores[:-2]
+    return cores[-2:], rest[1:] if len(rest) >= 3 else rest # Core 0 left to the OS when the browser keeps two or more
+
+
+def measure_wakeup_jitter(label, samples=None, interval=None):
+    """Wake-up lateness of plain sleeps (no busy spin, so scheduler delays show). Returns a DeadlineWaiter holding them."""
+    waiter = DeadlineWaiter(spin_threshold=0.0)
+    for _ in range(samples or CPU_JITTER_PROBE_SAMPLES):
+        waiter.sleep(interval or CPU_JITTER_PROBE_INTERVAL, label)
+    return waiter
+
+
+# --- Run History ---
+
+def config_snapshot():
+    """The module's configuration constants (upper-case globals of plain JSON types, but the in-page scripts)."""
+    plain = (bool, int, float, str, list, tuple, dict, type(None))
+    return {name: value for name, value in sorted(globals().items())
+            if name.isupper() and not name.startswith("_") and not name.endswith(("_JS", "_FN")) and isinstance(value, plain)}
+
+
+class RunHistoryStore:
+    """SQLite store: one `runs` row per run plus its phase timings (ms) and wake-up jitter samples (us).
+
+    Phase names: "release->x" (ms after the activation instant on the reference clock), "span:a->b",
+    "state:x" (AcquisitionOrchestrator), "startup:x", "resync:clock_sync_max" (slowest clock re-sync)
+    and "wait:x" (post-action state waits).
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        started_at TEXT NOT NULL,
+        finished_at TEXT NOT NULL,
+        label TEXT,
+        outcome TEXT NOT NULL,
+        success INTEGER NOT NULL,
+        attempts INTEGER,
+        refresh_count INTEGER,
+        refresh_mode TEXT,
+        site_language TEXT,
+        config TEXT NOT NULL,
+        extra TEXT
+    );
+    CREATE TABLE IF NOT EXISTS phases (run_id INTEGER NOT NULL REFERENCES runs(id), phase TEXT NOT NULL, ms REAL NOT NULL);
+    CREATE TABLE IF NOT EXISTS jitter (run_id INTEGER NOT NULL REFERENCES runs(id), label TEXT NOT NULL, us REAL NOT NULL);
+    CREATE INDEX IF NOT EXISTS phases_run ON phases(run_id);
+    CREATE INDEX IF NOT EXISTS jitter_run ON jitter(run_id);
+    """
+    RUN_COLUMNS = ("started_at", "finished_at", "label", "outcome", "success", "attempts", "refresh_count",
+                   "refresh_mode", "site_language", "config", "extra")
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(self.SCHEMA)
+
+    def record_run(self, run, phases, jitter):
+        """Inserts a run (dict with RUN_COLUMNS; config/extra as dicts), {phase: ms} and {label: [us, ...]}. Returns its id."""
+        row = dict(run, config=json.dumps(run["config"], default=str), extra=json.dumps(run.get("extra") or {}, default=str))
+        with self.conn:
+            cursor = self.conn.execute(f"INSERT INTO runs ({', '.join(self.RUN_COLUMNS)}) VALUES ({', '.join('?' * len(self.RUN_COLUMNS))})",
+                                       [row.get(column) for column in self.RUN_COLUMNS])
+            run_id = cursor.lastrowid
+            self.conn.executemany("INSERT INTO phases (run_id, phase, ms) VALUES (?, ?, ?)",
+                                  [(run_id, name, ms) for name, ms in phases.items() if ms is not None])
+            self.conn.executemany("INSERT INTO jitter (run_id, label, us) VALUES (?, ?, ?)",
+                                  [(run_id, label, us) for label, samples in jitter.items() for us in samples])
+        return run_id
+
+    def runs(self, limit=None, label=None, live_only=False):
+        """Run rows (dicts with config/extra decoded), oldest first; `limit` keeps the newest ones.
+
+        `label` selects runs with that label, `live_only` the unlabelled ones (real drops); neither = all runs.
+        """
+        query, params = "SELECT * FROM runs", []
+        if label is not None:
+            query, params = query + " WHERE label = ?", [label]
+        elif live_only:
+            query += " WHERE label IS NULL"
+        rows = [dict(r) for r in self.conn.execute(query + " ORDER BY id", params)]
+        for row in rows:
+            row["config"], row["extra"] = json.loads(row["config"]), json.loads(row["extra"] or "{}")
+        return rows[-limit:] if limit else rows
+
+    def phases(self, run_ids):
+        """{run_id: {phase: ms}}"""
+        result = {run_id: {} for run_id in run_ids}
+        for row in self._select("SELECT run_id, phase, ms FROM phases", run_ids):
+            result[row["run_id"]][row["phase"]] = row["ms"]
+        return result
+
+    def jitter(self, run_ids):
+        """{run_id: {label: [us, ...]}}"""
+        result = {run_id: {} for run_id in run_ids}
+        for row in self._select("SELECT run_id, label, us FROM jitter", run_ids):
+            result[row["run_id"]].setdefault(row["label"], []).append(row["us"])
+        return result
+
+    def _select(self, query, run_ids):
+        if not run_ids:
+            return []
+        return self.conn.execute(f"{query} WHERE run_id IN ({', '.join('?' * len(run_ids))})", list(run_ids))
+
+    def close(self):
+        self.conn.close()
 
 
 # --- Sound Notification Handling ---
@@ -102,10 +1261,23 @@ REDUCED_PRICE_TICKETS = 1
 # !!! SET PREFERRED TOUR LANGUAGE !!!
 PREFERRED_LANGUAGE = "ENGLISH"  # Options: "ENGLISH", "ITALIAN", "SPANISH", "FRENCH"
 
+# !!! OPTIONAL: RANKED FALLBACK SLOTS !!!
+# Best first. All entries are checked in ONE pass over the slot grid and the highest-ranked
+# selectable one is taken, so a vanished first choice does not burn the fast-loop budget.
+# "full_price"/"reduced_fare" override the ticket counts for that entry (default: the counts above).
+# Empty = PREFERRED_LANGUAGE at the ACTIVATION_TIME slot only.
+SLOT_PREFERENCES = [
+    # {"language": "ENGLISH", "time": "9:00 AM"},
+    # {"language": "ENGLISH", "time": "9:30 AM"},
+    # {"language": "ITALIAN", "time": "9:00 AM", "full_price": 1, "reduced_fare": 0},
+]
+
 # Timing Configuration (CRITICAL FOR SPEED) ---
 # How many seconds BEFORE Activation Time to START the micro-refresh loop
 # Adjust based on observation: If slots appear slightly early, increase this.
 # If they appear exactly on time or slightly late, keep it low.
+# With READINESS_CHECK_ENABLED this and the window below are only the starting values: the
+# readiness check replaces them with values derived from measured latencies.
 MICRO_REFRESH_LEAD_TIME_SECONDS = 0.8
 
 # Duration of the micro-refresh window around activation time
@@ -115,6 +1287,64 @@ MICRO_REFRESH_DURATION_AFTER = 0.7  # Seconds AFTER activation time
 # Interval between JS reloads during the micro-refresh window (VERY LOW)
 MICRO_REFRESH_INTERVAL = 0.075 # Try 75ms, adjust 0.05 <-> 0.1
 
+# Pre-drop readiness check (armed phase): measures chromedriver command latency and page TTFB /
+# DOMContentLoaded, checks the WebDriver session is alive and derives the three values above from
+# the measurements (see readiness_window(), clamped to the limits below). Opt-in: the reloads run
+# after the manual CAPTCHA step and the derived values REPLACE the three constants above.
+READINESS_CHECK_ENABLED = False
+READINESS_CHECK_BEFORE = 120 # seconds before activation the check runs
+READINESS_MIN_HEADROOM = 10 # Skip it if less than this is left before the refresh trigger (seconds)
+READINESS_COMMAND_SAMPLES = 20 # 'return 1' round trips
+READINESS_PAGE_SAMPLES = 3 # Measured reloads (0 = no reloads: only the lead time is derived)
+READINESS_PAGE_TIMEOUT = 10 # seconds per measured reload
+READINESS_MARGIN = 0.2 # seconds of slack on the window start and the lead time
+READINESS_AFTER_RELOADS = 8 # The window stays open for this many p90 reload cycles after activation
+READINESS_ARM_COMMANDS = 5 # WebDriver commands between the trigger and the window start
+READINESS_BEFORE_LIMITS = (0.3, 3.0) # seconds
+READINESS_AFTER_LIMITS = (0.7, 10.0)
+READINESS_LEAD_LIMITS = (0.5, 10.0)
+
+# "interval": reload every MICRO_REFRESH_INTERVAL regardless of the previous load (may cancel it).
+# "lifecycle": start the next reload only once the previous document reached REFRESH_LIFECYCLE_EVENT
+# (or a timeout derived from measured load times expired); MICRO_REFRESH_INTERVAL is then the minimum gap.
+# "probe": every MICRO_REFRESH_INTERVAL fetch AVAILABILITY_PROBE_URL in-page and parse it; the page is
+# only reloaded once the target slot is selectable (or the probe keeps failing).
+MICRO_REFRESH_MODE = "interval"
+REFRESH_LIFECYCLE_EVENT = "domcontentloaded" # "domcontentloaded" or "load"
+REFRESH_TIMEOUT_FACTOR = 2.0 # Lifecycle timeout = factor x p90 of the measured reload durations...
+REFRESH_TIMEOUT_MIN = 0.15 # ...clamped to [min, max] seconds
+REFRESH_TIMEOUT_MAX = 2.0
+# Document/fragment fetched by the probe mode. None = the event page URL itself (HTML only, no
+# CSS/JS/images, no render). Point it at the availability fragment/XHR the site uses if known.
+AVAILABILITY_PROBE_URL = None
+AVAILABILITY_PROBE_TIMEOUT = 1.0 # seconds per probe fetch
+AVAILABILITY_PROBE_MAX_FAILURES = 3 # Consecutive probe errors before falling back to a full reload
+REFRESH_SETTLE_TIMEOUT = 0.03 # Container check after the lifecycle event (covers script-rendered content)
+
+# Reference clock check at startup (the release happens on the SITE's clock, not ours)
+CLOCK_SYNC_ENABLED = True
+CLOCK_SYNC_SOURCE = "ntp" # "ntp" or "http" (Date header of CLOCK_SYNC_HTTP_URL)
+CLOCK_SYNC_NTP_SERVER = "pool.ntp.org"
+CLOCK_SYNC_HTTP_URL = "https://ticketing.colosseo.it/"
+CLOCK_SYNC_SAMPLES = 8
+CLOCK_SYNC_APPLY_OFFSET = True # Shift all deadlines by the measured offset
+CLOCK_SYNC_WARN_OFFSET = 0.05 # Warn loudly if the local clock is off by more than this (seconds)
+
+# Deadline waits sleep coarsely until this long before the deadline, then busy-spin (seconds)
+DEADLINE_SPIN_THRESHOLD = 0.002
+
+# Linux only: pin this process to CPU_BOT_CORES and the chromedriver/Chrome process tree to
+# CPU_BROWSER_CORES, and lower the nice value of both to CPU_NICE (or the lowest RLIMIT_NICE
+# allows). None = automatic split: the last two cores to the bot (one with only two cores), the
+# rest to the browser, core 0 left to the OS from five cores up. Wake-up jitter and
+# chromedriver round trips are measured before and after and logged as histograms.
+CPU_TUNING_ENABLED = False
+CPU_BOT_CORES = None # e.g. [2, 3]
+CPU_BROWSER_CORES = None # e.g. [0, 1]
+CPU_NICE = -10 # Negative values need CAP_SYS_NICE or a raised RLIMIT_NICE (limits.conf "nice")
+CPU_JITTER_PROBE_SAMPLES = 300 # Plain sleeps (no spin) per jitter measurement
+CPU_JITTER_PROBE_INTERVAL = 0.002 # seconds per probe sleep
+
 # Max time to wait for the main content container after a successful micro-refresh (Short)
 POST_REFRESH_CONTAINER_TIMEOUT = 1.5 # seconds
 
@@ -129,6 +1359,20 @@ DELAY_BETWEEN_PLUS_CLICKS = 0.03 # Minimal pause between clicks
 DELAY_AFTER_QTY_SET = 0.05   # Minimal pause for Continue button state
 DELAY_AFTER_CONTINUE = 1.5   # Needs to be slightly longer for potential page transition/API call
 
+# Wait for the state change each delay above stands in for instead of sleeping it: tariff rows
+# rendered, quantity counter updated, continue button enabled, page left after continue. The
+# timeouts only cap each wait (the step then carries on as after the fixed sleep); the DELAY_*
+# values are used when STATE_WAITS is off or a quantity counter cannot be read.
+STATE_WAITS = True
+STATE_WAIT_POLL = 0.01 # seconds between condition checks (one WebDriver round trip each)
+TARIFF_RENDER_TIMEOUT = 0.75 # Slot click -> first tariff row present
+QUANTITY_UPDATE_TIMEOUT = 0.3 # Plus click -> counter shows the new value
+CONTINUE_ENABLED_TIMEOUT = 0.5 # Quantities set -> continue button no longer disabled
+CONTINUE_NAVIGATION_TIMEOUT = 1.5 # Continue click -> URL changed or continue button gone
+# Fixed delays STATE_WAITS replaces (the timing tuner skips them while it is on)
+STATE_WAIT_DELAYS = ("DELAY_AFTER_SLOT_CLICK", "DELAY_BETWEEN_QTY_SET", "DELAY_BETWEEN_PLUS_CLICKS",
+                     "DELAY_AFTER_QTY_SET", "DELAY_AFTER_CONTINUE")
+
 # Max attempts within the FAST CHECK loop (Defines the fast check window duration)
 # Duration = MAX_FAST_CHECK_ATTEMPTS * FAST_CHECK_INTERVAL (approx)
 # e.g., 400 attempts * 0.05s = 20 seconds of fast checking
@@ -137,6 +1381,87 @@ MAX_FAST_CHECK_ATTEMPTS = 400
 # Timeout for waits *within* the fast loop (after container found) - keep short
 FAST_LOOP_WAIT_TIMEOUT = 0.75 # seconds
 
+# WebDriver page load timeout (initial loads; micro-refresh reloads temporarily use their own)
+PAGE_LOAD_TIMEOUT = 15 # seconds
+
+# JSON profile overriding the timing constants above (see tune_timing_parameters.py), None to keep them
+TIMING_PROFILE_FILE = None # e.g. "timing_profile.json"
+
+# Run the whole slot -> quantities -> continue sequence as ONE in-browser async script
+# (1 WebDriver round trip instead of ~30). STATE_WAITS and the DELAY_* values apply in-page as well.
+USE_SINGLE_ROUNDTRIP_PURCHASE = False
+# Detect the primary container with an in-page MutationObserver (one blocking async script)
+# instead of WebDriverWait polling every 50ms over the WebDriver protocol.
+USE_MUTATION_OBSERVER_DETECTION = False
+# Talk to Chrome's DevTools websocket directly for reloads and DOM checks (one protocol hop
+# less than WebDriver -> chromedriver -> CDP). WebDriver stays the fallback if it fails.
+USE_DIRECT_CDP = False
+# Upper bound for any execute_async_script call (the scripts enforce their own shorter timeouts)
+ASYNC_SCRIPT_TIMEOUT = 10 # seconds
+
+# Run Chrome headless (only for offline benchmarks against the mock server - run headed for real drops)
+BROWSER_HEADLESS = False
+
+# Fast (re)start: reuse the cached chromedriver offline, launch Chrome in parallel with the clock
+# check, skip the warning pause and log a startup time breakdown
+FAST_START = False
+DRIVER_CACHE_FILE = "chromedriver_cache.json"
+DRIVER_CACHE_DIR = "driver_cache" # Stable copy of the patched undetected-chromedriver binary
+STARTUP_WARNING_PAUSE = 4 # seconds to read the pre-run warnings (skipped with FAST_START)
+
+# Run the flow as an asyncio state machine (initial load -> armed -> refresh window -> purchase ->
+# secured/failed): WebDriver calls on one dedicated thread, clock re-sync, watchdog and metrics
+# as side tasks next to it. Opt-in: False = the serial check_for_tickets().
+USE_ASYNC_ORCHESTRATOR = False
+ARMED_HANDOFF_SECONDS = 2.0 # The WebDriver thread takes over the precise wait this long before the trigger
+CLOCK_RESYNC_INTERVAL = 60.0 # seconds between clock re-syncs while armed (0 = startup sync only)
+WATCHDOG_MARGIN = 10.0 # seconds a timed state may overrun its budget before the run is failed
+WATCHDOG_ABANDON_TIMEOUT = 5.0 # seconds to wait for the WebDriver thread to return after the watchdog quit the browser
+INTERRUPT_STOP_GRACE = 1.5 # On Ctrl+C: seconds the WebDriver thread gets to leave its loop before the browser is closed
+ORCHESTRATOR_METRICS_INTERVAL = 15.0 # seconds between state/event-loop lag log lines
+
+# Trim the page weight of every (re)load: block images, fonts and trackers through DevTools.
+# Allow patterns win over block patterns (needs websocket-client, requests matching a block
+# pattern are then answered by a small interceptor thread); without them Chrome's blocklist is used.
+NETWORK_POLICY_ENABLED = False
+NETWORK_BLOCK_PATTERNS = [
+    "*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.svg*", "*.ico*", # Images
+    "*.woff*", "*.ttf*", "*.otf*", # Fonts (icon fonts only lose their glyphs, the buttons stay clickable)
+    "*.mp4*", "*.webm*", # Media
+    "*google-analytics.com/*", "*googletagmanager.com/*", "*/gtm.js*", "*/gtag/js*", # Analytics / tag managers
+    "*doubleclick.net/*", "*connect.facebook.net/*", "*hotjar.com/*",
+]
+NETWORK_ALLOW_PATTERNS = ["*captcha*", "*challenges.cloudflare.com/*", "*turnstile*"] # Never block the anti-bot checks
+NETWORK_POLICY_BASELINE = False # One extra unblocked load before the initial load to measure the bytes saved per load
+
+
+# Span tracing of every phase and WebDriver command (JSONL + Chrome about:tracing export)
+TRACE_ENABLED = False
+TRACE_JSONL_FILE = "ticket_bot_trace.jsonl"
+TRACE_CHROME_FILE = "ticket_bot_trace.json"
+
+# Debug artifacts on failures: page source + URL + timings at once, screenshots rate-limited
+# (or deferred out of the fast loop), files written by a background thread
+ARTIFACT_DIR = "debug_artifacts"
+ARTIFACT_MAX_TOTAL_MB = 50 # Per run; beyond it screenshots, then page sources, are skipped
+ARTIFACT_SCREENSHOT_MIN_INTERVAL = 5.0 # seconds between two immediate screenshots
+
+# Record a DOM snapshot of every page state (initial load, release, slot selected, ...) for offline
+# selector checks with replay_dom_snapshots.py. Costs a few ms per state: use it for rehearsal runs.
+DOM_SNAPSHOT_ENABLED = False
+DOM_SNAPSHOT_DIR = "dom_snapshots"
+
+# SQLite history of every run (phase timings, wake-up jitter, refresh counts, outcome and a config
+# snapshot) for cross-run comparison with run_history.py. None = off.
+RUN_HISTORY_DB = "run_history.sqlite"
+
+# Shared low-jitter waiter (micro-refresh window, fast loop, ...) - see DeadlineWaiter
+DEADLINE_WAITER = DeadlineWaiter(spin_threshold=DEADLINE_SPIN_THRESHOLD)
+# Shared tracer (no-op while disabled)
+TRACER = Tracer(enabled=TRACE_ENABLED)
+# Shared failure artifact writer
+ARTIFACTS = ArtifactRecorder(ARTIFACT_DIR, ARTIFACT_MAX_TOTAL_MB * 1024 * 1024, ARTIFACT_SCREENSHOT_MIN_INTERVAL)
+
 
 # Multilingual Text Mappings
 
@@ -172,6 +1497,407 @@ TICKET_ROW_XPATH_TEMPLATE = ".//div[contains(@class, 'tariff-option')][.//span[c
 
 # --- Continue Button ---
 CONTINUE_BUTTON_SELECTOR = "a#buy-button" # Check if ID is reliable
+TICKET_QUANTITY_SELECTOR = "span.quantity, input.quantity, input[type='number']" # Counter inside a ticket row - VERIFY
+
+
+# In-Browser Scripts
+
+# Blocks until the primary container holds at least one selectable slot label, using a
+# MutationObserver instead of polling. Arguments: container selector, selectable-label CSS
+# selector, timeout in ms, callback. Resolves with {found, ts} where ts is epoch ms (in-page clock).
+CONTAINER_OBSERVER_JS = """
+var containerSelector = arguments[0];
+var labelSelector = arguments[1];
+var timeoutMs = arguments[2];
+var done = arguments[arguments.length - 1];
+var started = performance.now();
+var settled = false;
+var observer = null;
+var timer = null;
+function ready() {
+  var container = document.querySelector(containerSelector);
+  return !!(container && container.querySelector(labelSelector));
+}
+function settle(found) {
+  if (settled) return;
+  settled = true;
+  if (observer) observer.disconnect();
+  if (timer) clearTimeout(timer);
+  done({found: found, ts: performance.timeOrigin + performance.now(), waited_ms: performance.now() - started});
+}
+if (ready()) {
+  settle(true);
+} else {
+  observer = new MutationObserver(function () { if (ready()) settle(true); });
+  observer.observe(document, {childList: true, subtree: true, attributes: true, attributeFilter: ['class', 'disabled']});
+  timer = setTimeout(function () { settle(ready()); }, timeoutMs);
+}
+"""
+# Navigation Timing of the current document, ms relative to its navigation start (null if unsupported)
+NAVIGATION_TIMING_JS = """
+var nav = performance.getEntriesByType && performance.getEntriesByType('navigation')[0];
+if (!nav) return null;
+return {ttfb: nav.responseStart, dcl: nav.domContentLoadedEventEnd, load: nav.loadEventEnd,
+        transfer_size: nav.transferSize || 0};
+"""
+
+# Cheap failure snapshot: URL, title, serialized DOM and navigation timing in one call
+ARTIFACT_SNAPSHOT_JS = """
+var nav = performance.getEntriesByType('navigation')[0];
+return {url: location.href, title: document.title,
+        html: (document.doctype ? new XMLSerializer().serializeToString(document.doctype) + '\\n' : '') + document.documentElement.outerHTML,
+        timing: nav ? {ttfb: nav.responseStart, dcl: nav.domContentLoadedEventEnd, load: nav.loadEventEnd} : null};
+"""
+
+# Static copy of the live DOM for DomSnapshotRecorder: checked/value state written back as attributes,
+# scripts, frames, external resources and inline handlers removed (replays offline, runs nothing)
+DOM_SNAPSHOT_JS = """
+var live = document.documentElement, copy = live.cloneNode(true);
+var fields = 'input, select, textarea', liveFields = live.querySelectorAll(fields), copyFields = copy.querySelectorAll(fields);
+for (var i = 0; i < liveFields.length; i++) {
+  var field = liveFields[i], target = copyFields[i];
+  if (field.type === 'radio' || field.type === 'checkbox') {
+    if (field.checked) target.setAttribute('checked', ''); else target.removeAttribute('checked');
+  } else if (field.tagName === 'INPUT') {
+    target.setAttribute('value', field.value);
+  }
+}
+copy.querySelectorAll('script, noscript, iframe, object, embed, link').forEach(function (node) { node.remove(); });
+copy.querySelectorAll('*').forEach(function (node) {
+  for (var a = node.attributes.length - 1; a >= 0; a--) {
+    var name = node.attributes[a].name;
+    if (/^on/i.test(name) || name === 'src' || name === 'srcset') node.removeAttribute(name);
+  }
+});
+return {url: location.href, title: document.title, html: '<!DOCTYPE html>\\n' + copy.outerHTML};
+"""
+
+# Transfer sizes of the current document and its subresources (Resource Timing)
+PAGE_WEIGHT_JS = """
+var nav = performance.getEntriesByType('navigation')[0];
+return {document: nav ? nav.transferSize : 0,
+        resources: performance.getEntriesByType('resource').map(function (e) { return [e.name, e.transferSize]; })};
+"""
+
+# CSS equivalent of AVAILABLE_SLOT_LABEL_XPATH, used by in-page scripts
+SELECTABLE_SLOT_LABEL_CSS = "label:not(.unselectable) input[type=radio][name=slot]:not([disabled])"
+
+# Shared in-page slot resolver: one walk over the language headers and slot labels of `container`
+# in document order, matching every ranked preference at once. cfg.preferences is a list of
+# {sections: [[activity text, language text], ...] (lowercase), slotTime}. Only if the page has no
+# header for ANY preferred language are times matched in any section (result.fallback).
+# Returns {label, rank, reason, reasons, scanned, fallback}: the best selectable preference (rank = its
+# index, -1 if none) and per preference found/sold_out/disabled/hidden/not_found/no_language.
+SLOT_RESOLVER_FN = """
+function resolveSlot(container, cfg) {
+  function norm(text) { return (text || '').replace(/\\s+/g, ' ').trim(); }
+  function normTime(text) { return norm(text).toUpperCase().replace(/^0(?=\\d)/, ''); }
+  function labelState(label) {
+    var radio = label.querySelector('input[type=radio][name=slot]');
+    if (label.classList.contains('unselectable')) return 'sold_out';
+    if (!radio || radio.disabled) return 'disabled';
+    if (cfg.checkVisible && !label.getClientRects().length) return 'hidden';
+    return 'found';
+  }
+  var prefs = cfg.preferences;
+  var times = prefs.map(function (p) { return normTime(p.slotTime); });
+  var inSection = [], sawSection = [], bySection = [], anySection = [];
+  prefs.forEach(function () { inSection.push(false); sawSection.push(false); bySection.push(null); anySection.push(null); });
+  var nodes = container.querySelectorAll('h3.lang_section, label');
+  var scanned = 0;
+  for (var i = 0; i < nodes.length; i++) {
+    var node = nodes[i];
+    if (node.tagName === 'H3') {
+      var text = norm(node.textContent).toLowerCase();
+      for (var k = 0; k < prefs.length; k++) {
+        inSection[k] = prefs[k].sections.some(function (pair) { return text.indexOf(pair[0]) !== -1 && text.indexOf(pair[1]) !== -1; });
+        sawSection[k] = sawSection[k] || inSection[k];
+      }
+      continue;
+    }
+    scanned++;
+    var span = node.querySelector(':scope div > span');
+    if (!span) continue;
+    var time = normTime(span.textContent), state = null;
+    for (var m = 0; m < prefs.length; m++) {
+      if (times[m] !== time) continue;
+      state = state || labelState(node);
+      var bucket = inSection[m] ? bySection : anySection;
+      if (!bucket[m] || (bucket[m].reason !== 'found' && state === 'found')) bucket[m] = {label: node, reason: state};
+    }
+  }
+  var fallback = !sawSection.some(function (seen) { return seen; });
+  var reasons = [];
+  for (var r = 0; r < prefs.length; r++) {
+    var entry = fallback ? anySection[r] : bySection[r];
+    reasons.push(entry ? entry.reason : (fallback || sawSection[r]) ? 'not_found' : 'no_language');
+    if (entry && entry.reason === 'found') {
+      return {label: entry.label, rank: r, reason: 'found', reasons: reasons, scanned: scanned, fallback: fallback};
+    }
+  }
+  return {label: null, rank: -1, reason: reasons[0], reasons: reasons, scanned: scanned, fallback: fallback};
+}
+"""
+
+# Resolves the best preferred slot label in the live page. arguments[0] is SelectorPlan.slot_resolution_arg(),
+# arguments[1] the slot container element. Returns the resolver result plus its duration in ms.
+SLOT_RESOLUTION_JS = SLOT_RESOLVER_FN + """
+var started = performance.now();
+var result = resolveSlot(arguments[1], arguments[0]);
+result.ms = performance.now() - started;
+return result;
+"""
+
+# Availability probe: fetches cfg.url with the page's own session (no subresources, no render),
+# parses it with DOMParser and reports whether the target slot is selectable (see SLOT_RESOLVER_FN).
+# Resolves with {available, reason, rank, bytes, status, ms}; reason is available/no_container/
+# not_found/sold_out/disabled/http_<status>/error:<message>.
+AVAILABILITY_PROBE_JS = SLOT_RESOLVER_FN + """
+var cfg = arguments[0];
+var done = arguments[arguments.length - 1];
+var started = performance.now();
+function finish(available, reason, extra) {
+  var result = {available: available, reason: reason, bytes: 0, status: 0, ms: performance.now() - started};
+  for (var key in (extra || {})) result[key] = extra[key];
+  done(result);
+}
+var controller = window.AbortController ? new AbortController() : null;
+var timer = setTimeout(function () { if (controller) controller.abort(); }, cfg.timeoutMs);
+fetch(cfg.url, {credentials: 'include', cache: 'no-store', signal: controller ? controller.signal : undefined})
+  .then(function (response) {
+    return response.text().then(function (html) { return {status: response.status, html: html}; });
+  })
+  .then(function (res) {
+    clearTimeout(timer);
+    var extra = {bytes: window.TextEncoder ? new TextEncoder().encode(res.html).length : res.html.length, status: res.status};
+    if (res.status >= 400) { finish(false, 'http_' + res.status, extra); return; }
+    var doc = new DOMParser().parseFromString(res.html, 'text/html');
+    var container = doc.querySelector(cfg.containerSelector);
+    if (!container) { finish(false, 'no_container', extra); return; }
+    var slot = resolveSlot(container, cfg); // Parsed, never rendered: visibility is not checked
+    extra.rank = slot.rank;
+    finish(slot.rank !== -1, slot.rank !== -1 ? 'available' : slot.reason, extra);
+  })
+  .catch(function (e) { clearTimeout(timer); finish(false, 'error:' + (e && e.name || e)); });
+"""
+
+# Shared in-page state checks used instead of fixed post-action sleeps (STATE_WAITS).
+# quantityValue: integer shown by the first counter matching `selector` in `row` (null if unreadable).
+# continueEnabled: the button exists and is neither disabled, .disabled nor aria-disabled.
+STATE_CHECK_FN = """
+function quantityValue(row, selector) {
+  var counter = row && row.querySelector(selector);
+  if (!counter) return null;
+  var value = parseInt(counter.tagName === 'INPUT' ? counter.value : counter.textContent, 10);
+  return isNaN(value) ? null : value;
+}
+function continueEnabled(button) {
+  return !!button && !button.disabled && !button.classList.contains('disabled') && button.getAttribute('aria-disabled') !== 'true';
+}
+"""
+
+# arguments: ticket row, TICKET_QUANTITY_SELECTOR
+QUANTITY_VALUE_JS = STATE_CHECK_FN + "return quantityValue(arguments[0], arguments[1]);"
+
+# arguments: CONTINUE_BUTTON_SELECTOR. Returns location.href once the button is enabled (the
+# reference for the navigation wait after the click), null before.
+CONTINUE_ENABLED_JS = STATE_CHECK_FN + "return continueEnabled(document.querySelector(arguments[0])) ? location.href : null;"
+
+# arguments: URL before the continue click, CONTINUE_BUTTON_SELECTOR. True once the page moved on.
+PAGE_LEFT_JS = "return location.href !== arguments[0] || !document.querySelector(arguments[1]);"
+
+# Whole purchase flow in one execute_async_script call. arguments[0] is the config built by
+# ColosseumTicketBot._purchase_sequence_config(), the last argument is the WebDriver callback.
+# Resolves with {ok, step, reason, rank, marks, waits, href}: rank is the SLOT_PREFERENCES entry that
+# was taken, marks are epoch milliseconds per finished step, waits the milliseconds spent per
+# post-action step (state wait or fixed delay), href the page URL when continue was clicked.
+PURCHASE_SEQUENCE_JS = SLOT_RESOLVER_FN + STATE_CHECK_FN + """
+var cfg = arguments[0];
+var done = arguments[arguments.length - 1];
+var started = performance.now();
+var marks = {};
+var rank = -1, rows = [], reasons = null, resolveMs = null, waits = {}, href = null;
+function now() { return performance.timeOrigin + performance.now(); }
+function norm(text) { return (text || '').replace(/\\s+/g, ' ').trim(); }
+function lower(text) { return norm(text).toLowerCase(); }
+function finish(ok, step, reason) {
+  done({ok: ok, step: step, reason: reason || null, rank: rank, reasons: reasons, resolve_ms: resolveMs,
+        marks: marks, waits: waits, href: href, elapsed_ms: performance.now() - started});
+}
+function waitFor(find, timeoutMs, onFound, onTimeout) {
+  var limit = performance.now() + timeoutMs;
+  (function poll() {
+    var found = null;
+    try { found = find(); } catch (e) { found = null; }
+    if (found) { onFound(found); return; }
+    if (performance.now() >= limit) { onTimeout(); return; }
+    setTimeout(poll, 5);
+  })();
+}
+function later(ms, fn) { if (ms > 0) { setTimeout(fn, ms); } else { fn(); } }
+// Post-action pause of `step`: with cfg.stateWaits poll `check` up to timeoutMs, otherwise (or if
+// check is null) sleep the fixed delay. Either way the time spent is added to waits[step].
+function settle(step, check, timeoutMs, delayMs, fn) {
+  var waitStarted = performance.now();
+  function next() { waits[step] = (waits[step] || 0) + performance.now() - waitStarted; fn(); }
+  if (cfg.stateWaits && check) { waitFor(check, timeoutMs, next, next); } else { later(delayMs, next); }
+}
+function findRow(container, titleText) {
+  var rows = container.querySelectorAll('div.tariff-option');
+  for (var i = 0; i < rows.length; i++) {
+    var title = rows[i].querySelector('span.title');
+    if (title && lower(title.textContent) === titleText) return rows[i];
+  }
+  return null;
+}
+
+waitFor(function () { return document.querySelector(cfg.containerSelector); }, cfg.waitTimeoutMs, function (container) {
+  marks.container = now();
+  var resolveStarted = performance.now();
+  var slot = resolveSlot(container, cfg.resolver);
+  resolveMs = performance.now() - resolveStarted;
+  reasons = slot.reasons;
+  if (!slot.label) { finish(false, 'slot', 'no preference selectable (' + slot.reasons.join(', ') + ') among ' + slot.scanned + ' labels'); return; }
+  rank = slot.rank;
+  rows = cfg.rowsByRank[rank];
+  slot.label.click();
+  marks.slot_clicked = now();
+  var firstRow = rows.filter(function (spec) { return spec.count > 0; })[0];
+  settle('tariff_render', firstRow ? function () {
+    var tariffs = document.querySelector(cfg.tariffContainerSelector);
+    return tariffs && findRow(tariffs, firstRow.text);
+  } : null, cfg.timeouts.tariffRender, cfg.delays.afterSlotClick, function () {
+    waitFor(function () { return document.querySelector(cfg.tariffContainerSelector); }, cfg.waitTimeoutMs, function (tariffs) {
+      var rowIndex = 0;
+      (function nextRow() {
+        if (rowIndex >= rows.length) {
+          marks.quantities_set = now();
+          settle('continue_enabled', function () { return continueEnabled(document.querySelector(cfg.continueSelector)); },
+                 cfg.timeouts.continueEnabled, cfg.delays.afterQtySet, function () {
+            var button = document.querySelector(cfg.continueSelector);
+            if (!button) { finish(false, 'continue', 'continue button not found'); return; }
+            href = location.href;
+            button.click();
+            marks.continue_clicked = now();
+            finish(true, 'done');
+          });
+          return;
+        }
+        var spec = rows[rowIndex++];
+        if (spec.count <= 0) { nextRow(); return; }
+        waitFor(function () { return findRow(tariffs, spec.text); }, cfg.rowTimeoutMs, function (row) {
+          var plus = row.querySelector(cfg.plusSelector);
+          if (!plus) { finish(false, 'quantity', 'plus button missing for ' + spec.key); return; }
+          var clicks = 0, before = quantityValue(row, cfg.quantitySelector);
+          (function click() {
+            plus.click();
+            clicks += 1;
+            var expected = before === null ? null : before + clicks, last = clicks >= spec.count;
+            var check = expected === null ? null : function () {
+              var value = quantityValue(row, cfg.quantitySelector);
+              return value !== null && value >= expected;
+            };
+            // With fixed delays the last click is followed by the pause between ticket types;
+            // with a readable counter its update wait covers that pause too
+            if (last && !(cfg.stateWaits && check)) { later(rowIndex < rows.length ? cfg.delays.betweenQtySet : 0, nextRow); return; }
+            settle('quantity_update', check, cfg.timeouts.quantityUpdate, cfg.delays.betweenPlusClicks, last ? nextRow : click);
+          })();
+        }, function () { finish(false, 'quantity', 'tariff row not found for ' + spec.key); });
+      })();
+    }, function () { finish(false, 'tariff', 'ticket type container not rendered'); });
+  });
+}, function () { finish(false, 'container', 'slot container not present'); });
+"""
+
+# Evaluates one expression of a SelectorPlan. The plan's XPaths are compiled once per document
+# with document.createExpression and cached on window; a reload or a new plan id recompiles them.
+# Arguments: plan {id, xpaths}, expression name, context node (or null for document), first-only flag.
+PLAN_EVALUATE_JS = """
+var plan = arguments[0], name = arguments[1], context = arguments[2] || document, firstOnly = arguments[3];
+var cache = window.__cftSelectorPlan;
+if (!cache || cache.id !== plan.id) {
+  cache = {id: plan.id, expressions: {}};
+  for (var key in plan.xpaths) cache.expressions[key] = document.createExpression(plan.xpaths[key], null);
+  window.__cftSelectorPlan = cache;
+}
+var expression = cache.expressions[name];
+if (firstOnly) return expression.evaluate(context, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+var snapshot = expression.evaluate(context, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+var nodes = [];
+for (var i = 0; i < snapshot.snapshotLength; i++) nodes.push(snapshot.snapshotItem(i));
+return nodes;
+"""
+
+
+# --- Selector Plan ---
+
+SlotPreference = namedtuple("SlotPreference", ["language", "time", "full_price", "reduced_fare"])
+
+
+def build_slot_preferences(preferences, default_language, default_time):
+    """Validates SLOT_PREFERENCES into SlotPreference tuples (best first).
+
+    Entries with an unknown language, no time or no tickets are logged and skipped; an entry that is
+    not a dict or has a non-integer ticket count raises ValueError naming it.
+    """
+    entries = preferences or [{"language": default_language, "time": default_time}]
+    result = []
+    for rank, entry in enumerate(entries, start=1):
+        if not isinstance(entry, dict):
+            raise ValueError(f"Slot preference #{rank} {entry!r} must be a dict with language/time/full_price/reduced_fare.")
+        language = str(entry.get("language", default_language)).upper()
+        slot_time = str(entry.get("time", "")).strip()
+        try:
+            counts = (int(entry.get("full_price", FULL_PRICE_TICKETS)), int(entry.get("reduced_fare", REDUCED_PRICE_TICKETS)))
+        except (TypeError, ValueError):
+            raise ValueError(f"Slot preference #{rank} {entry!r}: full_price and reduced_fare must be whole numbers.") from None
+        if language not in LANGUAGE_MAPPINGS["english"] or not slot_time:
+            logging.error(f"Ignoring slot preference #{rank} {entry!r}: unknown language or missing time.")
+            continue
+        if min(counts) < 0 or sum(counts) == 0:
+            logging.error(f"Ignoring slot preference #{rank} {entry!r}: needs a positive total ticket count.")
+            continue
+        result.append(SlotPreference(language, slot_time, *counts))
+    if not result:
+        raise ValueError("No usable slot preference configured.")
+    return result
+
+
+class SelectorPlan:
+    """Every text and locator the fast loop needs for one site language, built once.
+
+    `xpaths` maps expression names to the XPaths that PLAN_EVALUATE_JS compiles in the page.
+    """
+
+    TICKET_KEYS = ("full_price", "reduced_fare")
+
+    def __init__(self, site_language, preferences):
+        texts = TEXT_MAPPINGS[site_language]
+        self.site_language = site_language
+        self.preferences = list(preferences)
+        self.activity_text = texts["activity_in"].lower()
+        self.ticket_texts = {key: texts[key].lower() for key in self.TICKET_KEYS}
+        self.id = f"{site_language}|" + ";".join(f"{p.language}@{p.time}" for p in self.preferences)
+
+        self.xpaths = {}
+        for key, text in self.ticket_texts.items():
+            self.xpaths[f"row_{key}"] = TICKET_ROW_XPATH_TEMPLATE.format(text)
+
+    def page_arg(self):
+        """The plan as passed to PLAN_EVALUATE_JS."""
+        return {"id": self.id, "xpaths": self.xpaths}
+
+    def slot_resolution_arg(self):
+        """The resolver config passed to SLOT_RESOLUTION_JS (ranked preferences in this site language)."""
+        return {
+            "preferences": [{"sections": [[self.activity_text, LANGUAGE_MAPPINGS[self.site_language][p.language].lower()]],
+                             "slotTime": p.time} for p in self.preferences],
+            "checkVisible": True,
+        }
+
+    def ticket_rows(self, preference):
+        """Tariff rows to fill for `preference`, in PURCHASE_SEQUENCE_JS format."""
+        return [{"key": key, "text": self.ticket_texts[key], "count": getattr(preference, key)} for key in self.TICKET_KEYS]
 
 
 #ColosseumTicketBot Class
@@ -180,6 +1906,30 @@ class ColosseumTicketBot:
     def __init__(self):
         self.driver = None
         self.attempt_count = 0
+        self.interactive = True # Set False to skip the input() prompts (offline benchmarks)
+        self.stop_requested = threading.Event() # Set by the orchestrator watchdog; the refresh and fast loops exit on it
+        self.milestones = {} # Milestone name -> wall-clock epoch seconds, for latency reporting
+        self.clock_offset = 0.0 # Reference clock - local clock (seconds), see sync_clock()
+        self.clock_estimate = None
+        self.refresh_scheduler = None # PeriodicScheduler of the last micro-refresh window
+        self.cdp = None # CdpTransport when USE_DIRECT_CDP is on and the websocket connected
+        self._selector_plan = None # See the selector_plan property
+        self.startup_timings = {} # Phase -> seconds (driver_resolve, browser_launch, clock_sync, ...)
+        self.clock_resync_durations = [] # Seconds per sync_clock() after the first (re-syncs while armed)
+        self.reload_durations = deque(maxlen=20) # Seconds per completed lifecycle reload (timeout estimate)
+        self.reload_log = [] # One dict per reload of the last micro-refresh window
+        self.network_policy = NetworkPolicy(NETWORK_BLOCK_PATTERNS, NETWORK_ALLOW_PATTERNS) if NETWORK_POLICY_ENABLED else None
+        self.network_interceptor = None # NetworkInterceptor when the policy needs allow exceptions
+        self.network_baseline = {} # Resource URL -> transfer bytes of an unblocked load
+        self.page_weights = {} # Context ("initial load", ...) -> page_weight() summary
+        self.dom_recorder = DomSnapshotRecorder(DOM_SNAPSHOT_DIR) if DOM_SNAPSHOT_ENABLED else None
+        self.state_waits = [] # (step, waited s, fixed delay s, reached) of the current fast-loop attempt
+        self.continue_page_url = None # location.href when the continue button became enabled
+        self.readiness = None # Measurements and applied values of the last readiness_check()
+        self.refresh_count = 0 # Full reloads of the last micro-refresh window
+        self.cpu_tuning = None # Cores, nice values and before/after measurements of apply_cpu_tuning()
+        self.run_started_at = None # datetime of prepare_run()
+        self._jitter_marks = {} # DEADLINE_WAITER samples per label before this run (see run_jitter())
         self.site_language = "english" # Default assumption
         self.rome_tz = pytz.timezone(ROME_TIMEZONE)
         self.target_date_dt = datetime.strptime(TARGET_DATE, "%Y-%m-%d").date()
@@ -187,6 +1937,8 @@ class ColosseumTicketBot:
         self.desired_slot_time_str = self.activation_dt_rome.strftime("%#I:%M %p" if sys.platform != 'win32' else "%#I:%M %p").strip() # Format like "9:00 AM" - adjust format code if needed
         logging.info(f"Target Rome Activation: {self.activation_dt_rome.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]} Rome Time")
         logging.info(f"Desired Slot Text (Exact Match Target): '{self.desired_slot_time_str}'")
+        self.slot_preferences = build_slot_preferences(SLOT_PREFERENCES, PREFERRED_LANGUAGE, self.desired_slot_time_str)
+        self.active_preference = self.slot_preferences[0] # Entry whose slot was clicked (drives quantities)
         logging.info("ColosseumTicketBot initialized.")
 
     def _calculate_activation_dt(self):
@@ -200,29 +1952,161 @@ class ColosseumTicketBot:
             logging.critical(f"Error parsing TARGET_DATE ('{TARGET_DATE}') or ACTIVATION_TIME ('{ACTIVATION_TIME}'): {e}")
             raise
 
+    def sync_clock(self, source=None):
+        """Estimates the local clock offset against the configured reference and logs it.
+
+        The offset is applied to every deadline when CLOCK_SYNC_APPLY_OFFSET is set.
+        """
+        if source is None:
+            if CLOCK_SYNC_SOURCE == "http":
+                source = http_date_clock_source(CLOCK_SYNC_HTTP_URL)
+            else:
+                source = ntp_clock_source(CLOCK_SYNC_NTP_SERVER)
+        started = time.perf_counter()
+        estimate = ClockSync(source, samples=CLOCK_SYNC_SAMPLES).estimate()
+        elapsed = time.perf_counter() - started
+        if "clock_sync" in self.startup_timings:
+            self.clock_resync_durations.append(elapsed)
+        else:
+            self.startup_timings["clock_sync"] = elapsed # Only the first sync is part of startup
+        if estimate is None:
+            logging.error(f"Clock sync against {getattr(source, 'description', source)} failed: no usable samples. Using the local clock as-is.")
+            return None
+
+        self.clock_estimate = estimate
+        logging.info(f"Clock offset vs {estimate.source}: {estimate.offset * 1000:+.1f}ms "
+                     f"(+/- {estimate.uncertainty * 1000:.1f}ms, min RTT {estimate.min_rtt * 1000:.1f}ms, "
+                     f"{estimate.samples_used}/{estimate.samples_total} samples)")
+        if abs(estimate.offset) > CLOCK_SYNC_WARN_OFFSET:
+            logging.warning(f">>> LOCAL CLOCK IS OFF BY {estimate.offset * 1000:+.0f}ms! Check NTP on this machine.")
+        if CLOCK_SYNC_APPLY_OFFSET:
+            self.clock_offset = estimate.offset
+            logging.info(f"Deadlines will be corrected by {self.clock_offset * 1000:+.1f}ms.")
+        return estimate
+
+    @property
+    def selector_plan(self):
+        """SelectorPlan for the current site_language; rebuilt only when the detected language changes."""
+        plan = self._selector_plan
+        if plan is None or plan.site_language != self.site_language:
+            plan = self._selector_plan = SelectorPlan(self.site_language, self.slot_preferences)
+            logging.info(f"Selector plan built for site language '{self.site_language}' ({len(plan.xpaths)} expressions).")
+        return plan
+
+    def plan_find(self, name, context=None, first=False):
+        """Evaluates a compiled plan expression in the page: a list of elements, or one element/None with first=True."""
+        return self.driver.execute_script(PLAN_EVALUATE_JS, self.selector_plan.page_arg(), name, context, first)
+
+    def record_dom(self, state):
+        """DOM snapshot of the current page state when DOM_SNAPSHOT_ENABLED."""
+        if self.dom_recorder is not None:
+            self.dom_recorder.record(self.driver, state, {"site_language": self.site_language, "attempt": self.attempt_count})
+
+    def wait_for_state(self, step, condition, timeout, fixed_delay):
+        """Polls `condition(driver)` until truthy or `timeout` expires, in place of sleeping `fixed_delay`.
+
+        Returns the condition's value (None on timeout); the wait is logged against the delay it replaces.
+        Stale elements and in-page script errors (e.g. a re-rendering widget) count as "not yet" and are polled again.
+        """
+        started = time.perf_counter()
+        try:
+            result = WebDriverWait(self.driver, timeout, poll_frequency=STATE_WAIT_POLL,
+                                   ignored_exceptions=(StaleElementReferenceException, JavascriptException)).until(condition)
+        except TimeoutException:
+            result = None
+        self.note_state_wait(step, time.perf_counter() - started, fixed_delay, result is not None)
+        return result
+
+    def note_state_wait(self, step, waited, fixed_delay, reached=True):
+        """Records and logs one post-action wait (seconds) next to the fixed delay it replaced."""
+        self.state_waits.append((step, waited, fixed_delay, reached))
+        if reached:
+            logging.info("State '%s' reached after %.1fms (fixed delay %.0fms, saved %.1fms).",
+                         step, waited * 1000, fixed_delay * 1000, (fixed_delay - waited) * 1000)
+        else:
+            logging.warning("State '%s' not reached within %.0fms (fixed delay %.0fms), continuing.",
+                            step, waited * 1000, fixed_delay * 1000)
+
+    def log_state_wait_summary(self):
+        """Logs the post-action waits of the winning attempt against the fixed delays they replaced."""
+        if not self.state_waits:
+            return
+        waited = sum(w for _, w, _, _ in self.state_waits)
+        fixed = sum(f for _, _, f, _ in self.state_waits)
+        capped = sum(1 for *_, reached in self.state_waits if not reached)
+        logging.info("Post-action waits: %.1fms over %d steps instead of %.0fms of fixed delays (saved %.1fms, %d capped).",
+                     waited * 1000, len(self.state_waits), fixed * 1000, (fixed - waited) * 1000, capped)
+
+    def log_startup_breakdown(self, started):
+        """Logs where the time between `started` (perf_counter) and now went during startup."""
+        total = time.perf_counter() - started
+        parts = ", ".join(f"{name.replace('_', ' ')} {seconds * 1000:.0f}ms" for name, seconds in self.startup_timings.items())
+        logging.info(f"Startup ready in {total * 1000:.0f}ms ({parts or 'no phases recorded'}).")
+        self.startup_timings["total"] = total
+
+    def reference_now(self):
+        """Current time on the reference clock, in Rome time."""
+        return datetime.now(self.rome_tz) + timedelta(seconds=self.clock_offset)
+
+    def mark_milestone(self, name):
+        """Records the wall-clock time of a hot-path milestone (container detected, slot clicked, ...)."""
+        self.milestones[name] = time.time()
+
+    @TRACER.traced("setup_driver")
     def setup_driver(self):
         """Sets up the WebDriver (UC or Standard Selenium)."""
         logging.info(f"Setting up {'undetected' if USE_UNDETECTED else 'standard'} chromedriver...")
         try:
             if USE_UNDETECTED:
-                options = uc.ChromeOptions()
-                # options.add_argument("--headless") # Headless might be detected more easily, run headed on VPS
-                options.add_argument("--start-maximized")
-                options.add_argument("--lang=en-US")
-                # Minimal set of args known to work well with UC
-                options.add_argument('--disable-gpu')
-                options.add_argument('--no-sandbox')
-                options.add_argument('--disable-dev-shm-usage')
-                # Suppress logs
-                options.add_argument('--disable-logging')
-                options.add_argument('--log-level=3')
-                options.add_experimental_option("prefs", {"intl.accept_languages": "en,en_US"})
-                self.driver = uc.Chrome(options=options, use_subprocess=True, version_main=140) # Specify version if needed
+                def uc_options(): # uc refuses to reuse an options object, so a retry needs a fresh one
+                    options = uc.ChromeOptions()
+                    # options.add_argument("--headless") # Headless might be detected more easily, run headed on VPS
+                    options.add_argument("--start-maximized")
+                    options.add_argument("--lang=en-US")
+                    if MICRO_REFRESH_MODE == "lifecycle" and REFRESH_LIFECYCLE_EVENT == "domcontentloaded":
+                        options.page_load_strategy = "eager" # Navigations return at DOMContentLoaded
+                    if BROWSER_HEADLESS:
+                        options.add_argument("--headless=new")
+                    # Minimal set of args known to work well with UC
+                    options.add_argument('--disable-gpu')
+                    options.add_argument('--no-sandbox')
+                    options.add_argument('--disable-dev-shm-usage')
+                    # Suppress logs
+                    options.add_argument('--disable-logging')
+                    options.add_argument('--log-level=3')
+                    options.add_experimental_option("prefs", {"intl.accept_languages": "en,en_US"})
+                    return options
+
+                started = time.perf_counter()
+                cached_path = cached_driver_path("uc", DRIVER_CACHE_FILE) if FAST_START else None
+                self.startup_timings["driver_resolve"] = time.perf_counter() - started
+                started = time.perf_counter()
+                try:
+                    # An already patched binary is used as-is (no download, no re-patch)
+                    self.driver = uc.Chrome(options=uc_options(), use_subprocess=True, version_main=140, # Specify version if needed
+                                            driver_executable_path=cached_path)
+                except WebDriverException:
+                    if not cached_path:
+                        raise
+                    logging.warning("Cached undetected chromedriver failed to start Chrome (version mismatch?). Re-resolving it.")
+                    forget_driver_path("uc", DRIVER_CACHE_FILE)
+                    cached_path = None
+                    self.driver = uc.Chrome(options=uc_options(), use_subprocess=True, version_main=140)
+                self.startup_timings["browser_launch"] = time.perf_counter() - started
+                if FAST_START and not cached_path:
+                    try:
+                        store_driver_path("uc", self.driver.patcher.executable_path, DRIVER_CACHE_FILE, DRIVER_CACHE_DIR)
+                    except AttributeError as e: # Patcher layout differs between uc versions
+                        logging.warning(f"Could not cache the patched chromedriver: {e}")
             else:
                 # Standard Selenium setup (less likely to bypass detection)
                 chrome_options = Options()
                 chrome_options.add_argument("--start-maximized")
                 chrome_options.add_argument("--lang=en-US")
+                if MICRO_REFRESH_MODE == "lifecycle" and REFRESH_LIFECYCLE_EVENT == "domcontentloaded":
+                    chrome_options.page_load_strategy = "eager" # Navigations return at DOMContentLoaded
+                if BROWSER_HEADLESS:
+                    chrome_options.add_argument("--headless=new")
                 chrome_options.add_experimental_option("prefs", {"intl.accept_languages": "en,en_US"})
                 chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
                 chrome_options.add_experimental_option('useAutomationExtension', False)
@@ -232,14 +2116,36 @@ class ColosseumTicketBot:
                 chrome_options.add_argument('--disable-dev-shm-usage')
                 chrome_options.add_argument('--disable-logging')
                 chrome_options.add_argument('--log-level=3')
-                service = Service(ChromeDriverManager().install())
-                self.driver = webdriver.Chrome(service=service, options=chrome_options)
+                started = time.perf_counter()
+                cached_path = cached_driver_path("standard", DRIVER_CACHE_FILE) if FAST_START else None
+                driver_path = cached_path or ChromeDriverManager().install()
+                self.startup_timings["driver_resolve"] = time.perf_counter() - started
+                started = time.perf_counter()
+                try:
+                    self.driver = webdriver.Chrome(service=Service(driver_path), options=chrome_options)
+                except WebDriverException:
+                    if not cached_path:
+                        raise
+                    logging.warning("Cached chromedriver failed to start Chrome (version mismatch?). Re-resolving it.")
+                    forget_driver_path("standard", DRIVER_CACHE_FILE)
+                    driver_path, cached_path = ChromeDriverManager().install(), None
+                    self.driver = webdriver.Chrome(service=Service(driver_path), options=chrome_options)
+                self.startup_timings["browser_launch"] = time.perf_counter() - started
+                if FAST_START and not cached_path:
+                    store_driver_path("standard", driver_path, DRIVER_CACHE_FILE)
                 self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
 
             logging.info("WebDriver initialized successfully.")
-            self.driver.set_page_load_timeout(15) # Timeout for initial page loads
+            self.driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+            self.driver.set_script_timeout(ASYNC_SCRIPT_TIMEOUT) # In-page scripts enforce their own shorter limits
             # Consider setting implicit wait low globally, but explicit waits are generally better
             # self.driver.implicitly_wait(0.5)
+            if USE_DIRECT_CDP:
+                self.connect_cdp()
+            if self.network_policy is not None:
+                self.apply_network_policy()
+            if CPU_TUNING_ENABLED:
+                self.apply_cpu_tuning()
         except WebDriverException as e:
             logging.error(f"WebDriver setup failed: {e}", exc_info=True)
             if "permission denied" in str(e).lower():
@@ -249,6 +2155,235 @@ class ColosseumTicketBot:
             logging.error(f"Unexpected error setting up WebDriver: {e}", exc_info=True)
             raise
 
+    def connect_cdp(self):
+        """Opens the direct DevTools websocket; on any failure the bot keeps using WebDriver."""
+        if not HAS_WEBSOCKET_CLIENT:
+            logging.warning("USE_DIRECT_CDP is set but websocket-client is not installed. Using WebDriver transport.")
+            return None
+        try:
+            self.cdp = CdpTransport.from_driver(self.driver).connect()
+            logging.info(f"Direct CDP transport connected ({self.cdp.ws_url}).")
+        except Exception as e:
+            logging.warning(f"Direct CDP transport unavailable ({type(e).__name__}: {e}). Using WebDriver transport.")
+            self.cdp = None
+        return self.cdp
+
+    def apply_network_policy(self):
+        """Installs the network policy on the current tab (Fetch interceptor if allow patterns need exceptions)."""
+        policy = self.network_policy
+        if policy.allow_patterns:
+            if not HAS_WEBSOCKET_CLIENT:
+                logging.warning("Network policy has allow patterns but websocket-client is not installed. Policy NOT applied.")
+                return False
+            try:
+                self.network_interceptor = NetworkInterceptor(CdpTransport.from_driver(self.driver), policy).start()
+            except Exception as e:
+                # Blocking without the exceptions could hide the CAPTCHA, so rather load everything
+                logging.warning(f"Network policy interceptor unavailable ({type(e).__name__}: {e}). Policy NOT applied.")
+                self.network_interceptor = None
+                return False
+            logging.info(f"Network policy active: {len(policy.block_patterns)} block / {len(policy.allow_patterns)} allow patterns (Fetch interception).")
+            return True
+        try:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": policy.block_patterns})
+        except WebDriverException as e:
+            logging.warning(f"Could not apply the network policy: {e}")
+            return False
+        logging.info(f"Network policy active: {len(policy.block_patterns)} block patterns (Chrome blocklist).")
+        return True
+
+    def apply_cpu_tuning(self, measure=True):
+        """Pins and prioritizes this process and the browser tree (CPU_TUNING_ENABLED, Linux only).
+
+        With `measure`, wake-up jitter and chromedriver round trips are logged before and after.
+        Call again (measure=False) to cover browser processes started since.
+        """
+        if not sys.platform.startswith("linux"):
+            logging.warning("CPU_TUNING_ENABLED is only supported on Linux. Skipped.")
+            return None
+        available = os.sched_getaffinity(0)
+        auto_bot, auto_browser = default_core_split(available)
+        bot_cores = set(CPU_BOT_CORES if CPU_BOT_CORES is not None else auto_bot or ())
+        browser_cores = set(CPU_BROWSER_CORES if CPU_BROWSER_CORES is not None else auto_browser or ())
+        if not bot_cores <= available or not browser_cores <= available:
+            logging.warning(f"CPU tuning: cores outside this machine's allowed set {sorted(available)}. Skipped.")
+            return None
+        nice = lowest_allowed_nice(CPU_NICE)
+
+        before = self._cpu_measurements("before CPU tuning") if measure else None
+        bot_threads, bot_error = tune_process(os.getpid(), bot_cores, nice)
+        browser_pids = descendant_pids(os.getpid())
+        browser_threads, browser_error = 0, None
+        for pid in browser_pids:
+            threads, error = tune_process(pid, browser_cores, nice)
+            browser_threads += threads
+            browser_error = browser_error or error
+        for error in filter(None, (bot_error, browser_error)):
+            logging.warning(f"CPU tuning partly failed: {error}")
+        logging.info(f"CPU tuning: bot {bot_threads} threads on cores {sorted(bot_cores) or 'unchanged'}, "
+                     f"browser {len(browser_pids)} processes / {browser_threads} threads on cores {sorted(browser_cores) or 'unchanged'}, "
+                     f"nice {nice}" + (f" (CPU_NICE {CPU_NICE} not allowed)" if nice != CPU_NICE else "") + ".")
+        if measure:
+            after = self._cpu_measurements("after CPU tuning")
+            self.cpu_tuning = {"bot_cores": sorted(bot_cores), "browser_cores": sorted(browser_cores), "nice": nice,
+                               "browser_processes": len(browser_pids), "before": before, "after": after}
+        return nice
+
+    def _cpu_measurements(self, label):
+        """Logs the wake-up jitter histogram and chromedriver round trips; returns their percentiles (us / ms)."""
+        waiter = measure_wakeup_jitter(label)
+        jitter_us = [ns / 1000.0 for ns in waiter.overshoots_ns[label]]
+        command_ms = []
+        if self.driver is not None:
+            for _ in range(50):
+                started = time.perf_counter()
+                self.driver.execute_script("return 1")
+                command_ms.append((time.perf_counter() - started) * 1000)
+        logging.info(f"Wake-up jitter {label}: p50 {nearest_rank(jitter_us, 0.5):.0f}us, p99 {nearest_rank(jitter_us, 0.99):.0f}us, "
+                     f"max {max(jitter_us):.0f}us; histogram: {waiter.format_histogram(label)}")
+        logging.info(f"chromedriver round trip {label}: {describe_latencies(command_ms)}")
+        return {"jitter_p50_us": nearest_rank(jitter_us, 0.5), "jitter_p99_us": nearest_rank(jitter_us, 0.99), "jitter_max_us": max(jitter_us),
+                "command_p50_ms": nearest_rank(command_ms, 0.5) if command_ms else None,
+                "command_p99_ms": nearest_rank(command_ms, 0.99) if command_ms else None}
+
+    def set_network_policy_active(self, active):
+        """Temporarily lifts (False) or restores (True) the network policy."""
+        if self.network_interceptor is not None:
+            self.network_interceptor.active = active
+        else:
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.network_policy.block_patterns if active else []})
+
+    def page_weight(self):
+        """Requests and transfer bytes of the current document, and the resource URLs the policy blocked."""
+        try:
+            weight = self.driver.execute_script(PAGE_WEIGHT_JS)
+        except WebDriverException as e:
+            logging.debug(f"Page weight unavailable: {e}")
+            return None
+        requests, total_bytes, blocked = 1, weight["document"] or 0, set()
+        for name, size in weight["resources"]:
+            if self.network_policy is not None and self.network_policy.blocks(name):
+                blocked.add(name) # Still listed by Resource Timing, with no bytes
+            else:
+                requests += 1
+                total_bytes += size or 0
+        return {"requests": requests, "bytes": total_bytes, "blocked": sorted(blocked),
+                "sizes": dict(weight["resources"])}
+
+    def measure_network_baseline(self, url):
+        """One load of `url` with the policy lifted, to learn what each blocked resource weighs."""
+        self.set_network_policy_active(False)
+        try:
+            self.driver.get(url)
+            weight = self.page_weight()
+        finally:
+            self.set_network_policy_active(True)
+        if weight:
+            self.network_baseline = weight["sizes"]
+            logging.info("Network baseline (policy lifted): %d requests, %.1f KiB.",
+                         1 + len(weight["sizes"]), (weight["bytes"] + sum(self.network_baseline[u] for u in weight["blocked"])) / 1024)
+
+    def log_page_weight(self, context):
+        """Logs requests/bytes of the current load and what the network policy saved on it."""
+        weight = self.page_weight()
+        if weight is None:
+            return None
+        summary = {"requests": weight["requests"], "kib": weight["bytes"] / 1024, "blocked_requests": len(weight["blocked"])}
+        if self.network_policy is None:
+            logging.info("Page weight (%s): %d requests, %.1f KiB.", context, summary["requests"], summary["kib"])
+        else:
+            saved = "" # Bytes are only known from an unblocked baseline load
+            if self.network_baseline:
+                summary["saved_kib"] = sum(self.network_baseline.get(u, 0) for u in weight["blocked"]) / 1024
+                saved = f", ~{summary['saved_kib']:.1f} KiB saved"
+            logging.info("Page weight (%s): %d requests, %.1f KiB; network policy blocked %d requests%s.",
+                         context, summary["requests"], summary["kib"], summary["blocked_requests"], saved)
+        self.page_weights[context] = summary
+        return summary
+
+    def _cdp_failed(self, e):
+        """Drops the CDP transport after a connection error so later calls go through WebDriver."""
+        logging.warning("Direct CDP call failed (%s). Falling back to WebDriver transport.", e)
+        self.cdp.close()
+        self.cdp = None
+
+    def reload_page(self):
+        """Hard reload via CDP (returns once DOMContentLoaded fired) or via WebDriver JS."""
+        if self.cdp is not None:
+            try:
+                self.cdp.reload(ignore_cache=True)
+                return True
+            except CdpConnectionError as e:
+                self._cdp_failed(e)
+            except CdpError as e:
+                logging.warning("CDP reload failed: %s", e)
+                return False
+        return js_reload(self.driver)
+
+    def navigation_timing(self):
+        """Navigation Timing (ms: ttfb, dcl, load, transfer_size bytes) of the current document, or None."""
+        try:
+            if self.cdp is not None:
+                return self.cdp.run_script(NAVIGATION_TIMING_JS)
+            return self.driver.execute_script(NAVIGATION_TIMING_JS)
+        except Exception as e:
+            logging.debug(f"Navigation timing unavailable: {e}")
+            return None
+
+    def lifecycle_reload_timeout(self):
+        """Per-reload timeout from the measured reload durations (REFRESH_TIMEOUT_MAX until measured)."""
+        if not self.reload_durations:
+            return REFRESH_TIMEOUT_MAX
+        ordered = sorted(self.reload_durations)
+        p90 = ordered[min(len(ordered) - 1, int(0.9 * len(ordered)))]
+        return min(REFRESH_TIMEOUT_MAX, max(REFRESH_TIMEOUT_MIN, p90 * REFRESH_TIMEOUT_FACTOR))
+
+    def lifecycle_reload(self, timeout):
+        """Reloads and blocks until REFRESH_LIFECYCLE_EVENT of the new document or `timeout`.
+
+        Returns the outcome: the event waited for ("domcontentloaded"/"load", see webdriver_load_event()
+        without CDP), "timeout" or "error". Without CDP, `timeout` is the caller's page load timeout.
+        """
+        if self.cdp is not None:
+            event = "Page.domContentEventFired" if REFRESH_LIFECYCLE_EVENT == "domcontentloaded" else "Page.loadEventFired"
+            try:
+                return REFRESH_LIFECYCLE_EVENT if self.cdp.reload(wait_event=event, timeout=timeout) else "timeout"
+            except CdpConnectionError as e:
+                self._cdp_failed(e)
+            except CdpError as e:
+                logging.warning("CDP reload failed: %s", e)
+                return "error"
+        try:
+            # driver.refresh() returns at the page load strategy's event ("eager" = DOMContentLoaded),
+            # bounded by the page load timeout set for the refresh window
+            self.driver.refresh()
+            return self.webdriver_load_event()
+        except TimeoutException:
+            return "timeout"
+        except WebDriverException as e:
+            logging.warning("Reload failed: %s", type(e).__name__)
+            return "error"
+
+    @staticmethod
+    def webdriver_load_event():
+        """Lifecycle event driver.refresh() returns at, from the page load strategy setup_driver() chose."""
+        eager = MICRO_REFRESH_MODE == "lifecycle" and REFRESH_LIFECYCLE_EVENT == "domcontentloaded"
+        return "domcontentloaded" if eager else "load"
+
+    def run_async_script(self, script, *args):
+        """execute_async_script over CDP when connected (JSON args only), else WebDriver."""
+        if self.cdp is not None:
+            try:
+                return self.cdp.run_async_script(script, *args, timeout=ASYNC_SCRIPT_TIMEOUT)
+            except CdpConnectionError as e:
+                self._cdp_failed(e)
+                raise TimeoutException(str(e)) from e # Never re-run a half-executed script
+            except CdpError as e:
+                # JS exception or navigation destroying the context: same surface as WebDriver
+                raise WebDriverException(str(e)) from e
+        return self.driver.execute_async_script(script, *args)
+
     def quick_check_element(self, by, value, timeout=0.1):
         """Very fast check for element presence, minimal wait."""
         try:
@@ -261,9 +2396,50 @@ class ColosseumTicketBot:
         except Exception: # Catch broader errors during quick check
             return False
 
-    def wait_and_click(self, element_or_locator, timeout=FAST_LOOP_WAIT_TIMEOUT):
-        """Waits for element to be clickable and clicks using JS."""
+    def wait_for_container_event(self, timeout=0.1):
+        """Blocks in one async script until the primary container has a selectable slot.
+
+        Returns the in-page epoch timestamp (seconds) of the detection, or None on timeout/error.
+        """
+        try:
+            result = self.run_async_script(
+                CONTAINER_OBSERVER_JS, PRIMARY_CONTAINER_SELECTOR, SELECTABLE_SLOT_LABEL_CSS, int(timeout * 1000)
+            )
+        except Exception: # Page unloading mid-script, timeout, ... -> treat as not found
+            return None
+        if isinstance(result, dict) and result.get("found"):
+            return result["ts"] / 1000.0
+        return None
+
+    def detect_primary_container(self, timeout=0.1):
+        """Checks for the primary container (observer or polling mode).
+
+        Returns the epoch time of the detection, or None if the container did not show up.
+        """
+        if USE_MUTATION_OBSERVER_DETECTION:
+            return self.wait_for_container_event(timeout)
+        if self.cdp is not None:
+            deadline = time.perf_counter() + timeout
+            try:
+                while True:
+                    if self.cdp.query_selector_exists(PRIMARY_CONTAINER_SELECTOR):
+                        return time.time()
+                    if time.perf_counter() >= deadline:
+                        return None
+                    time.sleep(0.005) # A CDP round trip is cheap, poll far tighter than WebDriverWait
+            except CdpConnectionError as e:
+                self._cdp_failed(e)
+            except CdpError: # e.g. context destroyed by a navigation
+                return None
+        if self.quick_check_element(By.CSS_SELECTOR, PRIMARY_CONTAINER_SELECTOR, timeout=timeout):
+            return time.time()
+        return None
+
+    def wait_and_click(self, element_or_locator, timeout=None):
+        """Waits for element to be clickable and clicks using JS (timeout defaults to FAST_LOOP_WAIT_TIMEOUT)."""
         el_desc = str(element_or_locator)[:100]
+        if timeout is None:
+            timeout = FAST_LOOP_WAIT_TIMEOUT
         try:
             wait = WebDriverWait(self.driver, timeout, poll_frequency=0.05) # Faster polling
             element = None
@@ -274,7 +2450,7 @@ class ColosseumTicketBot:
                 element = element_or_locator # Assume it's already a found element
 
             if not element:
-                 logging.warning(f"Could not resolve element for clicking: {el_desc}")
+                 logging.warning("Could not resolve element for clicking: %s", el_desc)
                  return False
 
             # Attempt JS click directly - often faster/more reliable
@@ -282,7 +2458,7 @@ class ColosseumTicketBot:
             return True
 
         except StaleElementReferenceException:
-            logging.warning(f"Stale element encountered when trying to click {el_desc}. Retrying find/click might be needed.")
+            logging.warning("Stale element encountered when trying to click %s. Retrying find/click might be needed.", el_desc)
             return False # Signal failure to allow retry logic in the caller
         except TimeoutException:
             # Logging this can be noisy, only log if debugging is needed
@@ -290,12 +2466,12 @@ class ColosseumTicketBot:
             return False
         except (ElementNotInteractableException, ElementClickInterceptedException) as e:
              # JS click might still work even if Selenium deems it not interactable
-             logging.warning(f"{type(e).__name__} for {el_desc}, JS click was attempted.")
+             logging.warning("%s for %s, JS click was attempted.", type(e).__name__, el_desc)
              # We assume the JS click attempt in the 'try' block might have succeeded or failed silently
              # Returning True here is optimistic, False might be safer depending on how critical the click is
              return True # Optimistic, adjust if needed
         except Exception as e:
-            logging.error(f"Error in wait_and_click ({el_desc}): {e}")
+            logging.error("Error in wait_and_click (%s): %s", el_desc, e)
             return False
 
     def detect_site_language(self):
@@ -335,262 +2511,501 @@ class ColosseumTicketBot:
             logging.warning(f"Error detecting site language: {e}. Using current: {self.site_language}.")
             return self.site_language
 
+    @TRACER.traced("handle_initial_load")
     def handle_initial_load(self, url):
         """Loads page, handles manual CAPTCHA step."""
         logging.info(f"Loading URL: {url}")
         try:
+            if self.network_policy is not None and NETWORK_POLICY_BASELINE and not self.network_baseline:
+                self.measure_network_baseline(url)
             self.driver.get(url)
         except Exception as e:
             logging.error(f"Error loading URL {url}: {e}")
             return False
 
-        print("-" * 60)
-        logging.info(">>> ACTION REQUIRED: Check browser NOW!")
-        logging.info(">>> 1. Solve any CAPTCHA / Cloudflare checks IMMEDIATELY.")
-        logging.info(">>> 2. Wait for main ticket selection elements to appear.")
-        input(">>> 3. Once page seems ready, press Enter here FAST...")
-        print("-" * 60)
-        logging.info("Resuming automation...")
+        if self.interactive:
+            flush_logs()
+            print("-" * 60)
+            logging.info(">>> ACTION REQUIRED: Check browser NOW!")
+            logging.info(">>> 1. Solve any CAPTCHA / Cloudflare checks IMMEDIATELY.")
+            logging.info(">>> 2. Wait for main ticket selection elements to appear.")
+            flush_logs()
+            input(">>> 3. Once page seems ready, press Enter here FAST...")
+            print("-" * 60)
+            logging.info("Resuming automation...")
 
         # Quick check if the primary container is visible after manual step
         time.sleep(0.1) # Tiny pause for safety
-        if self.quick_check_element(By.CSS_SELECTOR, PRIMARY_CONTAINER_SELECTOR, timeout=1.0):
+        self.log_page_weight("initial load")
+        if self.detect_primary_container(timeout=1.0):
              logging.info("Primary container found quickly after manual step.")
              self.detect_site_language() # Detect language now
+             self.record_dom("initial_load")
              return True
         else:
              logging.warning("Primary container not immediately found after manual interaction. Micro-refresh will handle it.")
+             self.record_dom("initial_load")
              # Proceed anyway, the timed refresh is the main trigger
              return True
 
+    def describe_preference_reasons(self, reasons):
+        """'#1 ENGLISH 9:00 AM: sold_out, #2 ...' for the per-preference resolver reasons."""
+        return ", ".join(f"#{rank} {p.language} {p.time}: {reason}"
+                         for rank, (p, reason) in enumerate(zip(self.slot_preferences, reasons or []), start=1))
+
+    def log_preference_win(self, rank, reasons, resolution_ms):
+        """Logs which ranked slot preference was taken, why better ones were skipped and the resolution time."""
+        preference = self.slot_preferences[rank]
+        logging.info("Slot preference #%d of %d won: %s %s (%d full / %d reduced), resolved in %.2fms.",
+                     rank + 1, len(self.slot_preferences), preference.language, preference.time,
+                     preference.full_price, preference.reduced_fare, resolution_ms or 0.0)
+        if rank > 0:
+            logging.info("Skipped higher-ranked preferences: %s", self.describe_preference_reasons((reasons or [])[:rank]))
+
+    @TRACER.traced("select_time_slot")
     def select_time_slot(self):
         """Finds and clicks the target time slot using JS."""
         try:
             # Locate the container first (use short timeout)
-            slot_container = WebDriverWait(self.driver, FAST_LOOP_WAIT_TIMEOUT, 0.05).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, TIME_SLOT_CONTAINER_SELECTOR))
-            )
-
-            # --- Option 1: Direct XPath (Potentially Faster - TEST CAREFULLY) ---
-            # lang_text_lower = LANGUAGE_MAPPINGS[self.site_language][PREFERRED_LANGUAGE].lower()
-            # time_text_target = self.desired_slot_time_str # e.g., "9:00 AM"
-            # direct_xpath = DIRECT_SLOT_XPATH_TEMPLATE.format(lang_text=lang_text_lower, time_text=time_text_target)
-            # logging.debug(f"Attempting direct slot selection with XPath: {direct_xpath}")
-            # try:
-            #     # Find the specific label directly
-            #     target_label = WebDriverWait(self.driver, 0.1, 0.05).until( # Very short wait
-            #         EC.presence_of_element_located((By.XPATH, direct_xpath))
-            #     )
-            #     logging.info(f"Found target slot '{time_text_target}' via direct XPath.")
-            #     if self.wait_and_click(target_label, timeout=0.2): # Quick click attempt
-            #         time.sleep(DELAY_AFTER_SLOT_CLICK)
-            #         return True
-            #     else:
-            #         logging.warning("Direct XPath found label, but click failed.")
-            #         return False # Or fallback to iterating?
-            # except TimeoutException:
-            #     logging.debug(f"Direct XPath target slot '{time_text_target}' not found quickly.")
-            #     # Fall through to iteration method below if direct fails
-
-            # --- Option 2: Iteration (More Robust if Direct Fails or Structure Varies) ---
-            activity_text_lower = TEXT_MAPPINGS[self.site_language]["activity_in"].lower()
-            tour_language_display_lower = LANGUAGE_MAPPINGS[self.site_language][PREFERRED_LANGUAGE].lower()
-            xpath_lower_contains = "contains(translate(normalize-space(.), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{}')"
-
-            # Find the correct language header (quickly)
-            language_header_xpath = f".//h3[contains(@class, 'lang_section')][{xpath_lower_contains.format(activity_text_lower)}][{xpath_lower_contains.format(tour_language_display_lower)}]"
-            try:
-                lang_header = WebDriverWait(slot_container, 0.2, 0.05).until(
-                    EC.presence_of_element_located((By.XPATH, language_header_xpath))
+            with TRACER.span("select_time_slot.container"):
+                slot_container = WebDriverWait(self.driver, FAST_LOOP_WAIT_TIMEOUT, 0.05).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, TIME_SLOT_CONTAINER_SELECTOR))
                 )
-                 # Find available slots *after* this specific header
-                available_slot_labels_xpath = f"{language_header_xpath}/following-sibling::label[not(contains(@class, 'unselectable'))][descendant::input[@type='radio' and not(@disabled)]]"
-                available_slot_labels = slot_container.find_elements(By.XPATH, available_slot_labels_xpath)
 
-                # Filter out slots belonging to the *next* language section if present
-                try:
-                    next_header_xpath = f"{language_header_xpath}/following-sibling::h3[contains(@class, 'lang_section')]"
-                    next_header = slot_container.find_element(By.XPATH, next_header_xpath)
-                    next_y = next_header.location['y']
-                    filtered_labels = [label for label in available_slot_labels if label.location['y'] < next_y]
-                except NoSuchElementException:
-                    filtered_labels = available_slot_labels # No next header found
-
-            except TimeoutException:
-                logging.warning(f"Language header for '{PREFERRED_LANGUAGE}' not found quickly. Checking all available slots.")
-                # Fallback: check all available slots if header fails
-                filtered_labels = slot_container.find_elements(By.XPATH, AVAILABLE_SLOT_LABEL_XPATH)
-            except Exception as e:
-                 logging.error(f"Error finding language section/slots: {e}. Checking all.")
-                 filtered_labels = slot_container.find_elements(By.XPATH, AVAILABLE_SLOT_LABEL_XPATH)
-
-
-            # Check the found labels for the exact time match
-            for label in filtered_labels:
-                try:
-                    # Check visibility quickly before getting text
-                    if not label.is_displayed(): continue
-
-                    time_span = label.find_element(By.XPATH, SLOT_TIME_TEXT_XPATH)
-                    slot_time_text = time_span.text.strip()
-
-                    # Use exact match for the desired time string
-                    if slot_time_text == self.desired_slot_time_str:
-                        logging.info(f"Found desired slot: '{slot_time_text}' for {PREFERRED_LANGUAGE}.")
-                        # Use fast JS click
-                        if self.wait_and_click(label, timeout=0.2): # Quick click
-                            time.sleep(DELAY_AFTER_SLOT_CLICK) # Minimal pause after successful click
-                            return True
-                        else:
-                            logging.warning(f"Found slot '{slot_time_text}' but failed to click.")
-                            # Maybe try standard click as fallback?
-                            # try: label.click(); time.sleep(DELAY_AFTER_SLOT_CLICK); return True
-                            # except: pass
-                            return False # Failed to click
-                except StaleElementReferenceException:
-                    logging.debug("Stale element encountered while checking slot label, skipping.")
-                    continue # Skip this stale label
-                except (NoSuchElementException, TimeoutException):
-                    continue # Skip label if time span not found quickly
-                except Exception as e_inner:
-                    logging.warning(f"Minor error processing slot label: {e_inner}", exc_info=False)
-                    continue
+            # One in-page DOM walk resolves the label (constant cost, however many slots/languages)
+            with TRACER.span("select_time_slot.resolve") as span:
+                result = self.driver.execute_script(SLOT_RESOLUTION_JS, self.selector_plan.slot_resolution_arg(), slot_container)
+                span.set(reason=result.get("reason"), scanned=result.get("scanned"))
+            label = result.get("label")
+            if label is None:
+                logging.info("No preferred slot selectable (%s; %s labels scanned in %.2fms).",
+                             self.describe_preference_reasons(result.get("reasons")), result.get("scanned"), result.get("ms") or 0.0)
+                return False
 
-            # If loop finishes without finding/clicking the exact match
-            logging.info(f"Target slot '{self.desired_slot_time_str}' for {PREFERRED_LANGUAGE} not found among available slots.")
-            return False
+            preference = self.slot_preferences[result["rank"]]
+            self.log_preference_win(result["rank"], result.get("reasons"), result.get("ms"))
+            if result.get("fallback"):
+                logging.warning("No header for any preferred language found. Matched '%s' in any section.", preference.time)
+            # Use fast JS click
+            with TRACER.span("select_time_slot.click"):
+                clicked = self.wait_and_click(label, timeout=0.2) # Quick click
+            if clicked:
+                self.active_preference = preference
+                self.mark_milestone("slot_clicked")
+                if STATE_WAITS:
+                    # Tariff picker rendered = the first row this preference needs is present
+                    key = next((k for k in SelectorPlan.TICKET_KEYS if getattr(preference, k) > 0), SelectorPlan.TICKET_KEYS[0])
+                    self.wait_for_state("tariff_render", lambda _: self.plan_find(f"row_{key}", None, first=True),
+                                        TARIFF_RENDER_TIMEOUT, DELAY_AFTER_SLOT_CLICK)
+                else:
+                    time.sleep(DELAY_AFTER_SLOT_CLICK) # Minimal pause after successful click
+                return True
+            logging.warning("Found slot '%s' but failed to click.", preference.time)
+            return False # Failed to click
 
         except TimeoutException:
             logging.debug("Time slot container not found within fast loop timeout.")
             return False # Container itself wasn't found quickly enough
+        except StaleElementReferenceException:
+            logging.debug("Slot container went stale during resolution.")
+            return False
         except Exception as e:
-            logging.error(f"Error in select_time_slot: {e}", exc_info=False)
+            logging.error("Error in select_time_slot: %s", e, exc_info=False)
             return False
 
+    @TRACER.traced("set_ticket_quantities")
     def set_ticket_quantities(self):
         """Sets ticket quantities using fast JS clicks."""
         try:
             # Wait briefly for the container
-            ticket_container = WebDriverWait(self.driver, FAST_LOOP_WAIT_TIMEOUT, 0.05).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, TICKET_TYPE_CONTAINER_SELECTOR))
-            )
+            with TRACER.span("set_ticket_quantities.container"):
+                ticket_container = WebDriverWait(self.driver, FAST_LOOP_WAIT_TIMEOUT, 0.05).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, TICKET_TYPE_CONTAINER_SELECTOR))
+                )
 
             def set_quantity(ticket_text_key, num_tickets):
                 if num_tickets <= 0: return True
-                ticket_display_text_lower = TEXT_MAPPINGS[self.site_language].get(ticket_text_key, "").lower()
-                if not ticket_display_text_lower:
-                    logging.error(f"Text mapping missing for '{ticket_text_key}' in '{self.site_language}'")
-                    return False
-
                 try:
-                    # Find the specific row for the ticket type
-                    row_xpath = TICKET_ROW_XPATH_TEMPLATE.format(ticket_display_text_lower)
+                    # Find the specific row for the ticket type (precompiled row expression of the plan)
                     # Use a short wait within the already found container
-                    ticket_row = WebDriverWait(ticket_container, 0.2, 0.05).until(
-                        EC.presence_of_element_located((By.XPATH, row_xpath))
-                    )
+                    with TRACER.span("set_ticket_quantities.row", ticket=ticket_text_key):
+                        ticket_row = WebDriverWait(ticket_container, 0.2, 0.05).until(
+                            lambda _: self.plan_find(f"row_{ticket_text_key}", ticket_container, first=True)
+                        )
 
                     # Find the plus button within this row
-                    plus_button = WebDriverWait(ticket_row, 0.1, 0.05).until(
-                         EC.presence_of_element_located((By.CSS_SELECTOR, TICKET_PLUS_BTN_SELECTOR))
-                    )
+                    with TRACER.span("set_ticket_quantities.plus_button", ticket=ticket_text_key):
+                        plus_button = WebDriverWait(ticket_row, 0.1, 0.05).until(
+                             EC.presence_of_element_located((By.CSS_SELECTOR, TICKET_PLUS_BTN_SELECTOR))
+                        )
+
+                    # Counter before clicking: each click then waits for it to count up (None = fixed pauses)
+                    before = self.driver.execute_script(QUANTITY_VALUE_JS, ticket_row, TICKET_QUANTITY_SELECTOR) if STATE_WAITS else None
 
                     # Click the plus button the required number of times using JS
                     for i in range(num_tickets):
                         try:
-                            self.driver.execute_script("arguments[0].click();", plus_button)
-                            time.sleep(DELAY_BETWEEN_PLUS_CLICKS) # Minimal pause between clicks
+                            with TRACER.span("set_ticket_quantities.plus_click", ticket=ticket_text_key, click=i + 1):
+                                self.driver.execute_script("arguments[0].click();", plus_button)
+                            if before is None:
+                                time.sleep(DELAY_BETWEEN_PLUS_CLICKS) # Minimal pause between clicks
+                            else:
+                                expected = before + i + 1
+                                def counter_reached(d):
+                                    value = d.execute_script(QUANTITY_VALUE_JS, ticket_row, TICKET_QUANTITY_SELECTOR)
+                                    return "unreadable" if value is None else value >= expected
+                                if self.wait_for_state("quantity_update", counter_reached,
+                                                       QUANTITY_UPDATE_TIMEOUT, DELAY_BETWEEN_PLUS_CLICKS) == "unreadable":
+                                    # Counter gone (row re-rendered?): fixed pauses for this ticket type
+                                    time.sleep(DELAY_BETWEEN_PLUS_CLICKS)
+                                    before = None
                         except Exception as click_err:
-                            logging.error(f"JS plus click error iter {i+1} for {ticket_text_key}: {click_err}")
+                            logging.error("JS plus click error iter %s for %s: %s", i+1, ticket_text_key, click_err)
                             return False
                     return True
                 except TimeoutException:
-                     logging.warning(f"Timeout finding row or plus button for '{ticket_text_key}'.")
+                     logging.warning("Timeout finding row or plus button for '%s'.", ticket_text_key)
                      return False
                 except StaleElementReferenceException:
-                     logging.warning(f"Stale element finding row/button for '{ticket_text_key}'.")
+                     logging.warning("Stale element finding row/button for '%s'.", ticket_text_key)
                      return False # Let the main loop retry
                 except Exception as e_inner:
-                    logging.error(f"Error in set_quantity for '{ticket_text_key}': {e_inner}", exc_info=False)
+                    logging.error("Error in set_quantity for '%s': %s", ticket_text_key, e_inner, exc_info=False)
                     return False
 
             # Set quantities, pausing briefly between types
-            if not set_quantity("full_price", FULL_PRICE_TICKETS): return False
-            time.sleep(DELAY_BETWEEN_QTY_SET)
-            if not set_quantity("reduced_fare", REDUCED_PRICE_TICKETS): return False
-
-            time.sleep(DELAY_AFTER_QTY_SET) # Pause after setting all
+            # Counts of the slot preference that was clicked
+            if not set_quantity("full_price", self.active_preference.full_price): return False
+            if STATE_WAITS:
+                if self.active_preference.full_price > 0: # Nothing clicked, nothing to cover
+                    self.note_state_wait("between_qty_set", 0.0, DELAY_BETWEEN_QTY_SET) # Covered by the counter wait
+            else:
+                time.sleep(DELAY_BETWEEN_QTY_SET)
+            if not set_quantity("reduced_fare", self.active_preference.reduced_fare): return False
+
+            self.mark_milestone("quantities_set")
+            if STATE_WAITS:
+                # Returns the page URL once enabled: the reference for the navigation wait after continue
+                self.continue_page_url = self.wait_for_state("continue_enabled", lambda d: d.execute_script(CONTINUE_ENABLED_JS, CONTINUE_BUTTON_SELECTOR),
+                                                             CONTINUE_ENABLED_TIMEOUT, DELAY_AFTER_QTY_SET)
+            else:
+                time.sleep(DELAY_AFTER_QTY_SET) # Pause after setting all
             return True
 
         except TimeoutException:
             logging.debug("Ticket type container not found within fast loop timeout.")
             return False
         except Exception as e:
-            logging.error(f"Error in set_ticket_quantities: {e}", exc_info=False)
+            logging.error("Error in set_ticket_quantities: %s", e, exc_info=False)
             return False
 
+    @TRACER.traced("click_continue")
     def click_continue(self):
         """Clicks the continue button using JS."""
         try:
             # Locate and click using the fast wait_and_click helper
-            if self.wait_and_click((By.CSS_SELECTOR, CONTINUE_BUTTON_SELECTOR), timeout=FAST_LOOP_WAIT_TIMEOUT):
+            with TRACER.span("click_continue.click"):
+                clicked = self.wait_and_click((By.CSS_SELECTOR, CONTINUE_BUTTON_SELECTOR), timeout=FAST_LOOP_WAIT_TIMEOUT)
+            if clicked:
+                self.mark_milestone("continue_clicked")
                 logging.info("Continue button clicked successfully.")
-                time.sleep(DELAY_AFTER_CONTINUE) # Wait for potential transition
+                self.wait_for_page_left(self.continue_page_url)
                 return True
             else:
-                logging.warning(f"Continue button ('{CONTINUE_BUTTON_SELECTOR}') click failed.")
+                logging.warning("Continue button ('%s') click failed.", CONTINUE_BUTTON_SELECTOR)
                 # Optionally save screenshot here if debugging needed
                 # self.save_screenshot("debug_continue_click_fail")
                 return False
         except Exception as e:
-            logging.error(f"Error finding/clicking continue: {e}", exc_info=False)
+            logging.error("Error finding/clicking continue: %s", e, exc_info=False)
             return False
 
+    def wait_for_page_left(self, page_url):
+        """After the continue click: waits for the transition (URL change or continue button gone), else DELAY_AFTER_CONTINUE."""
+        if not STATE_WAITS or not page_url:
+            time.sleep(DELAY_AFTER_CONTINUE) # Wait for potential transition
+            return
+        def page_left(d):
+            try:
+                return d.execute_script(PAGE_LEFT_JS, page_url, CONTINUE_BUTTON_SELECTOR)
+            except WebDriverException: # Script torn down or blocked by the navigation itself: the page is being left
+                return True
+        self.wait_for_state("continue_navigation", page_left, CONTINUE_NAVIGATION_TIMEOUT, DELAY_AFTER_CONTINUE)
+
+    def _purchase_sequence_config(self):
+        """Builds the argument object for PURCHASE_SEQUENCE_JS from the current language/config."""
+        plan = self.selector_plan
+        return {
+            "containerSelector": TIME_SLOT_CONTAINER_SELECTOR,
+            "resolver": plan.slot_resolution_arg(),
+            "tariffContainerSelector": TICKET_TYPE_CONTAINER_SELECTOR,
+            "rowsByRank": [plan.ticket_rows(p) for p in plan.preferences],
+            "plusSelector": TICKET_PLUS_BTN_SELECTOR,
+            "continueSelector": CONTINUE_BUTTON_SELECTOR,
+            "waitTimeoutMs": int(FAST_LOOP_WAIT_TIMEOUT * 1000),
+            "rowTimeoutMs": 200,
+            "quantitySelector": TICKET_QUANTITY_SELECTOR,
+            "stateWaits": STATE_WAITS,
+            "timeouts": {
+                "tariffRender": int(TARIFF_RENDER_TIMEOUT * 1000),
+                "quantityUpdate": int(QUANTITY_UPDATE_TIMEOUT * 1000),
+                "continueEnabled": int(CONTINUE_ENABLED_TIMEOUT * 1000),
+            },
+            "delays": {
+                "afterSlotClick": int(DELAY_AFTER_SLOT_CLICK * 1000),
+                "betweenQtySet": int(DELAY_BETWEEN_QTY_SET * 1000),
+                "betweenPlusClicks": int(DELAY_BETWEEN_PLUS_CLICKS * 1000),
+                "afterQtySet": int(DELAY_AFTER_QTY_SET * 1000),
+            },
+        }
+
+    @TRACER.traced("purchase_in_browser")
+    def purchase_in_browser(self):
+        """Runs select slot -> set quantities -> continue as a single execute_async_script round trip.
+
+        Returns a dict {ok, step, reason, marks}; `step` names where the sequence stopped.
+        """
+        try:
+            result = self.run_async_script(PURCHASE_SEQUENCE_JS, self._purchase_sequence_config())
+        except TimeoutException:
+            return {"ok": False, "step": "script", "reason": f"no result within {ASYNC_SCRIPT_TIMEOUT}s", "marks": {}}
+        except WebDriverException as e:
+            return {"ok": False, "step": "script", "reason": f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}", "marks": {}}
+        if not isinstance(result, dict):
+            return {"ok": False, "step": "script", "reason": f"unexpected result {result!r}", "marks": {}}
+
+        # In-page marks are epoch milliseconds taken right when each step finished
+        for name, epoch_ms in (result.get("marks") or {}).items():
+            if name != "container":
+                self.milestones[name] = epoch_ms / 1000.0
+        rank = result.get("rank")
+        if isinstance(rank, int) and 0 <= rank < len(self.slot_preferences):
+            self.active_preference = self.slot_preferences[rank]
+            self.log_preference_win(rank, result.get("reasons"), result.get("resolve_ms"))
+        if result.get("ok"):
+            logging.info("In-browser purchase sequence completed in %.1fms (1 round trip).", result.get('elapsed_ms', 0))
+            if STATE_WAITS:
+                self.note_in_page_waits(result.get("waits") or {})
+            self.wait_for_page_left(result.get("href")) # As in click_continue
+        return result
+
+    def note_in_page_waits(self, waits):
+        """Records the post-action waits PURCHASE_SEQUENCE_JS reported against the fixed delays it would have slept."""
+        counts = [getattr(self.active_preference, key) for key in SelectorPlan.TICKET_KEYS if getattr(self.active_preference, key) > 0]
+        fixed = {
+            "tariff_render": DELAY_AFTER_SLOT_CLICK,
+            "quantity_update": sum(c - 1 for c in counts) * DELAY_BETWEEN_PLUS_CLICKS + max(len(counts) - 1, 0) * DELAY_BETWEEN_QTY_SET,
+            "continue_enabled": DELAY_AFTER_QTY_SET,
+        }
+        for step in sorted(waits, key=lambda name: list(fixed).index(name) if name in fixed else len(fixed)): # Sequence order
+            self.note_state_wait(step, waits[step] / 1000.0, fixed.get(step, 0.0))
+
+    def probe_availability(self):
+        """Runs AVAILABILITY_PROBE_JS once. Returns its result dict ({available, reason, bytes, status, ms})."""
+        cfg = {
+            "url": AVAILABILITY_PROBE_URL or self.driver.current_url,
+            "containerSelector": TIME_SLOT_CONTAINER_SELECTOR,
+            # Site language may still be unknown (no slots at initial load): accept any known header text
+            "preferences": [{"sections": [[TEXT_MAPPINGS[lang]["activity_in"].lower(), LANGUAGE_MAPPINGS[lang][p.language].lower()]
+                                          for lang in TEXT_MAPPINGS],
+                             "slotTime": p.time} for p in self.slot_preferences],
+            "timeoutMs": int(AVAILABILITY_PROBE_TIMEOUT * 1000),
+        }
+        try:
+            result = self.run_async_script(AVAILABILITY_PROBE_JS, cfg)
+        except Exception as e:
+            return {"available": False, "reason": f"error:{type(e).__name__}", "bytes": 0, "status": 0, "ms": 0.0}
+        if not isinstance(result, dict):
+            return {"available": False, "reason": f"error:unexpected {result!r}", "bytes": 0, "status": 0, "ms": 0.0}
+        return result
+
+    def _probe_refresh_window(self, start_deadline_ns, end_deadline_ns):
+        """Probes availability every MICRO_REFRESH_INTERVAL; reloads only once the slot is selectable.
+
+        Returns (refresh_count, container_found); refresh_count counts full reloads only.
+        """
+        refresh_count = 0
+        container_found = False
+        probes = []
+        failures = 0
+        scheduler = PeriodicScheduler(start_deadline_ns, MICRO_REFRESH_INTERVAL, end_ns=end_deadline_ns, label="probe_tick")
+        self.refresh_scheduler = scheduler
+        document_bytes = (self.navigation_timing() or {}).get("transfer_size") or 0
+
+        while scheduler.wait_next() is not None:
+            if self.stop_requested.is_set():
+                break
+            with TRACER.span("micro_refresh.probe", probe=len(probes) + 1) as span:
+                result = self.probe_availability()
+                span.set(reason=result.get("reason"), bytes=result.get("bytes"))
+            probes.append(result)
+            if logging.root.isEnabledFor(logging.DEBUG):
+                logging.debug("[Probe %d] %s in %.1fms (%d bytes)", len(probes), result.get("reason"),
+                              result.get("ms") or 0.0, result.get("bytes") or 0)
+            failures = failures + 1 if str(result.get("reason")).startswith(("error", "http_")) else 0
+            if not result.get("available") and failures < AVAILABILITY_PROBE_MAX_FAILURES:
+                continue
+
+            if result.get("available"):
+                preference = self.slot_preferences[result.get("rank") or 0]
+                logging.info("Probe %d: preferred slot #%d (%s %s) is selectable (%.1fms). Navigating.",
+                             len(probes), (result.get("rank") or 0) + 1, preference.language, preference.time, result.get("ms") or 0.0)
+            else:
+                logging.warning("Probe failed %d times in a row (%s). Falling back to a full reload.", failures, result.get("reason"))
+                failures = 0
+            with TRACER.span("micro_refresh.reload", refresh=refresh_count + 1, mode="probe"):
+                reloaded = self.reload_page()
+            if not reloaded:
+                continue
+            refresh_count += 1
+            with TRACER.span("micro_refresh.check", refresh=refresh_count) as span:
+                detected_at = self.detect_primary_container(timeout=POST_REFRESH_CONTAINER_TIMEOUT if result.get("available") else 0.1)
+                span.set(found=bool(detected_at))
+            if detected_at:
+                self.milestones["container_detected"] = detected_at
+                logging.info("*** Primary container FOUND during micro-refresh at %s! ***",
+                             self.reference_now().strftime('%H:%M:%S.%f')[:-3])
+                container_found = True
+                break
+
+        probe_bytes = sum(r.get("bytes") or 0 for r in probes)
+        probe_ms = [r["ms"] for r in probes if r.get("ms")]
+        logging.info(f"Availability probe: {len(probes)} probes, {probe_bytes / 1024:.1f} KiB fetched"
+                     + (f", median {statistics.median(probe_ms):.1f}ms" if probe_ms else "")
+                     + f", {refresh_count} full reload(s)"
+                     + (f" (a full page document alone was {document_bytes / 1024:.1f} KiB before subresources)" if document_bytes else ""))
+        if logging.root.isEnabledFor(logging.INFO):
+            logging.info("Micro-refresh schedule: %s", scheduler.summary())
+        return refresh_count, container_found
+
+    def _interval_refresh_window(self, start_deadline_ns, end_deadline_ns):
+        """Blind reloads every MICRO_REFRESH_INTERVAL. Returns (refresh_count, container_found)."""
+        refresh_count = 0
+        container_found = False
+        # Reloads tick on absolute deadlines from the window start; overruns skip ticks, never bunch them
+        scheduler = PeriodicScheduler(start_deadline_ns, MICRO_REFRESH_INTERVAL, end_ns=end_deadline_ns, label="micro_refresh_tick")
+        self.refresh_scheduler = scheduler
+
+        while scheduler.wait_next() is not None:
+            if self.stop_requested.is_set():
+                break
+            with TRACER.span("micro_refresh.reload", refresh=refresh_count + 1):
+                reloaded = self.reload_page()
+            if reloaded:
+                 refresh_count += 1
+                 now_dt = self.reference_now() # Use Rome TZ (reference clock) for logging consistency
+                 if logging.root.isEnabledFor(logging.DEBUG): # Skip the strftime entirely unless debugging
+                     logging.debug("[Micro Refresh %d] %s", refresh_count, now_dt.strftime('%H:%M:%S.%f')[:-3])
+
+                 # VERY quick check for container presence immediately after reload
+                 # Don't wait long here, just see if it appeared *instantly*
+                 with TRACER.span("micro_refresh.check", refresh=refresh_count) as span:
+                     detected_at = self.detect_primary_container(timeout=0.1)
+                     span.set(found=bool(detected_at))
+                 if detected_at:
+                     self.milestones["container_detected"] = detected_at
+                     logging.info("*** Primary container FOUND during micro-refresh at %s! ***", now_dt.strftime('%H:%M:%S.%f')[:-3])
+                     container_found = True
+                     break # Exit micro-refresh loop immediately
+            # A failed reload simply waits for the next tick
+
+        if logging.root.isEnabledFor(logging.INFO):
+            logging.info("Micro-refresh schedule: %s", scheduler.summary())
+        return refresh_count, container_found
+
+    def _lifecycle_refresh_window(self, start_deadline_ns, end_deadline_ns):
+        """Reloads back to back, each one waiting for its lifecycle event (or the measured timeout).
+
+        MICRO_REFRESH_INTERVAL is the minimum gap between reload starts. Returns (refresh_count, container_found).
+        """
+        refresh_count = 0
+        container_found = False
+        interval_ns = int(MICRO_REFRESH_INTERVAL * 1e9)
+        next_start_ns = start_deadline_ns
+        self.reload_log = []
+
+        try:
+            while next_start_ns < end_deadline_ns and not self.stop_requested.is_set():
+                DEADLINE_WAITER.wait_until_ns(next_start_ns, label="lifecycle_refresh_gap")
+                timeout = self.lifecycle_reload_timeout()
+                if self.cdp is None:
+                    self.driver.set_page_load_timeout(timeout)
+                started_ns = time.perf_counter_ns()
+                next_start_ns = started_ns + interval_ns
+                with TRACER.span("micro_refresh.reload", refresh=refresh_count + 1, mode="lifecycle") as span:
+                    outcome = self.lifecycle_reload(timeout)
+                    span.set(outcome=outcome)
+                loaded_s = (time.perf_counter_ns() - started_ns) / 1e9
+                if outcome == REFRESH_LIFECYCLE_EVENT:
+                    self.reload_durations.append(loaded_s)
+                refresh_count += 1
+
+                detected_at = None
+                if outcome != "error":
+                    with TRACER.span("micro_refresh.check", refresh=refresh_count) as span:
+                        detected_at = self.detect_primary_container(timeout=REFRESH_SETTLE_TIMEOUT)
+                        span.set(found=bool(detected_at))
+                self.reload_log.append({"refresh": refresh_count, "outcome": outcome, "ms": loaded_s * 1000,
+                                        "timeout_ms": timeout * 1000, "container": bool(detected_at)})
+                logging.info("[Reload %d] %s after %.1fms (timeout %.0fms), container %s",
+                             refresh_count, outcome, loaded_s * 1000, timeout * 1000, "FOUND" if detected_at else "absent")
+                if detected_at:
+                    self.milestones["container_detected"] = detected_at
+                    logging.info("*** Primary container FOUND during micro-refresh at %s! ***",
+                                 self.reference_now().strftime('%H:%M:%S.%f')[:-3])
+                    container_found = True
+                    break
+        finally:
+            if self.cdp is None and not self.stop_requested.is_set(): # A stopped run's driver is already quit
+                self.driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+
+        outcomes = {}
+        for entry in self.reload_log:
+            outcomes[entry["outcome"]] = outcomes.get(entry["outcome"], 0) + 1
+        completed = [entry["ms"] for entry in self.reload_log if entry["outcome"] == REFRESH_LIFECYCLE_EVENT]
+        logging.info(f"Lifecycle refresh: {refresh_count} reloads, outcomes {outcomes}"
+                     + (f", median load {statistics.median(completed):.1f}ms" if completed else ""))
+        return refresh_count, container_found
+
+    @TRACER.traced("micro_refresh_loop")
     def micro_refresh_loop(self):
         """Performs rapid JS reloads around the activation time."""
         start_time = self.activation_dt_rome - timedelta(seconds=MICRO_REFRESH_DURATION_BEFORE)
         end_time = self.activation_dt_rome + timedelta(seconds=MICRO_REFRESH_DURATION_AFTER)
         interval = MICRO_REFRESH_INTERVAL
+        # Convert both window edges to monotonic deadlines once
+        start_deadline_ns = DEADLINE_WAITER.deadline_ns(start_time, self.clock_offset)
+        end_deadline_ns = DEADLINE_WAITER.deadline_ns(end_time, self.clock_offset)
 
         logging.info(f"Starting micro-refresh window: "
                      f"{start_time.strftime('%H:%M:%S.%f')[:-3]} to "
                      f"{end_time.strftime('%H:%M:%S.%f')[:-3]} Rome Time "
                      f"(Interval: {int(interval * 1000)}ms)")
 
+        if MICRO_REFRESH_MODE == "lifecycle" and not self.reload_durations:
+            # Seed the reload timeout with the initial load (we are waiting for the window anyway)
+            timing = self.navigation_timing()
+            timing_key = "dcl" if REFRESH_LIFECYCLE_EVENT == "domcontentloaded" else "load"
+            if timing and timing.get(timing_key):
+                self.reload_durations.append(timing[timing_key] / 1000.0)
+            logging.info(f"Lifecycle refresh mode: waiting for {REFRESH_LIFECYCLE_EVENT}, "
+                         f"initial reload timeout {self.lifecycle_reload_timeout() * 1000:.0f}ms.")
+
         # Precise wait until the start of the window
-        precise_wait_until(start_time)
+        DEADLINE_WAITER.wait_until_ns(start_deadline_ns, label="micro_refresh_start")
         logging.info("Micro-refresh window entered.")
 
-        refresh_count = 0
-        start_perf = time.perf_counter()
-        container_found = False
-        last_reload_time = start_perf
-
-        while time.perf_counter() < start_perf + (MICRO_REFRESH_DURATION_BEFORE + MICRO_REFRESH_DURATION_AFTER):
-            current_perf = time.perf_counter()
-            # Reload only if interval has passed
-            if current_perf - last_reload_time >= interval:
-                if js_reload(self.driver):
-                     refresh_count += 1
-                     now_dt = datetime.now(self.rome_tz) # Use Rome TZ for logging consistency
-                     logging.debug(f"[Micro Refresh {refresh_count}] {now_dt.strftime('%H:%M:%S.%f')[:-3]}")
-                     last_reload_time = current_perf
-
-                     # VERY quick check for container presence immediately after reload
-                     # Don't wait long here, just see if it appeared *instantly*
-                     if self.quick_check_element(By.CSS_SELECTOR, PRIMARY_CONTAINER_SELECTOR, timeout=0.1):
-                         logging.info(f"*** Primary container FOUND during micro-refresh at {now_dt.strftime('%H:%M:%S.%f')[:-3]}! ***")
-                         container_found = True
-                         break # Exit micro-refresh loop immediately
-                else:
-                     # Reload failed, wait briefly before trying again
-                     time.sleep(0.1)
-                     last_reload_time = time.perf_counter() # Reset timer after failure delay
-
-            # Minimal sleep to prevent pure CPU spin
-            time.sleep(0.005)
-
-        logging.info(f"Micro-refresh window finished. Total refreshes: {refresh_count}. Container found: {container_found}")
+        if MICRO_REFRESH_MODE == "lifecycle":
+            refresh_count, container_found = self._lifecycle_refresh_window(start_deadline_ns, end_deadline_ns)
+        elif MICRO_REFRESH_MODE == "probe":
+            refresh_count, container_found = self._probe_refresh_window(start_deadline_ns, end_deadline_ns)
+        else:
+            refresh_count, container_found = self._interval_refresh_window(start_deadline_ns, end_deadline_ns)
+        logging.info("Micro-refresh window finished. Total refreshes: %s. Container found: %s", refresh_count, container_found)
+        self.refresh_count = refresh_count
+        if self.stop_requested.is_set():
+            logging.warning("Micro-refresh stopped: the run was abandoned.")
+            return False
 
         # After loop, if container was found, wait slightly longer for it to stabilize
         if container_found:
@@ -599,7 +3014,10 @@ class ColosseumTicketBot:
                      EC.visibility_of_element_located((By.CSS_SELECTOR, PRIMARY_CONTAINER_SELECTOR))
                  )
                  logging.info("Primary container visibility confirmed after micro-refresh.")
+                 if self.network_policy is not None:
+                     self.log_page_weight("release load")
                  self.detect_site_language() # Detect language now that container is stable
+                 self.record_dom("release")
                  return True
             except TimeoutException:
                  logging.error("Container found during micro-refresh, but disappeared or timed out confirming visibility.")
@@ -607,7 +3025,9 @@ class ColosseumTicketBot:
         else:
              logging.warning("Primary container was NOT found during the micro-refresh window.")
              # Attempt one last check just in case it appeared right at the end
-             if self.quick_check_element(By.CSS_SELECTOR, PRIMARY_CONTAINER_SELECTOR, timeout=0.5):
+             detected_at = self.detect_primary_container(timeout=0.5)
+             if detected_at:
+                 self.milestones["container_detected"] = detected_at
                  logging.info("Container found in final check after micro-refresh window.")
                  self.detect_site_language()
                  return True
@@ -617,14 +3037,57 @@ class ColosseumTicketBot:
 
 
     def check_for_tickets(self):
-        """Main logic: Initial load -> Timed micro-refresh -> Fast check loop."""
+        """Main logic: Initial load -> Timed micro-refresh -> Fast check loop.
+
+        Runs the phases serially on this thread; AcquisitionOrchestrator runs the same phases as an
+        asyncio state machine with side tasks.
+        """
+        if not self.prepare_run():
+            return False
+        url_with_date = self.event_url()
+
+        # === Step 1: Initial Load & Manual Interaction ===
+        if not self.handle_initial_load(url_with_date):
+            logging.error("Initial load or manual CAPTCHA step failed.")
+            return False
+
+        # === Step 2: Readiness check, then wait for Micro-Refresh Trigger ===
+        if READINESS_CHECK_ENABLED:
+            remaining = (self.readiness_check_time() - self.reference_now()).total_seconds()
+            if remaining > 0:
+                logging.info(f"Readiness check in {remaining:.0f}s.")
+                time.sleep(remaining)
+            if not self.readiness_check():
+                return False
+        self.wait_for_refresh_trigger()
+
+        # === Step 3: Execute Micro-Refresh Loop ===
+        if not self.refresh_window():
+            return False
+
+        # === Step 4: Fast Ticket Check Loop ===
+        if not self.run_fast_loop():
+            return False
+        self.ticket_secured()
+        return True
+
+    def prepare_run(self):
+        """Sets up the driver if needed and resets the per-run state. False if the driver cannot be started."""
         if not self.driver:
             try:
                 self.setup_driver()
             except Exception as e:
                 logging.critical(f"CRITICAL: WebDriver setup failed: {e}")
                 return False
+        self.milestones = {}
+        self.stop_requested.clear()
+        self.run_started_at = datetime.now()
+        self._jitter_marks = {label: len(samples) for label, samples in DEADLINE_WAITER.overshoots_ns.items()}
+        TRACER.instrument_driver(self.driver)
+        return True
 
+    def event_url(self):
+        """Event page URL for TARGET_DATE."""
         # Construct URL with target date
         url_with_date = BASE_URL
         date_param = f"?t={TARGET_DATE}"
@@ -638,96 +3101,209 @@ class ColosseumTicketBot:
         else:
              url_with_date += date_param
         logging.info(f"Final URL for attempt: {url_with_date}")
+        return url_with_date
 
+    def refresh_trigger_time(self):
+        """Rome time at which the micro-refresh sequence starts."""
+        return self.activation_dt_rome - timedelta(seconds=MICRO_REFRESH_LEAD_TIME_SECONDS)
 
-        # === Step 1: Initial Load & Manual Interaction ===
-        if not self.handle_initial_load(url_with_date):
-            logging.error("Initial load or manual CAPTCHA step failed.")
+    def readiness_check_time(self):
+        """Rome time at which the pre-drop readiness check runs."""
+        return self.activation_dt_rome - timedelta(seconds=READINESS_CHECK_BEFORE)
+
+    def readiness_check(self):
+        """Checks the WebDriver session, measures command and page latencies and applies readiness_window().
+
+        Returns False only if the session is gone. Skipped when too close to the refresh trigger.
+        """
+        headroom = (self.refresh_trigger_time() - self.reference_now()).total_seconds()
+        if headroom < READINESS_MIN_HEADROOM:
+            logging.warning(f"Readiness check skipped: only {headroom:.1f}s left before the refresh trigger.")
+            return True
+        command_ms = []
+        try:
+            page_url = self.driver.current_url
+            for _ in range(READINESS_COMMAND_SAMPLES):
+                started = time.perf_counter()
+                self.driver.execute_script("return 1")
+                command_ms.append((time.perf_counter() - started) * 1000)
+        except WebDriverException as e:
+            logging.critical(f"Readiness check: the WebDriver session is gone ({type(e).__name__}). Aborting before the drop.")
             return False
 
-        # === Step 2: Wait for Micro-Refresh Trigger ===
-        refresh_trigger_time = self.activation_dt_rome - timedelta(seconds=MICRO_REFRESH_LEAD_TIME_SECONDS)
+        ttfb_ms, dcl_ms, reload_ms = [], [], []
+        if READINESS_PAGE_SAMPLES and self.cdp is None:
+            self.driver.set_page_load_timeout(READINESS_PAGE_TIMEOUT) # driver.refresh() ignores lifecycle_reload's timeout
+        try:
+            for _ in range(READINESS_PAGE_SAMPLES):
+                started = time.perf_counter()
+                outcome = self.lifecycle_reload(READINESS_PAGE_TIMEOUT)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                timing = self.navigation_timing()
+                if outcome in ("timeout", "error") or not timing or not timing.get("dcl"):
+                    logging.warning(f"Readiness check: reload sample unusable ({outcome}).")
+                    continue
+                logging.debug(f"Readiness check: reload reached {outcome} after {elapsed_ms:.1f}ms.")
+                reload_ms.append(elapsed_ms)
+                ttfb_ms.append(timing["ttfb"])
+                dcl_ms.append(timing["dcl"])
+                self.reload_durations.append(timing["dcl"] / 1000.0) # Also seeds the lifecycle reload timeout
+        finally:
+            if READINESS_PAGE_SAMPLES and self.cdp is None:
+                self.driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+        if READINESS_PAGE_SAMPLES and self.driver.current_url != page_url:
+            logging.warning(f"Readiness check: the page moved to {self.driver.current_url} during the reloads. CHECK THE BROWSER (challenge?)!")
+
+        uncertainty = self.clock_estimate.uncertainty if self.clock_estimate is not None else 0.0
+        applied = readiness_window(command_ms, ttfb_ms, reload_ms, uncertainty)
+        previous = {name: globals()[name] for name in applied}
+        self.readiness = {"command_ms": command_ms, "ttfb_ms": ttfb_ms, "dcl_ms": dcl_ms, "reload_ms": reload_ms,
+                          "clock_uncertainty": uncertainty, "previous": previous, "applied": applied}
+        logging.info(f"Readiness: session live. chromedriver RTT {describe_latencies(command_ms)}; "
+                     f"TTFB {describe_latencies(ttfb_ms)}; DOMContentLoaded {describe_latencies(dcl_ms)}; "
+                     f"reload cycle {describe_latencies(reload_ms)}; clock +/- {uncertainty * 1000:.1f}ms.")
+        logging.info("Readiness: lead %.2fs (was %.2fs), window -%.2fs / +%.2fs around activation (was -%.2fs / +%.2fs).",
+                     applied["MICRO_REFRESH_LEAD_TIME_SECONDS"], previous["MICRO_REFRESH_LEAD_TIME_SECONDS"],
+                     applied["MICRO_REFRESH_DURATION_BEFORE"], applied["MICRO_REFRESH_DURATION_AFTER"],
+                     previous["MICRO_REFRESH_DURATION_BEFORE"], previous["MICRO_REFRESH_DURATION_AFTER"])
+        globals().update(applied)
+        return True
+
+    def wait_for_refresh_trigger(self):
+        """Precise wait until refresh_trigger_time() on the reference clock."""
+        if CPU_TUNING_ENABLED:
+            self.apply_cpu_tuning(measure=False) # Renderers started since setup_driver
+        refresh_trigger_time = self.refresh_trigger_time()
         logging.info(f"Waiting until ~{refresh_trigger_time.strftime('%H:%M:%S.%f')[:-3]} Rome Time to start micro-refresh...")
-        precise_wait_until(refresh_trigger_time)
+        precise_wait_until(refresh_trigger_time, self.clock_offset, label="refresh_trigger")
         logging.info(f"Trigger time reached. Starting micro-refresh sequence.")
 
-        # === Step 3: Execute Micro-Refresh Loop ===
+    def refresh_window(self):
+        """Runs the micro-refresh loop. True once the primary container is ready."""
         container_ready = self.micro_refresh_loop()
 
         if not container_ready:
             logging.error("Micro-refresh sequence completed but primary container is not ready. Aborting attempt.")
             self.save_screenshot("debug_container_not_found_after_microrefresh")
             return False
+        return True
 
-        # === Step 4: Fast Ticket Check Loop ===
-        logging.info("=== STARTING FAST CHECK LOOP ===")
+    def fast_loop_budget(self):
+        """Upper bound (seconds) of run_fast_loop()."""
+        return MAX_FAST_CHECK_ATTEMPTS * FAST_CHECK_INTERVAL + 5 # Add buffer time
+
+    def run_fast_loop(self):
+        """Fast check loop: slot -> quantities -> continue until it succeeds or the window ends."""
+        plan = self.selector_plan # Language is known now: build/reuse the plan outside the timed attempts
+        logging.info("=== STARTING FAST CHECK LOOP === (selector plan: %s)", plan.id)
+        self.mark_milestone("fast_loop_started")
         self.attempt_count = 0
         start_fast_loop_time = time.perf_counter()
-        max_loop_duration = MAX_FAST_CHECK_ATTEMPTS * FAST_CHECK_INTERVAL + 5 # Add buffer time
+        max_loop_duration = self.fast_loop_budget()
+        secured = False
 
         while time.perf_counter() < start_fast_loop_time + max_loop_duration:
+            if self.stop_requested.is_set():
+                break
             loop_start_perf = time.perf_counter()
             self.attempt_count += 1
-            logging.debug(f"Fast Check Attempt {self.attempt_count}...")
+            self.state_waits = []
+            logging.debug("Fast Check Attempt %s...", self.attempt_count)
 
-            # --- Core Ticket Selection Logic ---
-            try:
-                # Step 4a: Select Time Slot (includes internal delay)
-                slot_selected = self.select_time_slot()
-                if not slot_selected:
-                    # If slots were expected but not found/clicked, pause and retry loop
-                    time.sleep(FAST_CHECK_INTERVAL)
-                    continue # Go to next attempt immediately
-
-                # --- Slot Selected ---
-                logging.debug(f"Attempt {self.attempt_count}: Slot selected. Setting quantities...")
-
-                # Step 4b: Set Ticket Quantities (includes internal delays)
-                quantities_set = self.set_ticket_quantities()
-                if not quantities_set:
-                    # If setting quantities failed, pause slightly longer and retry loop
-                    logging.warning(f"Attempt {self.attempt_count}: Failed to set quantities.")
-                    time.sleep(FAST_CHECK_INTERVAL * 1.5)
-                    # Consider a reload/refresh here if quantity setting fails consistently? Risky.
-                    continue
-
-                # --- Quantities Set ---
-                logging.info(f"Attempt {self.attempt_count}: Quantities set! Clicking continue...")
+            with TRACER.span("fast_loop.attempt", attempt=self.attempt_count) as attempt_span:
+                # --- Core Ticket Selection Logic ---
+                try:
+                    if USE_SINGLE_ROUNDTRIP_PURCHASE:
+                        result = self.purchase_in_browser()
+                        attempt_span.set(outcome=result["step"])
+                        if not result["ok"]:
+                            if result["step"] in ("container", "slot"):
+                                logging.debug("Attempt %s: %s not ready (%s).", self.attempt_count, result['step'], result['reason'])
+                                time.sleep(FAST_CHECK_INTERVAL)
+                            else:
+                                logging.warning("Attempt %s: In-browser sequence failed at '%s': %s", self.attempt_count, result['step'], result['reason'])
+                                time.sleep(FAST_CHECK_INTERVAL * 1.5)
+                            continue
+                        loop_end_perf = time.perf_counter()
+                        logging.info("SUCCESS on Fast Check Attempt %s! (Loop time: %.4fs)", self.attempt_count, loop_end_perf - loop_start_perf)
+                        logging.info("Total time from fast loop start: %.4fs", loop_end_perf - start_fast_loop_time)
+                        secured = True
+                        break
+
+                    # Step 4a: Select Time Slot (includes internal delay)
+                    slot_selected = self.select_time_slot()
+                    if not slot_selected:
+                        attempt_span.set(outcome="slot_not_selected")
+                        # If slots were expected but not found/clicked, pause and retry loop
+                        time.sleep(FAST_CHECK_INTERVAL)
+                        continue # Go to next attempt immediately
+
+                    # --- Slot Selected ---
+                    logging.debug("Attempt %s: Slot selected. Setting quantities...", self.attempt_count)
+                    self.record_dom("slot_selected")
+
+                    # Step 4b: Set Ticket Quantities (includes internal delays)
+                    quantities_set = self.set_ticket_quantities()
+                    if not quantities_set:
+                        attempt_span.set(outcome="quantities_failed")
+                        # If setting quantities failed, pause slightly longer and retry loop
+                        logging.warning("Attempt %s: Failed to set quantities.", self.attempt_count)
+                        time.sleep(FAST_CHECK_INTERVAL * 1.5)
+                        # Consider a reload/refresh here if quantity setting fails consistently? Risky.
+                        continue
+
+                    # --- Quantities Set ---
+                    logging.info("Attempt %s: Quantities set! Clicking continue...", self.attempt_count)
+                    self.record_dom("quantities_set")
+
+                    # Step 4c: Click Continue/Checkout (includes internal delay)
+                    continue_clicked = self.click_continue()
+                    if not continue_clicked:
+                         attempt_span.set(outcome="continue_failed")
+                         logging.warning("Attempt %s: Failed to click continue.", self.attempt_count)
+                         time.sleep(FAST_CHECK_INTERVAL * 1.5)
+                         # Maybe save screenshot on continue failure
+                         # self.save_screenshot(f"debug_continue_fail_attempt_{self.attempt_count}")
+                         continue
+
+                    # == SUCCESS! ==
+                    attempt_span.set(outcome="success")
+                    loop_end_perf = time.perf_counter()
+                    logging.info("SUCCESS on Fast Check Attempt %s! (Loop time: %.4fs)", self.attempt_count, loop_end_perf - loop_start_perf)
+                    logging.info("Total time from fast loop start: %.4fs", loop_end_perf - start_fast_loop_time)
+                    secured = True
+                    break # Exit successfully (outside the attempt span, ticket_secured() waits for the user)
 
-                # Step 4c: Click Continue/Checkout (includes internal delay)
-                continue_clicked = self.click_continue()
-                if not continue_clicked:
-                     logging.warning(f"Attempt {self.attempt_count}: Failed to click continue.")
-                     time.sleep(FAST_CHECK_INTERVAL * 1.5)
-                     # Maybe save screenshot on continue failure
-                     # self.save_screenshot(f"debug_continue_fail_attempt_{self.attempt_count}")
+                except StaleElementReferenceException:
+                     logging.warning("StaleElementReferenceException during fast check %s. Retrying loop.", self.attempt_count)
+                     time.sleep(FAST_CHECK_INTERVAL / 2.0) # Very short pause before retry
                      continue
-
-                # == SUCCESS! ==
-                loop_end_perf = time.perf_counter()
-                logging.info(f"SUCCESS on Fast Check Attempt {self.attempt_count}! (Loop time: {loop_end_perf - loop_start_perf:.4f}s)")
-                logging.info(f"Total time from fast loop start: {loop_end_perf - start_fast_loop_time:.4f}s")
-                self.ticket_secured()
-                return True # Exit successfully
-
-            except StaleElementReferenceException:
-                 logging.warning(f"StaleElementReferenceException during fast check {self.attempt_count}. Retrying loop.")
-                 time.sleep(FAST_CHECK_INTERVAL / 2.0) # Very short pause before retry
-                 continue
-            except (TimeoutException, NoSuchElementException) as e_find:
-                 # These are expected if elements aren't ready yet
-                 logging.debug(f"Element not found/timed out in attempt {self.attempt_count}: {type(e_find).__name__}. Continuing check.")
-                 time.sleep(FAST_CHECK_INTERVAL)
-                 continue
-            except Exception as loop_e:
-                logging.error(f"Unhandled error during fast check {self.attempt_count}: {loop_e}", exc_info=True)
-                self.save_screenshot(f"debug_fast_loop_error_{self.attempt_count}")
-                time.sleep(FAST_CHECK_INTERVAL * 2) # Longer pause after unexpected error
-                continue
+                except (TimeoutException, NoSuchElementException) as e_find:
+                     # These are expected if elements aren't ready yet
+                     logging.debug("Element not found/timed out in attempt %s: %s. Continuing check.", self.attempt_count, type(e_find).__name__)
+                     time.sleep(FAST_CHECK_INTERVAL)
+                     continue
+                except Exception as loop_e:
+                    logging.error("Unhandled error during fast check %s: %s", self.attempt_count, loop_e, exc_info=True)
+                    # Snapshot only: a full screenshot here would stall the loop, it is taken after the run
+                    self.save_screenshot(f"debug_fast_loop_error_{self.attempt_count}", screenshot="defer", error=loop_e)
+                    time.sleep(FAST_CHECK_INTERVAL * 2) # Longer pause after unexpected error
+                    continue
             # --- End of Fast Loop Iteration ---
 
+        if self.stop_requested.is_set() and not secured:
+            logging.warning("Fast check loop stopped after %s attempts: the run was abandoned.", self.attempt_count)
+            return False # The orchestrator is closing the browser
+        # Screenshot owed by loop errors: now, while the page still shows them (ticket_secured() hands it to the user)
+        ARTIFACTS.take_deferred_screenshot(self.driver)
+        if secured:
+            self.log_state_wait_summary()
+            self.record_dom("secured")
+            return True
+
         # Loop finished without success
-        logging.warning(f"Fast check loop completed {self.attempt_count} attempts without securing tickets.")
+        logging.warning("Fast check loop completed %s attempts without securing tickets.", self.attempt_count)
+        self.record_dom("fast_loop_timeout")
         self.save_screenshot("debug_fast_loop_timeout")
         return False
 
@@ -741,24 +3317,87 @@ class ColosseumTicketBot:
         logging.info("="*60)
         # Add sound alert logic here if desired
         # ... (your winsound code) ...
+        if not self.interactive:
+            return
+        flush_logs()
         print("-" * 60)
         input(">>> Press Enter here ONLY after finishing/abandoning purchase...")
         print("-" * 60)
 
-    def save_screenshot(self, filename_prefix="debug_screenshot"):
-        """Saves a screenshot, useful for debugging failures."""
-        if not self.driver: return
+    def run_jitter(self):
+        """DEADLINE_WAITER overshoots (us) recorded since prepare_run(), per label."""
+        return {label: [ns / 1000.0 for ns in samples[self._jitter_marks.get(label, 0):]]
+                for label, samples in DEADLINE_WAITER.overshoots_ns.items() if len(samples) > self._jitter_marks.get(label, 0)}
+
+    def run_phases(self, orchestrator=None):
+        """Phase timings (ms) of this run in RunHistoryStore naming."""
+        activation = self.activation_dt_rome.timestamp()
+        phases = {f"release->{name}": (stamp + self.clock_offset - activation) * 1000 for name, stamp in self.milestones.items()}
+        if "container_detected" in self.milestones and "continue_clicked" in self.milestones:
+            phases["span:container->continue"] = (self.milestones["continue_clicked"] - self.milestones["container_detected"]) * 1000
+        for name, seconds in self.startup_timings.items():
+            phases[f"startup:{name}"] = seconds * 1000
+        if self.clock_resync_durations:
+            phases["resync:clock_sync_max"] = max(self.clock_resync_durations) * 1000
+        for step, waited, _, _ in self.state_waits:
+            phases[f"wait:{step}"] = phases.get(f"wait:{step}", 0.0) + waited * 1000
+        if orchestrator is not None:
+            for state, seconds in orchestrator.durations.items():
+                phases[f"state:{state}"] = seconds * 1000
+        return phases
+
+    def save_run_history(self, success, outcome=None, orchestrator=None, label=None, extra=None, extra_phases=None, path=None):
+        """Writes this run to the RunHistoryStore at `path` (RUN_HISTORY_DB). Returns the run id, None if off or failed."""
+        path = path or RUN_HISTORY_DB
+        if not path:
+            return None
+        extra = dict(extra or {})
+        if orchestrator is not None:
+            extra.update(orchestrator_state=orchestrator.state, failure=orchestrator.failure)
+        if self.readiness is not None:
+            extra["readiness"] = self.readiness
+        if self.cpu_tuning is not None:
+            extra["cpu_tuning"] = self.cpu_tuning
+        if self.clock_resync_durations:
+            extra["clock_resync_ms"] = [seconds * 1000 for seconds in self.clock_resync_durations]
+        run = {
+            "started_at": (self.run_started_at or datetime.now()).isoformat(timespec="milliseconds"),
+            "finished_at": datetime.now().isoformat(timespec="milliseconds"),
+            "label": label, "outcome": outcome or ("secured" if success else "failed"), "success": int(bool(success)),
+            "attempts": self.attempt_count, "refresh_count": self.refresh_count, "refresh_mode": MICRO_REFRESH_MODE,
+            "site_language": self.site_language, "config": config_snapshot(),
+            "extra": dict(extra, clock_offset=self.clock_offset, activation=self.activation_dt_rome.isoformat()),
+        }
         try:
-            filename = f"{filename_prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')[:-3]}.png"
-            if self.driver.save_screenshot(filename):
-                logging.info(f"Saved screenshot: {filename}")
-            else:
-                logging.warning(f"Call to save_screenshot for '{filename}' returned False.")
-        except Exception as e:
-            logging.error(f"Could not save screenshot '{filename_prefix}': {e}")
+            store = RunHistoryStore(path)
+            try:
+                run_id = store.record_run(run, dict(self.run_phases(orchestrator), **(extra_phases or {})), self.run_jitter())
+            finally:
+                store.close()
+        except (sqlite3.Error, OSError) as e:
+            logging.error(f"Could not write the run history to {path}: {e}")
+            return None
+        logging.info(f"Run #{run_id} recorded in {path} (report: python run_history.py --db {path}).")
+        return run_id
+
+    def save_screenshot(self, filename_prefix="debug_screenshot", screenshot="now", error=None):
+        """Queues debug artifacts (page source, URL, timings, screenshot) - see ArtifactRecorder."""
+        if not self.driver: return
+        extra = {"attempt": self.attempt_count, "milestones": dict(self.milestones), "clock_offset": self.clock_offset}
+        if error is not None:
+            extra["error"] = f"{type(error).__name__}: {error}"
+        ARTIFACTS.capture(self.driver, filename_prefix, screenshot=screenshot, extra=extra)
 
     def close(self):
         """Cleans up the WebDriver instance."""
+        if self.cdp is not None:
+            self.cdp.close()
+            self.cdp = None
+        if self.network_interceptor is not None:
+            self.network_interceptor.stop()
+            logging.info("Network policy interceptor: %d requests blocked, %d let through by allow patterns.",
+                         self.network_interceptor.blocked, self.network_interceptor.allowed)
+            self.network_interceptor = None
         if self.driver:
             logging.info("Closing browser...")
             try:
@@ -771,6 +3410,236 @@ class ColosseumTicketBot:
             finally:
                  self.driver = None
 
+# --- Async Orchestrator ---
+
+class AcquisitionOrchestrator:
+    """Runs a ColosseumTicketBot's phases as an asyncio state machine.
+
+    initial_load -> armed -> refresh_window -> purchase -> secured | failed. Every phase that
+    touches the browser runs on one dedicated executor thread (a WebDriver session is not
+    thread-safe), so the critical path is the same code as check_for_tickets(). The side tasks
+    only sleep on the event loop or use the default executor and never touch the driver.
+    """
+    STATES = ("initial_load", "armed", "refresh_window", "purchase", "secured", "failed")
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.state = None
+        self.state_entered = None # perf_counter of the last transition
+        self.state_budget = None # seconds the current state may take (None = unbounded, e.g. user prompts)
+        self.durations = {} # State -> seconds spent in it
+        self.loop_lags = deque(maxlen=2000) # Event loop wake-up lateness (seconds), sampled by the watchdog
+        self.failure = None
+        self.resyncs = 0
+        self._critical = None
+        self._driver_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="webdriver")
+        self._driver_call = None # concurrent.futures.Future of the bot method running on the WebDriver thread
+        self._abandoned = False # Set by the watchdog before it cancels the critical task
+
+    def enter(self, state, budget=None):
+        """Transition to `state`; a `budget` (seconds) arms the watchdog for it."""
+        now = time.perf_counter()
+        if self.state is not None:
+            self.durations[self.state] = self.durations.get(self.state, 0.0) + now - self.state_entered
+            logging.info("Orchestrator: %s -> %s after %.0fms.", self.state, state, (now - self.state_entered) * 1000)
+        else:
+            logging.info("Orchestrator: entering %s.", state)
+        self.state, self.state_entered, self.state_budget = state, now, budget
+
+    def fail(self, reason):
+        self.failure = reason
+        self.enter("failed")
+        logging.error("Acquisition failed: %s", reason)
+        return False
+
+    async def on_driver(self, func, *args):
+        """Runs a blocking bot method on the WebDriver thread."""
+        self._driver_call = self._driver_executor.submit(func, *args)
+        return await asyncio.wrap_future(self._driver_call)
+
+    async def on_prompt_thread(self, func):
+        """Runs a blocking call that does not touch the driver (user prompts) on a daemon thread.
+
+        A prompt still waiting for Enter after Ctrl+C cannot keep the interpreter from exiting.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def settle(method, value):
+            if not future.done():
+                method(value)
+
+        def deliver(method, value):
+            try:
+                loop.call_soon_threadsafe(settle, method, value)
+            except RuntimeError: # The loop is already closed: nobody waits for the prompt any more
+                pass
+
+        def target():
+            try:
+                result = func()
+            except BaseException as e:
+                deliver(future.set_exception, e)
+            else:
+                deliver(future.set_result, result)
+        threading.Thread(target=target, name="prompt", daemon=True).start()
+        return await future
+
+    async def run(self):
+        """Runs the whole flow; True once tickets are in the cart."""
+        side_tasks = [asyncio.create_task(self._watchdog()), asyncio.create_task(self._metrics())]
+        if CLOCK_SYNC_ENABLED and CLOCK_RESYNC_INTERVAL > 0:
+            side_tasks.append(asyncio.create_task(self._clock_resync()))
+        self._critical = asyncio.create_task(self._acquire())
+        interrupted = False
+        try:
+            return await self._critical
+        except asyncio.CancelledError:
+            if self._abandoned:
+                return False # The watchdog cancelled a hung state: its WebDriver call is stopped below
+            interrupted = True # Cancelled from outside (Ctrl+C): stop the WebDriver thread, then propagate
+            self.failure = self.failure or "interrupted"
+            raise
+        finally:
+            for task in side_tasks:
+                task.cancel()
+            await asyncio.gather(*side_tasks, return_exceptions=True)
+            if self._abandoned:
+                await self._stop_driver_thread()
+            elif interrupted:
+                await self._stop_driver_thread(grace=INTERRUPT_STOP_GRACE)
+            self._driver_executor.shutdown(wait=False)
+            if self.state not in ("secured", "failed"):
+                self.enter("failed")
+            self.log_summary()
+
+    async def _stop_driver_thread(self, grace=0.0):
+        """Stops the refresh/fast loops and waits for the WebDriver thread's call, so nothing else uses the session.
+
+        The call gets `grace` seconds to return on its own; after that the browser is quit to unblock it
+        and it gets up to WATCHDOG_ABANDON_TIMEOUT more.
+        """
+        self.bot.stop_requested.set()
+        call = self._driver_call
+        if call is None or call.done():
+            return
+        if grace > 0 and await self._wait_driver_call(call, grace):
+            return
+        await asyncio.get_running_loop().run_in_executor(None, self.bot.close) # The blocked command fails once the session is gone
+        if not await self._wait_driver_call(call, WATCHDOG_ABANDON_TIMEOUT):
+            logging.error("Orchestrator: the WebDriver thread is still busy %.0fs after the browser was closed.", WATCHDOG_ABANDON_TIMEOUT)
+
+    @staticmethod
+    async def _wait_driver_call(call, timeout):
+        """True once the concurrent future `call` finished (result or error) within `timeout` seconds."""
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(call)), timeout)
+        except asyncio.TimeoutError:
+            return False
+        except Exception as e:
+            logging.info("Orchestrator: stopped WebDriver call ended with %s.", type(e).__name__)
+        else:
+            logging.info("Orchestrator: stopped WebDriver call returned.")
+        return True
+
+    async def _acquire(self):
+        bot = self.bot
+        self.enter("initial_load")
+        if not await self.on_driver(bot.prepare_run):
+            return self.fail("WebDriver setup failed")
+        if not await self.on_driver(bot.handle_initial_load, bot.event_url()):
+            return self.fail("initial load or manual CAPTCHA step failed")
+
+        self.enter("armed")
+        if not await self._armed_wait():
+            return self.fail("WebDriver session lost before the drop")
+
+        # Handoff -> trigger -> activation -> end of the window -> container confirmation
+        self.enter("refresh_window", budget=ARMED_HANDOFF_SECONDS + MICRO_REFRESH_LEAD_TIME_SECONDS
+                   + MICRO_REFRESH_DURATION_AFTER + POST_REFRESH_CONTAINER_TIMEOUT)
+        await self.on_driver(bot.wait_for_refresh_trigger)
+        if not await self.on_driver(bot.refresh_window):
+            return self.fail("primary container not ready after the micro-refresh window")
+
+        self.enter("purchase", budget=bot.fast_loop_budget())
+        if not await self.on_driver(bot.run_fast_loop):
+            return self.fail(f"fast check loop ended after {bot.attempt_count} attempts")
+
+        self.enter("secured")
+        await self.on_prompt_thread(bot.ticket_secured) # input() prompt off the event loop, no driver use
+        return True
+
+    async def _armed_wait(self):
+        """Readiness check, then sleeps until ARMED_HANDOFF_SECONDS before the trigger. False if the session is gone."""
+        if READINESS_CHECK_ENABLED:
+            await self._sleep_until(self.bot.readiness_check_time)
+            if not await self.on_driver(self.bot.readiness_check):
+                return False
+        await self._sleep_until(self.bot.refresh_trigger_time, ahead=ARMED_HANDOFF_SECONDS)
+        return True
+
+    async def _sleep_until(self, target, ahead=0.0):
+        """Sleeps on the event loop until `ahead` seconds before target() (Rome time).
+
+        target() and the reference clock are re-read every second, so a clock re-sync or a new lead time moves the wake-up.
+        """
+        while True:
+            remaining = (target() - self.bot.reference_now()).total_seconds() - ahead
+            if remaining <= 0:
+                return
+            await asyncio.sleep(min(remaining, 1.0))
+
+    async def _clock_resync(self):
+        """Re-measures the clock offset every CLOCK_RESYNC_INTERVAL while armed (network I/O on the default executor)."""
+        loop = asyncio.get_running_loop()
+        # A sync takes up to ~1s per sample: never let one run into the handoff
+        guard = ARMED_HANDOFF_SECONDS + CLOCK_SYNC_SAMPLES * 1.0
+        while True:
+            await asyncio.sleep(CLOCK_RESYNC_INTERVAL)
+            if self.state in ("refresh_window", "purchase", "secured", "failed"):
+                return
+            remaining = (self.bot.refresh_trigger_time() - self.bot.reference_now()).total_seconds()
+            if self.state != "armed" or remaining < guard:
+                continue
+            previous = self.bot.clock_offset
+            if await loop.run_in_executor(None, self.bot.sync_clock) is not None:
+                self.resyncs += 1
+                logging.info("Clock re-sync while armed: offset %+.1fms -> %+.1fms.", previous * 1000, self.bot.clock_offset * 1000)
+
+    async def _watchdog(self, tick=0.1):
+        """Samples event loop lag and fails the run when a timed state overruns its budget by WATCHDOG_MARGIN."""
+        while True:
+            expected = time.perf_counter() + tick
+            await asyncio.sleep(tick)
+            self.loop_lags.append(max(0.0, time.perf_counter() - expected))
+            if self.state_budget is None or self._critical is None:
+                continue
+            elapsed = time.perf_counter() - self.state_entered
+            if elapsed > self.state_budget + WATCHDOG_MARGIN:
+                logging.critical("Watchdog: state '%s' running for %.1fs (budget %.1fs). Abandoning the run.",
+                                 self.state, elapsed, self.state_budget)
+                self.fail(f"watchdog: '{self.state}' exceeded its budget")
+                self._abandoned = True
+                self.bot.stop_requested.set()
+                self._critical.cancel()
+                return
+
+    async def _metrics(self):
+        while True:
+            await asyncio.sleep(ORCHESTRATOR_METRICS_INTERVAL)
+            lags = sorted(self.loop_lags)
+            logging.info("Orchestrator: %s for %.1fs, event loop lag p50 %.1fms / max %.1fms.",
+                         self.state, time.perf_counter() - self.state_entered,
+                         (lags[len(lags) // 2] if lags else 0.0) * 1000, (lags[-1] if lags else 0.0) * 1000)
+
+    def log_summary(self):
+        parts = ", ".join(f"{state} {seconds:.2f}s" for state, seconds in self.durations.items())
+        lags = sorted(self.loop_lags)
+        logging.info("Orchestrator finished in state '%s' (%s); %d clock re-syncs; event loop lag max %.1fms.%s",
+                     self.state, parts or "no transitions", self.resyncs, (lags[-1] if lags else 0.0) * 1000,
+                     f" Failure: {self.failure}" if self.failure else "")
+
+
 # Main Execution Block
 if __name__ == "__main__":
     # === CRITICAL PRE-RUN CHECKS ===
@@ -781,34 +3650,68 @@ if __name__ == "__main__":
     logging.warning(" 3. DOUBLE-CHECK ALL CSS/XPATH SELECTORS AGAINST THE LIVE WEBSITE!")
     logging.warning(" 4. TEST THE AGGRESSIVE TIMINGS (DELAYS, INTERVALS) BEFORE A REAL DROP.")
     logging.warning("="*70)
-    time.sleep(4) # Give user time to read warnings
+    startup_started = time.perf_counter()
+    if not FAST_START:
+        time.sleep(STARTUP_WARNING_PAUSE) # Give user time to read warnings
+    if TIMING_PROFILE_FILE:
+        load_timing_profile(TIMING_PROFILE_FILE) # Before the bot reads any timing constant
 
-    bot = ColosseumTicketBot() # Initialization calculates activation time etc.
+    try:
+        bot = ColosseumTicketBot() # Initialization calculates activation time etc.
+    except ValueError as e:
+        logging.critical(f"Invalid configuration: {e}")
+        sys.exit(1)
     final_status = False
+    outcome = None # None = derived from final_status
+    orchestrator = None
     try:
+        # FAST_START: Chrome launches on a worker thread while the clock check and config logging run
+        browser_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="browser-start") if FAST_START else None
+        browser_future = browser_pool.submit(bot.setup_driver) if browser_pool else None
+        if CLOCK_SYNC_ENABLED:
+            bot.sync_clock() # Logs the local clock offset so a skewed clock shows up before the drop
         logging.info("="*60 + "\n Starting Optimized Ticket Bot \n" + "="*60)
         # Log key configurations
         logging.info(f" Target Date: {TARGET_DATE}")
         logging.info(f" Activation Time (Rome): {ACTIVATION_TIME}")
-        logging.info(f" Desired Slot Match: '{bot.desired_slot_time_str}' ({PREFERRED_LANGUAGE})")
-        logging.info(f" Tickets: {FULL_PRICE_TICKETS} Full / {REDUCED_PRICE_TICKETS} Reduced")
+        for rank, preference in enumerate(bot.slot_preferences, start=1):
+            logging.info(f" Slot Preference #{rank}: '{preference.time}' ({preference.language}), "
+                         f"Tickets: {preference.full_price} Full / {preference.reduced_fare} Reduced")
         logging.info(f" Micro-Refresh: Lead={MICRO_REFRESH_LEAD_TIME_SECONDS}s, Window={MICRO_REFRESH_DURATION_BEFORE}s+{MICRO_REFRESH_DURATION_AFTER}s, Interval={MICRO_REFRESH_INTERVAL*1000:.0f}ms")
         logging.info(f" Fast Check: Interval={FAST_CHECK_INTERVAL*1000:.0f}ms, Max Attempts={MAX_FAST_CHECK_ATTEMPTS} (~{MAX_FAST_CHECK_ATTEMPTS*FAST_CHECK_INTERVAL:.1f}s window)")
-        logging.info(f" Key Delays (ms): SlotClick={DELAY_AFTER_SLOT_CLICK*1000:.0f}, QtySet={DELAY_BETWEEN_QTY_SET*1000:.0f}, PlusClick={DELAY_BETWEEN_PLUS_CLICKS*1000:.0f}, AfterQty={DELAY_AFTER_QTY_SET*1000:.0f}")
+        logging.info(f" Key Delays (ms): SlotClick={DELAY_AFTER_SLOT_CLICK*1000:.0f}, QtySet={DELAY_BETWEEN_QTY_SET*1000:.0f}, PlusClick={DELAY_BETWEEN_PLUS_CLICKS*1000:.0f}, AfterQty={DELAY_AFTER_QTY_SET*1000:.0f}"
+                 + (" (caps only: STATE_WAITS waits for the page state instead)" if STATE_WAITS else ""))
         logging.info(f" Using Undetected Chromedriver: {USE_UNDETECTED}")
         logging.info("="*60)
+        if browser_future is not None:
+            try:
+                browser_future.result() # Re-raises a setup_driver failure here
+            finally:
+                browser_pool.shutdown(wait=False)
+            bot.log_startup_breakdown(startup_started)
 
         # --- Run the main process ---
-        final_status = bot.check_for_tickets()
+        if USE_ASYNC_ORCHESTRATOR:
+            orchestrator = AcquisitionOrchestrator(bot)
+            final_status = asyncio.run(orchestrator.run())
+        else:
+            final_status = bot.check_for_tickets()
 
     except KeyboardInterrupt:
         logging.info("\n" + "="*60 + "\n Script interrupted by user (Ctrl+C). \n" + "="*60)
+        outcome = "interrupted"
         bot.save_screenshot("debug_user_interrupt")
     except Exception as e:
         logging.critical("\n" + "="*60 + f"\n CRITICAL ERROR in main execution: {e} \n" + "="*60, exc_info=True)
         bot.save_screenshot("debug_critical_main_error")
+        outcome = "error"
     finally:
         logging.info("="*60 + f"\n Script finished. Ticket Secured Status: {final_status} \n" + "="*60)
+        DEADLINE_WAITER.log_summary()
+        bot.save_run_history(final_status, outcome, orchestrator)
+        TRACER.export()
+        ARTIFACTS.take_deferred_screenshot(bot.driver) # Only still owed if the fast loop was interrupted
+        ARTIFACTS.close()
         bot.close()
         logging.info(" Cleanup complete. Exiting. ")
         logging.info("="*60)
\ No newline at end of file
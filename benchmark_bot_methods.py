@@ -0,0 +1,176 @@
+import time
+import json
+import pstats
+import cProfile
+import logging
+import argparse
+from datetime import datetime, timedelta
+
+import ColosseumFastTicket as cft
+from benchmark_check_for_tickets import percentile
+from fake_webdriver import FakeTicketPage, FakeWebDriver, LatencyModel
+from mock_ticket_server import DEFAULT_SLOT_TIMES
+
+
+# --- Per-method overhead benchmark against the in-process fake WebDriver ---
+# Runs single bot methods (select_time_slot, set_ticket_quantities, click_continue, run_fast_loop,
+# micro_refresh_loop) many times against FakeWebDriver/FakeTicketPage, no browser involved. Each
+# call's wall time is split into the injected command latency, the fake browser's own work (DOM
+# queries, script ports, simulated page time) and the rest: the bot's Python-side overhead plus
+# its own sleeps. With the default zero delays every state is reached at once, so the rest is pure
+# overhead; micro_refresh_loop always includes its scheduled waits (see its spans with --spans).
+
+CASES = ("select_time_slot", "set_ticket_quantities", "click_continue", "run_fast_loop", "micro_refresh_loop")
+
+
+def prepare(bot, page, case, args):
+    """Brings the fake page (and bot) to the state `case` starts from."""
+    bot.milestones = {}
+    bot.state_waits = []
+    if case == "micro_refresh_loop":
+        # Release a moment into the refresh window, which starts right away
+        release = datetime.now(bot.rome_tz) + timedelta(seconds=cft.MICRO_REFRESH_DURATION_BEFORE + args.refresh_lead)
+        bot.activation_dt_rome = release
+        page.release_at = release.timestamp()
+        bot.driver.get(page.event_url)
+        return
+    page.release_at = time.time() - 1
+    bot.driver.get(page.event_url)
+    if case in ("set_ticket_quantities", "click_continue") and not bot.select_time_slot():
+        raise RuntimeError("select_time_slot failed while preparing the fake page")
+    if case == "click_continue" and not bot.set_ticket_quantities():
+        raise RuntimeError("set_ticket_quantities failed while preparing the fake page")
+
+
+def run_case(bot, page, case, args):
+    """Calls the method args.repeat times (args.refresh_runs for micro_refresh_loop). Returns per-call samples."""
+    method = getattr(bot, case)
+    driver = bot.driver
+    profiler = cProfile.Profile() if args.profile else None
+    samples, spans = [], []
+    for _ in range(args.refresh_runs if case == "micro_refresh_loop" else args.repeat):
+        prepare(bot, page, case, args)
+        driver.reset_stats()
+        cft.TRACER.spans.clear()
+        if profiler is not None:
+            profiler.enable()
+        started = time.perf_counter()
+        ok = method()
+        wall = time.perf_counter() - started
+        if profiler is not None:
+            profiler.disable()
+        spans.extend(cft.TRACER.spans)
+        totals = driver.stats_total()
+        sample = {"ok": bool(ok), "wall_ms": wall * 1000, "commands": totals["count"], "latency_ms": totals["latency"] * 1000,
+                  "fake_ms": totals["fake"] * 1000, "page_ms": totals["idle"] * 1000}
+        sample["rest_ms"] = sample["wall_ms"] - sample["latency_ms"] - sample["fake_ms"] - sample["page_ms"]
+        if case == "micro_refresh_loop" and "container_detected" in bot.milestones:
+            sample["detected_ms"] = (bot.milestones["container_detected"] - page.release_at) * 1000
+        samples.append(sample)
+    return samples, span_summary(case, spans, len(samples)), profiler
+
+
+def span_summary(case, spans, calls):
+    """[(span name, count per call, mean us)] of the measured calls' spans below the method's own span."""
+    totals = {}
+    for span in spans:
+        if span["name"] != case:
+            entry = totals.setdefault(span["name"], [0, 0])
+            entry[0] += 1
+            entry[1] += span["end_ns"] - span["start_ns"]
+    return [(name, count / calls, total / count / 1000) for name, (count, total) in sorted(totals.items(), key=lambda item: -item[1][1])]
+
+
+def summarize(samples):
+    row = {"n": len(samples), "ok": sum(s["ok"] for s in samples),
+           "commands": sum(s["commands"] for s in samples) / len(samples)}
+    for key in ("wall_ms", "latency_ms", "fake_ms", "page_ms", "rest_ms", "detected_ms"):
+        values = [s[key] for s in samples if key in s]
+        row[key] = {"p50": percentile(values, 50), "p90": percentile(values, 90), "max": max(values) if values else None}
+    return row
+
+
+def format_ms(value, width=9):
+    return f"{value:>{width}.3f}" if value is not None else f"{'-':>{width}}"
+
+
+def print_report(rows, spans, args):
+    print("=" * 100)
+    print(f" Bot method overhead on the fake WebDriver (latency {args.latency * 1000:.1f}ms + jitter {args.jitter * 1000:.1f}ms per command, "
+          f"load {args.load_delay * 1000:.0f}ms, tariff render {args.tariff_render_delay * 1000:.0f}ms, continue {args.continue_delay * 1000:.0f}ms)")
+    print(f" STATE_WAITS={cft.STATE_WAITS} MICRO_REFRESH_MODE={cft.MICRO_REFRESH_MODE} "
+          f"USE_MUTATION_OBSERVER_DETECTION={cft.USE_MUTATION_OBSERVER_DETECTION}; ms per call: p50 (p90)")
+    print("-" * 100)
+    print(f" {'method':<24}{'ok':>9}{'cmds':>7}{'wall':>19}{'latency':>10}{'fake':>10}{'page':>10}{'rest':>19}")
+    for case, row in rows.items():
+        print(f" {case:<24}{row['ok']:>4}/{row['n']:<4}{row['commands']:>7.1f}"
+              f"{format_ms(row['wall_ms']['p50'])} ({format_ms(row['wall_ms']['p90'], 7)}){format_ms(row['latency_ms']['p50'], 10)}"
+              f"{format_ms(row['fake_ms']['p50'], 10)}{format_ms(row['page_ms']['p50'], 10)}"
+              f"{format_ms(row['rest_ms']['p50'])} ({format_ms(row['rest_ms']['p90'], 7)})")
+        if row["detected_ms"]["p50"] is not None:
+            print(f" {'':<24}container detected {row['detected_ms']['p50']:.1f}ms after release (p90 {row['detected_ms']['p90']:.1f}ms)")
+    for case, summary in spans.items():
+        if not summary:
+            continue
+        print("-" * 100)
+        print(f"   {case + ' spans':<60}{'per call':>10}{'mean us':>12}")
+        for name, per_call, mean_us in summary[:args.spans_top]:
+            print(f"   {name:<60}{per_call:>10.2f}{mean_us:>12.1f}")
+    print("=" * 100)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Python-side overhead of single bot methods on the in-process fake WebDriver.")
+    parser.add_argument("--case", action="append", choices=CASES, dest="cases", help="Only this method (repeatable)")
+    parser.add_argument("--repeat", type=int, default=200, help="Calls per method")
+    parser.add_argument("--refresh-runs", type=int, default=5, help="Calls of micro_refresh_loop (each spans a refresh window)")
+    parser.add_argument("--refresh-lead", type=float, default=0.2, help="Seconds between the refresh window start and the release")
+    parser.add_argument("--latency", type=float, default=0.0, help="Modelled WebDriver round trip per command in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Additional random latency per command in seconds")
+    parser.add_argument("--load-delay", type=float, default=0.0, help="Seconds per page load / reload")
+    parser.add_argument("--tariff-render-delay", type=float, default=0.0, help="Seconds from slot click to tariff picker")
+    parser.add_argument("--continue-delay", type=float, default=0.0, help="Seconds from continue click to the cart navigation")
+    parser.add_argument("--language", choices=["english", "italian"], default="english")
+    parser.add_argument("--refresh-mode", choices=["interval", "lifecycle", "probe"], default=cft.MICRO_REFRESH_MODE,
+                        help="MICRO_REFRESH_MODE for micro_refresh_loop")
+    parser.add_argument("--observer", action="store_true", help="Detect the container with the in-page observer (USE_MUTATION_OBSERVER_DETECTION)")
+    parser.add_argument("--fixed-delays", action="store_true", help="Sleep the DELAY_* values instead of waiting for page state (STATE_WAITS off)")
+    parser.add_argument("--spans", action="store_true", help="Trace the calls and list the top spans per method (adds tracing cost)")
+    parser.add_argument("--spans-top", type=int, default=12)
+    parser.add_argument("--profile", type=int, default=0, metavar="N", help="cProfile every method and print its top N functions by cumulative time")
+    parser.add_argument("--verbose", action="store_true", help="Keep the bot's INFO logging")
+    parser.add_argument("--json", dest="json_path", help="Write the raw samples and summaries to this file")
+    args = parser.parse_args()
+
+    cft.STATE_WAITS = not args.fixed_delays
+    cft.MICRO_REFRESH_MODE = args.refresh_mode
+    cft.USE_MUTATION_OBSERVER_DETECTION = args.observer
+    cft.USE_DIRECT_CDP = cft.USE_SINGLE_ROUNDTRIP_PURCHASE = False # Not modelled: PURCHASE_SEQUENCE_JS has no Python port
+    cft.TRACER.enabled = args.spans
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    bot = cft.ColosseumTicketBot()
+    bot.interactive = False
+    slot_times = [bot.desired_slot_time_str] + [t for t in DEFAULT_SLOT_TIMES if t != bot.desired_slot_time_str]
+    page = FakeTicketPage(time.time() - 1, slot_times=slot_times, site_language=args.language, load_delay=args.load_delay,
+                          tariff_render_delay=args.tariff_render_delay, continue_delay=args.continue_delay)
+    bot.driver = FakeWebDriver(page, LatencyModel(args.latency, args.jitter))
+    cft.TRACER.instrument_driver(bot.driver)
+    bot.driver.get(page.event_url)
+    bot.detect_site_language()
+
+    rows, spans, raw = {}, {}, {}
+    for case in args.cases or CASES:
+        samples, spans[case], profiler = run_case(bot, page, case, args)
+        rows[case], raw[case] = summarize(samples), samples
+        if profiler is not None:
+            print(f"--- cProfile: {case} ({len(samples)} calls), top {args.profile} by cumulative time ---")
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(args.profile)
+    bot.close()
+
+    cft.flush_logs()
+    print_report(rows, spans, args)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump({"summary": rows, "spans": spans, "samples": raw}, fh, indent=2)
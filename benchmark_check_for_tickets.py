@@ -0,0 +1,232 @@
+import json
+import math
+import asyncio
+import time
+import statistics
+import logging
+import argparse
+from datetime import datetime
+
+import pytz
+
+import ColosseumFastTicket as cft
+from mock_ticket_server import MockTicketServer, DEFAULT_SLOT_TIMES
+
+
+# --- End-to-end latency benchmark of check_for_tickets against the mock server ---
+# Every run schedules a fresh release a few seconds ahead, lets the bot go through
+# initial load -> wait -> micro-refresh -> fast loop, and measures each hot-path
+# milestone relative to the release instant.
+
+MILESTONES = ["container_detected", "slot_clicked", "quantities_set", "continue_clicked", "cart_reached"]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (None if empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def schedule_release(lead_seconds):
+    """Points the bot configuration at a release `lead_seconds` from now (whole seconds, Rome time)."""
+    release_epoch = math.ceil(time.time() + lead_seconds)
+    release_rome = datetime.fromtimestamp(release_epoch, pytz.timezone(cft.ROME_TIMEZONE))
+    cft.TARGET_DATE = release_rome.strftime("%Y-%m-%d")
+    cft.ACTIVATION_TIME = release_rome.strftime("%H:%M:%S")
+    return release_epoch
+
+
+def run_once(driver, args, cdp=None, network_interceptor=None):
+    """Runs one full check_for_tickets cycle and returns milestone latencies in ms after release."""
+    release_epoch = schedule_release(args.lead)
+    bot = cft.ColosseumTicketBot()
+    bot.interactive = False
+    bot.driver = driver
+    bot.cdp = cdp
+    bot.network_interceptor = network_interceptor
+    slot_times = [bot.desired_slot_time_str] + [t for t in DEFAULT_SLOT_TIMES if t != bot.desired_slot_time_str]
+    server = MockTicketServer(release_epoch, port=args.port, latency=args.latency, latency_jitter=args.jitter,
+                              slot_times=slot_times, site_language=args.language, page_assets=args.page_assets).start()
+    cft.BASE_URL = server.event_url
+    if args.probe_fragment:
+        cft.AVAILABILITY_PROBE_URL = server.availability_url
+    try:
+        orchestrator = cft.AcquisitionOrchestrator(bot) if args.orchestrator else None
+        if orchestrator is not None:
+            success = asyncio.run(orchestrator.run())
+        else:
+            success = bot.check_for_tickets()
+        # Let the cart navigation land before reading the server log
+        deadline = time.time() + 2.0
+        while success and server.first_event("cart") is None and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        server.stop()
+
+    result = {"success": success, "release_epoch": release_epoch, "attempts": bot.attempt_count}
+    for name in MILESTONES[:-1]:
+        stamp = bot.milestones.get(name)
+        result[name] = (stamp - release_epoch) * 1000 if stamp is not None else None
+    cart_stamp = server.first_event("cart")
+    result["cart_reached"] = (cart_stamp - release_epoch) * 1000 if cart_stamp is not None else None
+    result["page_weight"] = bot.page_weights.get("initial load")
+    result["assets_served"] = sum(1 for _, kind, _ in server.events if kind == "asset")
+    if args.history:
+        bot.save_run_history(success, orchestrator=orchestrator, label="benchmark", path=args.history,
+                             extra={"mock_latency": args.latency, "mock_jitter": args.jitter},
+                             extra_phases={"release->cart_reached": result["cart_reached"]})
+    return result
+
+
+def time_command(func, repeat):
+    """Calls `func` `repeat` times and returns per-call latencies in ms."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def transport_benchmark(bot, repeat):
+    """Per-command latency of WebDriver vs direct CDP for the commands on the refresh hot path."""
+    server = MockTicketServer(time.time() - 1, latency=0.0).start() # Already released: container present
+    try:
+        bot.driver.get(server.event_url)
+        selector = cft.PRIMARY_CONTAINER_SELECTOR
+        cases = [
+            ("script 'return 1'", "webdriver", lambda: bot.driver.execute_script("return 1")),
+            ("script 'return 1'", "cdp", lambda: bot.cdp.run_script("return 1")),
+            ("container query", "webdriver", lambda: bot.driver.find_elements(cft.By.CSS_SELECTOR, selector)),
+            ("container query", "cdp", lambda: bot.cdp.query_selector_exists(selector)),
+            ("hard reload", "webdriver", lambda: cft.js_reload(bot.driver)),
+            ("hard reload", "cdp", lambda: bot.cdp.reload(ignore_cache=True)),
+        ]
+        rows = []
+        for name, transport, func in cases:
+            if transport == "cdp" and bot.cdp is None:
+                continue
+            func() # Warm-up
+            samples = time_command(func, repeat)
+            rows.append({"command": name, "transport": transport, "n": len(samples), "min": min(samples),
+                         "p50": percentile(samples, 50), "p90": percentile(samples, 90), "max": max(samples)})
+    finally:
+        server.stop()
+
+    print("=" * 72)
+    print(f" Transport benchmark ({repeat} calls per command, mock server without latency)")
+    print("-" * 72)
+    print(f" {'command':<20}{'transport':<12}{'min':>9}{'p50':>9}{'p90':>9}{'max':>9}")
+    for row in rows:
+        print(f" {row['command']:<20}{row['transport']:<12}" + "".join(f"{row[key]:>9.2f}" for key in ("min", "p50", "p90", "max")))
+    if bot.cdp is None:
+        print(" (direct CDP transport not connected, only WebDriver measured)")
+    print("=" * 72)
+    return rows
+
+
+def summarize(results):
+    """Builds per-milestone min/p50/p90/max over the successful samples."""
+    summary = {}
+    for name in MILESTONES:
+        values = [r[name] for r in results if r.get(name) is not None]
+        summary[name] = {
+            "n": len(values),
+            "min": min(values) if values else None,
+            "p50": percentile(values, 50),
+            "p90": percentile(values, 90),
+            "max": max(values) if values else None,
+        }
+    return summary
+
+
+def print_report(results, summary, args):
+    successes = sum(1 for r in results if r["success"])
+    print("=" * 72)
+    print(f" check_for_tickets benchmark: {successes}/{len(results)} successful runs "
+          f"(latency {args.latency * 1000:.0f}ms + jitter {args.jitter * 1000:.0f}ms)")
+    print(f" MICRO_REFRESH_MODE={cft.MICRO_REFRESH_MODE} MICRO_REFRESH_INTERVAL={cft.MICRO_REFRESH_INTERVAL * 1000:.0f}ms FAST_CHECK_INTERVAL={cft.FAST_CHECK_INTERVAL * 1000:.0f}ms "
+          f"STATE_WAITS={cft.STATE_WAITS} DELAY_AFTER_SLOT_CLICK={cft.DELAY_AFTER_SLOT_CLICK * 1000:.0f}ms DELAY_AFTER_QTY_SET={cft.DELAY_AFTER_QTY_SET * 1000:.0f}ms")
+    weights = [r["page_weight"] for r in results if r.get("page_weight")]
+    if weights:
+        saved = [w["saved_kib"] for w in weights if "saved_kib" in w]
+        print(f" page weight per load: {statistics.mean(w['requests'] for w in weights):.1f} requests, "
+              f"{statistics.mean(w['kib'] for w in weights):.1f} KiB; blocked {statistics.mean(w['blocked_requests'] for w in weights):.1f} requests"
+              + (f", ~{statistics.mean(saved):.1f} KiB saved" if saved else "")
+              + f" (NETWORK_POLICY_ENABLED={cft.NETWORK_POLICY_ENABLED}, mock assets served: {sum(r['assets_served'] for r in results)})")
+    print("-" * 72)
+    print(f" {'milestone (ms after release)':<30}{'n':>4}{'min':>9}{'p50':>9}{'p90':>9}{'max':>9}")
+    for name in MILESTONES:
+        row = summary[name]
+        cells = "".join(f"{row[key]:>9.1f}" if row[key] is not None else f"{'-':>9}" for key in ("min", "p50", "p90", "max"))
+        print(f" {name:<30}{row['n']:>4}{cells}")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark check_for_tickets end-to-end against the offline mock server.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--lead", type=float, default=12.0, help="Seconds between run start and slot release")
+    parser.add_argument("--latency", type=float, default=0.02, help="Server latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Additional random server latency in seconds")
+    parser.add_argument("--language", choices=["english", "italian"], default="english")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--headed", action="store_true", help="Show the browser window")
+    parser.add_argument("--json", dest="json_path", help="Write raw results and summary to this file")
+    parser.add_argument("--trace", action="store_true", help="Record spans and export them (TRACE_JSONL_FILE / TRACE_CHROME_FILE)")
+    parser.add_argument("--refresh-mode", choices=["interval", "lifecycle", "probe"], default=cft.MICRO_REFRESH_MODE,
+                        help="MICRO_REFRESH_MODE for the runs")
+    parser.add_argument("--probe-fragment", action="store_true",
+                        help="In probe mode, fetch the mock's slot fragment instead of the whole event page")
+    parser.add_argument("--cdp", action="store_true", help="Use the direct CDP transport (USE_DIRECT_CDP)")
+    parser.add_argument("--page-assets", action="store_true", help="Serve images, a web font and a tag manager script with the event page")
+    parser.add_argument("--network-policy", action="store_true",
+                        help="Enable NETWORK_POLICY_ENABLED (with an unblocked baseline load to report the bytes saved)")
+    parser.add_argument("--record-dom", action="store_true",
+                        help="Record DOM snapshots of every page state (DOM_SNAPSHOT_DIR) for replay_dom_snapshots.py")
+    parser.add_argument("--orchestrator", action="store_true", help="Run each cycle through AcquisitionOrchestrator instead of check_for_tickets()")
+    parser.add_argument("--readiness", action="store_true",
+                        help="Run the pre-drop readiness check 3s into each cycle (needs --lead of 15s or more)")
+    parser.add_argument("--fixed-delays", action="store_true", help="Sleep the DELAY_* values instead of waiting for page state (STATE_WAITS off)")
+    parser.add_argument("--history", nargs="?", const=cft.RUN_HISTORY_DB, metavar="DB",
+                        help="Record every cycle (label 'benchmark') in the run history store (default RUN_HISTORY_DB)")
+    parser.add_argument("--transport-bench", type=int, default=0, metavar="N",
+                        help="Before the runs, time N calls per command over WebDriver and direct CDP")
+    args = parser.parse_args()
+
+    cft.BROWSER_HEADLESS = not args.headed
+    cft.TRACER.enabled = args.trace
+    cft.USE_DIRECT_CDP = args.cdp or args.transport_bench > 0
+    cft.MICRO_REFRESH_MODE = args.refresh_mode
+    cft.NETWORK_POLICY_ENABLED = cft.NETWORK_POLICY_BASELINE = args.network_policy
+    cft.DOM_SNAPSHOT_ENABLED = args.record_dom
+    cft.STATE_WAITS = not args.fixed_delays
+    cft.READINESS_CHECK_ENABLED = args.readiness
+    if args.readiness:
+        # Only seconds until the mock release: check early and accept a short headroom (the mock reloads in ms)
+        cft.READINESS_CHECK_BEFORE, cft.READINESS_MIN_HEADROOM = args.lead - 3, 3
+    setup_bot = cft.ColosseumTicketBot()
+    setup_bot.setup_driver()
+    results = []
+    transport_rows = None
+    try:
+        if args.transport_bench > 0:
+            transport_rows = transport_benchmark(setup_bot, args.transport_bench)
+        for run in range(1, args.runs + 1):
+            logging.info(f"--- Benchmark run {run}/{args.runs} ---")
+            results.append(run_once(setup_bot.driver, args, cdp=setup_bot.cdp if args.cdp else None,
+                                    network_interceptor=setup_bot.network_interceptor))
+    finally:
+        setup_bot.close()
+
+    summary = summarize(results)
+    print_report(results, summary, args)
+    cft.DEADLINE_WAITER.log_summary()
+    cft.TRACER.export()
+    cft.ARTIFACTS.close()
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump({"results": results, "summary": summary, "transport": transport_rows}, fh, indent=2)
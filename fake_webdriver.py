@@ -0,0 +1,863 @@
+import re
+import html
+import time
+import heapq
+import random
+import itertools
+from urllib.parse import urlparse, urlencode
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.command import Command
+from selenium.common.exceptions import (
+    NoSuchElementException, StaleElementReferenceException, InvalidSelectorException,
+    JavascriptException, TimeoutException, WebDriverException, InvalidSessionIdException,
+)
+
+import ColosseumFastTicket as cft
+from mock_ticket_server import SITE_TEXTS, EVENT_PATH, CART_PATH, AVAILABILITY_PATH, DEFAULT_SLOT_TIMES, DEFAULT_LANGUAGES
+
+
+# --- In-process fake WebDriver over an in-memory DOM ---
+# Implements the part of the Selenium API the bot uses (find_element(s) on the driver and on
+# elements, execute_script / execute_async_script, get/refresh/current_url, WebDriverWait and
+# expected_conditions lookups) against FakeTicketPage, a Python model of the mock server's event
+# page and its click handlers. Element handles go stale like in a browser once their node is
+# removed or the document is replaced. In-page scripts are not interpreted: every script the bot
+# sends is matched by its exact text to a Python port (FakeWebDriver.SCRIPTS). Every command goes
+# through execute(), which sleeps the LatencyModel delay and records per-command counts and time,
+# so the bot's own Python-side overhead can be separated from the simulated browser.
+
+FAKE_BASE_URL = "http://fake-ticket-site.local"
+
+
+# --- DOM model ---
+
+class FakeNode:
+    """Element (or the document, tag '#document') of the in-memory DOM; `text` is its own text."""
+    __slots__ = ("uid", "tag", "attrs", "text", "children", "parent", "checked")
+    _uids = itertools.count(1)
+
+    def __init__(self, tag, attrs=None, text=""):
+        self.uid = next(self._uids)
+        self.tag = tag
+        self.attrs = dict(attrs or {})
+        self.text = text
+        self.children = []
+        self.parent = None
+        self.checked = False
+
+    @property
+    def classes(self):
+        return self.attrs.get("class", "").split()
+
+    def append(self, *children):
+        for child in children:
+            child.parent = self
+            self.children.append(child)
+        return self
+
+    def remove(self):
+        if self.parent is not None:
+            self.parent.children.remove(self)
+            self.parent = None
+
+    def root(self):
+        node = self
+        while node.parent is not None:
+            node = node.parent
+        return node
+
+    def descendants(self):
+        """Every element below this node, in document order."""
+        stack = list(reversed(self.children))
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def text_content(self):
+        return self.text + "".join(child.text_content() for child in self.children)
+
+    def is_displayed(self):
+        node = self
+        while node is not None:
+            if "hidden" in node.attrs or "display:none" in node.attrs.get("style", "").replace(" ", ""):
+                return False
+            node = node.parent
+        return True
+
+    def matches(self, selector):
+        return _matches_any(self, parse_selector(selector))
+
+    def closest(self, selector):
+        node = self
+        while node is not None and node.tag != "#document":
+            if node.matches(selector):
+                return node
+            node = node.parent
+        return None
+
+    def outer_html(self):
+        if self.tag == "#document":
+            return "<!DOCTYPE html>\n" + "".join(child.outer_html() for child in self.children)
+        attrs = "".join(f' {name}="{html.escape(value, quote=True)}"' if value != "" else f" {name}"
+                        for name, value in self.attrs.items())
+        inner = html.escape(self.text, quote=False) + "".join(child.outer_html() for child in self.children)
+        return f"<{self.tag}{attrs}>" if self.tag in ("input", "meta") else f"<{self.tag}{attrs}>{inner}</{self.tag}>"
+
+
+def element(tag, attrs=None, *children, text=""):
+    """FakeNode builder: element("div", {"class": "x"}, child, ..., text="...")."""
+    return FakeNode(tag, attrs, text).append(*children)
+
+
+# --- CSS selectors (the subset the bot's selectors use) ---
+# Compound selectors of tag, #id, .class, [attr] / [attr=value] and :not(compound), joined by
+# descendant (space) or child (>) combinators, and comma-separated lists. Parsed once per string.
+
+_SELECTOR_CACHE = {}
+_SIMPLE_SELECTOR = re.compile(r"""(?P<tag>[a-zA-Z][\w-]*|\*)|\#(?P<id>[\w-]+)|\.(?P<cls>[\w-]+)"""
+                              r"""|\[(?P<attr>[\w-]+)(?:=(?P<quote>['"]?)(?P<value>[^'"\]]*)(?P=quote))?\]|:not\((?P<neg>[^)]*)\)""")
+
+
+def parse_selector(selector):
+    """Selector list -> alternatives, each a list of (combinator, compound) from left to right."""
+    parsed = _SELECTOR_CACHE.get(selector)
+    if parsed is None:
+        parsed = _SELECTOR_CACHE[selector] = [_parse_complex(part.strip(), selector) for part in selector.split(",")]
+    return parsed
+
+
+def _parse_complex(text, selector):
+    steps, combinator = [], " "
+    for token in re.findall(r">|[^\s>]+", text):
+        if token == ">":
+            combinator = ">"
+            continue
+        steps.append((combinator, _parse_compound(token, selector)))
+        combinator = " "
+    if not steps:
+        raise InvalidSelectorException(f"invalid selector: {selector!r}")
+    return steps
+
+
+def _parse_compound(token, selector):
+    compound = {"tag": None, "id": None, "classes": [], "attrs": [], "nots": []}
+    pos = 0
+    while pos < len(token):
+        match = _SIMPLE_SELECTOR.match(token, pos)
+        if match is None or (match.group("tag") and pos > 0):
+            raise InvalidSelectorException(f"invalid selector (unsupported by the fake driver): {selector!r}")
+        if match.group("tag"):
+            compound["tag"] = None if match.group("tag") == "*" else match.group("tag").lower()
+        elif match.group("id"):
+            compound["id"] = match.group("id")
+        elif match.group("cls"):
+            compound["classes"].append(match.group("cls"))
+        elif match.group("attr"):
+            compound["attrs"].append((match.group("attr"), match.group("value"))) # value None: presence only
+        else:
+            compound["nots"].append(_parse_compound(match.group("neg"), selector))
+        pos = match.end()
+    return compound
+
+
+def _matches_compound(node, compound):
+    if compound["tag"] is not None and node.tag != compound["tag"]:
+        return False
+    if compound["id"] is not None and node.attrs.get("id") != compound["id"]:
+        return False
+    if compound["classes"]:
+        classes = node.classes
+        if any(name not in classes for name in compound["classes"]):
+            return False
+    for name, value in compound["attrs"]:
+        if name not in node.attrs or (value is not None and node.attrs[name] != value):
+            return False
+    return not any(_matches_compound(node, negated) for negated in compound["nots"])
+
+
+def _matches(node, steps, index):
+    if not _matches_compound(node, steps[index][1]):
+        return False
+    if index == 0:
+        return True
+    parent = node.parent
+    if steps[index][0] == ">":
+        return parent is not None and parent.tag != "#document" and _matches(parent, steps, index - 1)
+    while parent is not None and parent.tag != "#document":
+        if _matches(parent, steps, index - 1):
+            return True
+        parent = parent.parent
+    return False
+
+
+def _matches_any(node, alternatives):
+    for steps in alternatives:
+        if _matches(node, steps, len(steps) - 1):
+            return True
+    return False
+
+
+def query_all(root, selector):
+    """querySelectorAll: matching descendants of `root` in document order."""
+    alternatives = parse_selector(selector)
+    return [node for node in root.descendants() if _matches_any(node, alternatives)]
+
+
+def query_first(root, selector):
+    """querySelector: first matching descendant of `root`, or None."""
+    alternatives = parse_selector(selector)
+    for node in root.descendants():
+        if _matches_any(node, alternatives):
+            return node
+    return None
+
+
+# --- Ports of the bot's in-page logic ---
+
+def _norm(text):
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def _norm_time(text):
+    return re.sub(r"^0(?=\d)", "", _norm(text).upper())
+
+
+def resolve_slot(container, cfg):
+    """Python port of SLOT_RESOLVER_FN's resolveSlot() (same result keys, `label` is a FakeNode)."""
+    prefs = cfg["preferences"]
+    times = [_norm_time(p["slotTime"]) for p in prefs]
+    in_section, saw_section = [False] * len(prefs), [False] * len(prefs)
+    by_section, any_section = [None] * len(prefs), [None] * len(prefs)
+    scanned = 0
+    for node in query_all(container, "h3.lang_section, label"):
+        if node.tag == "h3":
+            text = _norm(node.text_content()).lower()
+            for k, pref in enumerate(prefs):
+                in_section[k] = any(activity in text and language in text for activity, language in pref["sections"])
+                saw_section[k] = saw_section[k] or in_section[k]
+            continue
+        scanned += 1
+        span = query_first(node, "div > span") # ":scope div > span" in the page: query_first only searches descendants
+        if span is None:
+            continue
+        slot_time, state = _norm_time(span.text_content()), None
+        for m in range(len(prefs)):
+            if times[m] != slot_time:
+                continue
+            state = state or _label_state(node, cfg)
+            bucket = by_section if in_section[m] else any_section
+            if bucket[m] is None or (bucket[m][1] != "found" and state == "found"):
+                bucket[m] = (node, state)
+    fallback = not any(saw_section)
+    reasons = []
+    for rank in range(len(prefs)):
+        entry = any_section[rank] if fallback else by_section[rank]
+        reasons.append(entry[1] if entry else "not_found" if (fallback or saw_section[rank]) else "no_language")
+        if entry and entry[1] == "found":
+            return {"label": entry[0], "rank": rank, "reason": "found", "reasons": reasons, "scanned": scanned, "fallback": fallback}
+    return {"label": None, "rank": -1, "reason": reasons[0], "reasons": reasons, "scanned": scanned, "fallback": fallback}
+
+
+def _label_state(label, cfg):
+    radio = query_first(label, "input[type=radio][name=slot]")
+    if "unselectable" in label.classes:
+        return "sold_out"
+    if radio is None or "disabled" in radio.attrs:
+        return "disabled"
+    if cfg.get("checkVisible") and not label.is_displayed():
+        return "hidden"
+    return "found"
+
+
+def quantity_value(row, selector):
+    """Python port of STATE_CHECK_FN's quantityValue()."""
+    counter = query_first(row, selector) if row is not None else None
+    if counter is None:
+        return None
+    match = re.match(r"\s*([+-]?\d+)", counter.attrs.get("value", "") if counter.tag == "input" else counter.text_content())
+    return int(match.group(1)) if match else None
+
+
+def continue_enabled(button):
+    """Python port of STATE_CHECK_FN's continueEnabled()."""
+    return (button is not None and "disabled" not in button.attrs and "disabled" not in button.classes
+            and button.attrs.get("aria-disabled") != "true")
+
+
+# --- Page model ---
+
+class FakeTicketPage:
+    """The mock server's event page (same markup and widget behaviour) as an in-memory document.
+
+    The slots appear in documents loaded at or after `release_at` (epoch seconds). Delays are in
+    seconds: load_delay per navigation, tariff_render_delay between a slot click and the tariff
+    picker, continue_delay between the buy click and the cart navigation. Scheduled work (timers)
+    runs whenever the driver handles a command (pump()), like page tasks between two commands.
+    """
+
+    def __init__(self, release_at, slot_times=None, languages=None, sold_out_times=None, site_language="english",
+                 load_delay=0.0, tariff_render_delay=0.03, continue_delay=0.05):
+        self.release_at = release_at
+        self.slot_times = list(slot_times or DEFAULT_SLOT_TIMES)
+        self.languages = list(languages or DEFAULT_LANGUAGES)
+        self.sold_out_times = set(sold_out_times or [])
+        self.site_language = site_language
+        self.load_delay = load_delay
+        self.tariff_render_delay = tariff_render_delay
+        self.continue_delay = continue_delay
+        self.events = [] # (epoch, kind, path) tuples, as MockTicketServer.events
+        self.url = "about:blank"
+        self.document = FakeNode("#document")
+        self.document_bytes = 0
+        self.selected_slot = None
+        self._timers = [] # heap of [due perf_counter, seq, callback, cancelled]
+        self._seq = itertools.count()
+        self._picker_timer = None
+
+    @property
+    def event_url(self):
+        return FAKE_BASE_URL + EVENT_PATH
+
+    def released(self, now=None):
+        return (time.time() if now is None else now) >= self.release_at
+
+    def first_event(self, kind):
+        return next((ts for ts, event_kind, _ in self.events if event_kind == kind), None)
+
+    # --- Timers ---
+
+    def schedule(self, delay, callback):
+        timer = [time.perf_counter() + delay, next(self._seq), callback, False]
+        heapq.heappush(self._timers, timer)
+        return timer
+
+    def next_timer_due(self):
+        while self._timers and self._timers[0][3]:
+            heapq.heappop(self._timers)
+        return self._timers[0][0] if self._timers else None
+
+    def pump(self):
+        """Runs every timer that is due (callbacks may schedule more)."""
+        now = time.perf_counter()
+        while self._timers and self._timers[0][0] <= now:
+            timer = heapq.heappop(self._timers)
+            if not timer[3]:
+                timer[2]()
+
+    # --- Navigation ---
+
+    def render(self, url):
+        """(document, kind) for `url` as the mock server would serve it now."""
+        parsed = urlparse(url)
+        texts = SITE_TEXTS[self.site_language]
+        if parsed.path in ("/", EVENT_PATH):
+            kind = "event_released" if self.released() else "event"
+            return self._document(element("title", text="Colosseum - Full Experience"), element("body", None,
+                element("h1", text="Full Experience Underground and Arena"),
+                element("div", {"id": "slot-anchor"}, self.render_availability()),
+                element("div", {"id": "tariff-anchor"}),
+                element("a", {"id": "buy-button", "class": "btn disabled", "aria-disabled": "true", "href": CART_PATH},
+                        text=texts["continue"]))), kind
+        if parsed.path == AVAILABILITY_PATH:
+            return self._document(element("title"), element("body", None, self.render_availability())), "probe"
+        if parsed.path == CART_PATH:
+            items = [element("li", text=f"{key}: {value}") for key, value in sorted(
+                pair.split("=", 1) for pair in parsed.query.split("&") if "=" in pair)]
+            return self._document(element("title", text=texts["cart"]), element("body", None,
+                element("h1", {"class": "cart-title"}, text=texts["cart"]), element("ul", {"class": "cart-items"}, *items))), "cart"
+        return self._document(element("title"), element("body", text="Not found")), "not_found"
+
+    def render_availability(self):
+        if not self.released():
+            return element("div", {"class": "abc-no-availability"}, text=SITE_TEXTS[self.site_language]["not_available"])
+        texts = SITE_TEXTS[self.site_language]
+        group = element("div", {"class": "abc-slotpicker-group"})
+        for language in self.languages:
+            group.append(element("h3", {"class": "lang_section"}, text=f"{texts['activity_in']} {texts['languages'][language]}"))
+            for index, slot_time in enumerate(self.slot_times):
+                sold_out = slot_time in self.sold_out_times
+                radio = {"type": "radio", "name": "slot", "value": f"{language.lower()}-{index}"}
+                if sold_out:
+                    radio["disabled"] = ""
+                group.append(element("label", {"class": "abc-slot unselectable" if sold_out else "abc-slot"},
+                                     element("input", radio), element("div", None, element("span", text=slot_time))))
+        return group
+
+    @staticmethod
+    def _document(title, body):
+        return element("#document", None, element("html", None, element("head", None, title), body))
+
+    def navigate(self, url):
+        """Replaces the document (every element handle of the old one goes stale) and drops its timers."""
+        document, kind = self.render(url)
+        self._timers = []
+        self._picker_timer = None
+        self.selected_slot = None
+        self.url, self.document = url, document
+        self.document_bytes = len(document.outer_html().encode("utf-8"))
+        self.events.append((time.time(), kind, urlparse(url).path))
+
+    def reload(self):
+        """window.location.reload(): the current document stays until the new one arrives."""
+        url = self.url
+        self.schedule(self.load_delay, lambda: self.navigate(url))
+
+    def fetch(self, url):
+        """(document, bytes) of a same-session fetch of `url`, without navigating."""
+        document, kind = self.render(url)
+        self.events.append((time.time(), kind, urlparse(url).path))
+        return document, len(document.outer_html().encode("utf-8"))
+
+    # --- Widget behaviour (PAGE_SCRIPT of the mock server) ---
+
+    def click(self, node):
+        label = node.closest("div.abc-slotpicker-group label")
+        if label is not None:
+            radio = query_first(label, "input[type=radio]")
+            if radio is None or "disabled" in radio.attrs or "unselectable" in label.classes:
+                return
+            for other in query_all(self.document, "input[type=radio][name=slot]"):
+                other.checked = False
+            radio.checked = True
+            self.selected_slot = radio.attrs.get("value")
+            old = query_first(self.document, "div.abc-tariffpicker")
+            if old is not None:
+                old.remove()
+            if self._picker_timer is not None:
+                self._picker_timer[3] = True
+            self._picker_timer = self.schedule(self.tariff_render_delay, self._render_tariff_picker)
+            return
+        button = node.closest("div.tariff-option button.plus, div.tariff-option button.minus")
+        if button is not None:
+            quantity = query_first(button.parent, "span.quantity")
+            value = (quantity_value(button.parent, "span.quantity") or 0) + (1 if "plus" in button.classes else -1)
+            quantity.text = str(max(0, value))
+            self._refresh_buy_button(button.closest("div.abc-tariffpicker"))
+            return
+        buy = node.closest("a#buy-button")
+        if buy is not None and continue_enabled(buy):
+            params = {"slot": self.selected_slot or ""}
+            for row in query_all(self.document, "div.tariff-option"):
+                params[row.attrs["data-tariff"]] = str(quantity_value(row, "span.quantity") or 0)
+            cart_url = f"{FAKE_BASE_URL}{CART_PATH}?{urlencode(params)}"
+            self.schedule(self.continue_delay, lambda: self.navigate(cart_url))
+
+    def _render_tariff_picker(self):
+        self._picker_timer = None
+        texts = SITE_TEXTS[self.site_language]
+        picker = element("div", {"class": "abc-tariffpicker"}, *[
+            element("div", {"class": "tariff-option", "data-tariff": key},
+                    element("span", {"class": "title"}, text=texts[key]),
+                    element("button", {"type": "button", "class": "minus"}, element("span", {"class": "fa-minus"})),
+                    element("span", {"class": "quantity"}, text="0"),
+                    element("button", {"type": "button", "class": "plus"}, element("span", {"class": "fa-plus"})))
+            for key in ("full_price", "reduced_fare")])
+        anchor = query_first(self.document, "#tariff-anchor")
+        if anchor is not None:
+            anchor.append(picker)
+        self._refresh_buy_button(picker)
+
+    def _refresh_buy_button(self, picker):
+        buy = query_first(self.document, "a#buy-button")
+        if buy is None:
+            return
+        total = sum(quantity_value(row, "span.quantity") or 0 for row in query_all(picker, "div.tariff-option")) if picker is not None else 0
+        classes = [name for name in buy.classes if name != "disabled"]
+        if total > 0:
+            buy.attrs["class"] = " ".join(classes)
+            buy.attrs.pop("aria-disabled", None)
+        else:
+            buy.attrs["class"] = " ".join(classes + ["disabled"])
+            buy.attrs["aria-disabled"] = "true"
+
+
+# --- Latency model ---
+
+class LatencyModel:
+    """Round-trip delay per WebDriver command: `base` + uniform(0, `jitter`) seconds.
+
+    `per_command` overrides the base for single commands (Command.* names, e.g. Command.W3C_EXECUTE_SCRIPT).
+    """
+
+    def __init__(self, base=0.0, jitter=0.0, per_command=None, seed=None):
+        self.base = base
+        self.jitter = jitter
+        self.per_command = dict(per_command or {})
+        self._random = random.Random(seed)
+
+    def delay(self, command):
+        base = self.per_command.get(command, self.base)
+        return base + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+
+# --- Driver ---
+
+class FakeElement:
+    """WebElement stand-in; every call goes through the driver's execute() like Selenium's."""
+
+    def __init__(self, driver, node):
+        self._driver = driver
+        self._node = node
+        self.id = f"fake-{node.uid}"
+
+    def __eq__(self, other):
+        return isinstance(other, FakeElement) and other._node is self._node
+
+    def __hash__(self):
+        return hash(self._node)
+
+    def __repr__(self):
+        return f"<FakeElement {self._node.tag} {self.id}>"
+
+    @property
+    def parent(self):
+        return self._driver
+
+    @property
+    def tag_name(self):
+        return self._driver.execute(Command.GET_ELEMENT_TAG_NAME, {"element": self})
+
+    @property
+    def text(self):
+        return self._driver.execute(Command.GET_ELEMENT_TEXT, {"element": self})
+
+    def find_element(self, by=By.ID, value=None):
+        return self._driver.execute(Command.FIND_CHILD_ELEMENT, {"element": self, "using": by, "value": value})
+
+    def find_elements(self, by=By.ID, value=None):
+        return self._driver.execute(Command.FIND_CHILD_ELEMENTS, {"element": self, "using": by, "value": value})
+
+    def click(self):
+        self._driver.execute(Command.CLICK_ELEMENT, {"element": self})
+
+    def get_attribute(self, name):
+        return self._driver.execute(Command.GET_ELEMENT_ATTRIBUTE, {"element": self, "name": name})
+
+    def is_displayed(self):
+        return self._driver.execute(FakeWebDriver.IS_ELEMENT_DISPLAYED, {"element": self})
+
+    def is_enabled(self):
+        return self._driver.execute(Command.IS_ELEMENT_ENABLED, {"element": self})
+
+    def is_selected(self):
+        return self._driver.execute(Command.IS_ELEMENT_SELECTED, {"element": self})
+
+
+class FakeWebDriver:
+    """Selenium WebDriver stand-in over a FakeTicketPage (see the module comment for the scope)."""
+
+    IS_ELEMENT_DISPLAYED = "isElementDisplayed" # Selenium runs an atom script for this, the fake has a command
+
+    # Exact script text -> handler method. Scripts not listed raise JavascriptException.
+    SCRIPTS = {
+        "return 1": "_script_return_one",
+        "arguments[0].click();": "_script_click",
+        "window.location.reload(true);": "_script_reload",
+        cft.SLOT_RESOLUTION_JS: "_script_slot_resolution",
+        cft.PLAN_EVALUATE_JS: "_script_plan_evaluate",
+        cft.QUANTITY_VALUE_JS: "_script_quantity_value",
+        cft.CONTINUE_ENABLED_JS: "_script_continue_enabled",
+        cft.PAGE_LEFT_JS: "_script_page_left",
+        cft.NAVIGATION_TIMING_JS: "_script_navigation_timing",
+        cft.PAGE_WEIGHT_JS: "_script_page_weight",
+        cft.ARTIFACT_SNAPSHOT_JS: "_script_artifact_snapshot",
+        cft.DOM_SNAPSHOT_JS: "_script_dom_snapshot",
+    }
+    ASYNC_SCRIPTS = {
+        cft.CONTAINER_OBSERVER_JS: "_async_container_observer",
+        cft.AVAILABILITY_PROBE_JS: "_async_availability_probe",
+    }
+    LOCATORS = {
+        By.CSS_SELECTOR: lambda value: value,
+        By.TAG_NAME: lambda value: value,
+        By.ID: lambda value: f"#{value}",
+        By.CLASS_NAME: lambda value: f".{value}",
+        By.NAME: lambda value: f"[name={value}]",
+    }
+
+    def __init__(self, page, latency=None):
+        self.page = page
+        self.latency = latency or LatencyModel()
+        self.session_id = "fake-session"
+        self.page_load_timeout = 15.0
+        self.stats = {} # command -> {count, latency, fake, idle} (seconds), see execute()
+        self._idle = 0.0
+        self._waiter = cft.DeadlineWaiter()
+        self._closed = False
+        self._commands = {
+            Command.GET: self._get, Command.REFRESH: self._refresh, Command.GET_CURRENT_URL: self._current_url,
+            Command.GET_TITLE: self._title, Command.GET_PAGE_SOURCE: self._page_source,
+            Command.FIND_ELEMENT: self._find_element, Command.FIND_ELEMENTS: self._find_elements,
+            Command.FIND_CHILD_ELEMENT: self._find_element, Command.FIND_CHILD_ELEMENTS: self._find_elements,
+            Command.W3C_EXECUTE_SCRIPT: self._execute_script, Command.W3C_EXECUTE_SCRIPT_ASYNC: self._execute_async_script,
+            Command.CLICK_ELEMENT: self._click, Command.GET_ELEMENT_TEXT: self._element_text,
+            Command.GET_ELEMENT_TAG_NAME: lambda params: self._node(params).tag,
+            Command.GET_ELEMENT_ATTRIBUTE: self._element_attribute,
+            Command.IS_ELEMENT_ENABLED: lambda params: "disabled" not in self._node(params).attrs,
+            Command.IS_ELEMENT_SELECTED: lambda params: self._node(params).checked,
+            self.IS_ELEMENT_DISPLAYED: lambda params: self._node(params).is_displayed(),
+            Command.SET_TIMEOUTS: self._set_timeouts, Command.SCREENSHOT: self._screenshot, Command.QUIT: self._quit,
+        }
+
+    # --- Command dispatch ---
+
+    def execute(self, driver_command, params=None):
+        """Sleeps the modelled round trip, runs due page timers, then the command. Returns its value."""
+        if self._closed:
+            raise InvalidSessionIdException("invalid session id: the fake session was quit")
+        delay = self.latency.delay(driver_command)
+        if delay > 0:
+            self._waiter.sleep(delay, label="fake_latency")
+        started, idle_before = time.perf_counter(), self._idle
+        try:
+            self.page.pump()
+            if driver_command not in self._commands:
+                raise WebDriverException(f"unknown command: '{driver_command}' is not implemented by the fake driver")
+            return self._commands[driver_command](params or {})
+        finally:
+            entry = self.stats.setdefault(driver_command, {"count": 0, "latency": 0.0, "fake": 0.0, "idle": 0.0})
+            idle = self._idle - idle_before
+            entry["count"] += 1
+            entry["latency"] += delay
+            entry["idle"] += idle
+            entry["fake"] += time.perf_counter() - started - idle
+
+    def reset_stats(self):
+        self.stats = {}
+
+    def stats_total(self):
+        """{count, latency, fake, idle} summed over all commands since reset_stats()."""
+        total = {"count": 0, "latency": 0.0, "fake": 0.0, "idle": 0.0}
+        for entry in self.stats.values():
+            for key in total:
+                total[key] += entry[key]
+        return total
+
+    def _wait(self, seconds):
+        """Simulated page time inside a command (loads, async scripts): slept, accounted as idle."""
+        if seconds > 0:
+            self._waiter.sleep(seconds, label="fake_page")
+            self._idle += seconds
+
+    def _node(self, params, key="element"):
+        return self._unwrap(params[key])
+
+    def _unwrap(self, value):
+        """Script argument -> FakeNode (stale check) / plain value, recursively."""
+        if isinstance(value, FakeElement):
+            if value._node.root() is not self.page.document:
+                raise StaleElementReferenceException("stale element reference: element is not attached to the page document")
+            return value._node
+        if isinstance(value, (list, tuple)):
+            return [self._unwrap(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self._unwrap(item) for key, item in value.items()}
+        return value
+
+    def _wrap(self, value):
+        """Script result -> FakeElement for nodes, recursively."""
+        if isinstance(value, FakeNode):
+            return FakeElement(self, value)
+        if isinstance(value, (list, tuple)):
+            return [self._wrap(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self._wrap(item) for key, item in value.items()}
+        return value
+
+    # --- Selenium API ---
+
+    def get(self, url):
+        self.execute(Command.GET, {"url": url})
+
+    def refresh(self):
+        self.execute(Command.REFRESH)
+
+    @property
+    def current_url(self):
+        return self.execute(Command.GET_CURRENT_URL)
+
+    @property
+    def title(self):
+        return self.execute(Command.GET_TITLE)
+
+    @property
+    def page_source(self):
+        return self.execute(Command.GET_PAGE_SOURCE)
+
+    def find_element(self, by=By.ID, value=None):
+        return self.execute(Command.FIND_ELEMENT, {"using": by, "value": value})
+
+    def find_elements(self, by=By.ID, value=None):
+        return self.execute(Command.FIND_ELEMENTS, {"using": by, "value": value})
+
+    def execute_script(self, script, *args):
+        return self.execute(Command.W3C_EXECUTE_SCRIPT, {"script": script, "args": list(args)})
+
+    def execute_async_script(self, script, *args):
+        return self.execute(Command.W3C_EXECUTE_SCRIPT_ASYNC, {"script": script, "args": list(args)})
+
+    def set_page_load_timeout(self, time_to_wait):
+        self.execute(Command.SET_TIMEOUTS, {"pageLoad": time_to_wait})
+
+    def get_screenshot_as_base64(self):
+        return self.execute(Command.SCREENSHOT)
+
+    def quit(self):
+        self.execute(Command.QUIT)
+
+    # --- Command handlers ---
+
+    def _load(self, url):
+        """Blocking navigation (get/refresh) bounded by the page load timeout."""
+        if self.page.load_delay > self.page_load_timeout:
+            self._wait(self.page_load_timeout)
+            self.page.schedule(self.page.load_delay - self.page_load_timeout, lambda: self.page.navigate(url))
+            raise TimeoutException(f"timeout: Timed out receiving message from renderer: {self.page_load_timeout:.3f}")
+        self._wait(self.page.load_delay)
+        self.page.navigate(url)
+
+    def _get(self, params):
+        self._load(params["url"])
+
+    def _refresh(self, params):
+        self._load(self.page.url)
+
+    def _current_url(self, params):
+        return self.page.url
+
+    def _title(self, params):
+        title = query_first(self.page.document, "title")
+        return _norm(title.text_content()) if title is not None else ""
+
+    def _page_source(self, params):
+        return self.page.document.outer_html()
+
+    def _find_elements(self, params):
+        using, value = params["using"], params["value"]
+        if using not in self.LOCATORS:
+            raise InvalidSelectorException(f"invalid selector: locator strategy '{using}' is not supported by the fake driver")
+        root = self._node(params) if "element" in params else self.page.document
+        return [FakeElement(self, node) for node in query_all(root, self.LOCATORS[using](value))]
+
+    def _find_element(self, params):
+        using, value = params["using"], params["value"]
+        if using not in self.LOCATORS:
+            raise InvalidSelectorException(f"invalid selector: locator strategy '{using}' is not supported by the fake driver")
+        root = self._node(params) if "element" in params else self.page.document
+        node = query_first(root, self.LOCATORS[using](value))
+        if node is None:
+            raise NoSuchElementException(f"no such element: Unable to locate element: {{\"method\":\"{using}\",\"selector\":\"{value}\"}}")
+        return FakeElement(self, node)
+
+    def _click(self, params):
+        self.page.click(self._node(params))
+
+    def _element_text(self, params):
+        node = self._node(params)
+        return _norm(node.text_content()) if node.is_displayed() else ""
+
+    def _element_attribute(self, params):
+        node, name = self._node(params), params["name"]
+        if name == "checked":
+            return "true" if node.checked else None
+        return node.attrs.get(name)
+
+    def _set_timeouts(self, params):
+        if "pageLoad" in params:
+            self.page_load_timeout = params["pageLoad"]
+
+    def _screenshot(self, params):
+        raise WebDriverException("unknown command: the fake driver takes no screenshots")
+
+    def _quit(self, params):
+        self._closed = True
+
+    def _execute_script(self, params):
+        return self._run_script(self.SCRIPTS, params)
+
+    def _execute_async_script(self, params):
+        return self._run_script(self.ASYNC_SCRIPTS, params)
+
+    def _run_script(self, table, params):
+        script = params["script"]
+        handler = table.get(script)
+        if handler is None:
+            first_line = next((line.strip() for line in script.splitlines() if line.strip()), "")
+            raise JavascriptException(f"javascript error: the fake driver has no port of this script ({first_line[:80]!r}...)")
+        return self._wrap(getattr(self, handler)(*self._unwrap(params["args"])))
+
+    # --- Script ports (arguments as in the bot's calls) ---
+
+    def _script_return_one(self):
+        return 1
+
+    def _script_click(self, node):
+        self.page.click(node)
+
+    def _script_reload(self):
+        self.page.reload()
+
+    def _script_slot_resolution(self, cfg, container):
+        started = time.perf_counter()
+        result = resolve_slot(container, cfg)
+        result["ms"] = (time.perf_counter() - started) * 1000
+        return result
+
+    def _script_plan_evaluate(self, plan, name, context, first_only):
+        # The plan's XPaths are TICKET_ROW_XPATH_TEMPLATE rows: match the title text directly
+        match = re.search(r"= '([^']*)'\]\]$", plan["xpaths"][name])
+        if match is None:
+            raise JavascriptException(f"javascript error: the fake driver cannot evaluate plan expression {name!r}")
+        rows = (row for row in query_all(context or self.page.document, "div.tariff-option")
+                if any(_norm(title.text_content()).lower() == match.group(1) for title in query_all(row, "span.title")))
+        return next(rows, None) if first_only else list(rows)
+
+    def _script_quantity_value(self, row, selector):
+        return quantity_value(row, selector)
+
+    def _script_continue_enabled(self, selector):
+        return self.page.url if continue_enabled(query_first(self.page.document, selector)) else None
+
+    def _script_page_left(self, page_url, selector):
+        return self.page.url != page_url or query_first(self.page.document, selector) is None
+
+    def _script_navigation_timing(self):
+        load_ms = self.page.load_delay * 1000
+        return {"ttfb": load_ms, "dcl": load_ms, "load": load_ms, "transfer_size": self.page.document_bytes}
+
+    def _script_page_weight(self):
+        return {"document": self.page.document_bytes, "resources": []}
+
+    def _script_artifact_snapshot(self):
+        return {"url": self.page.url, "title": self._title({}), "html": self.page.document.outer_html(),
+                "timing": self._script_navigation_timing()}
+
+    def _script_dom_snapshot(self):
+        return {"url": self.page.url, "title": self._title({}), "html": self.page.document.outer_html()}
+
+    def _async_container_observer(self, container_selector, label_selector, timeout_ms):
+        started = time.perf_counter()
+        deadline = started + timeout_ms / 1000.0
+        while True:
+            self.page.pump()
+            container = query_first(self.page.document, container_selector)
+            found = container is not None and query_first(container, label_selector) is not None
+            now = time.perf_counter()
+            if found or now >= deadline:
+                return {"found": found, "ts": time.time() * 1000, "waited_ms": (now - started) * 1000}
+            due = self.page.next_timer_due()
+            self._wait(min(due if due is not None else deadline, deadline) - now)
+
+    def _async_availability_probe(self, cfg):
+        started = time.perf_counter()
+        self._wait(min(self.page.load_delay, cfg["timeoutMs"] / 1000.0))
+        document, size = self.page.fetch(cfg["url"])
+        result = {"available": False, "reason": "no_container", "bytes": size, "status": 200}
+        container = query_first(document, cfg["containerSelector"])
+        if container is not None:
+            slot = resolve_slot(container, cfg) # Parsed, never rendered: visibility is not checked
+            result.update(available=slot["rank"] != -1, reason="available" if slot["rank"] != -1 else slot["reason"], rank=slot["rank"])
+        result["ms"] = (time.perf_counter() - started) * 1000
+        return result
@@ -0,0 +1,300 @@
+import time
+import json
+import random
+import logging
+import argparse
+import threading
+from email.utils import formatdate
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+
+# --- Offline stand-in for the Colosseum ticketing event page ---
+# Serves the same slot picker / tariff picker / buy button DOM the bot targets,
+# releases the slots at a fixed epoch time and adds configurable server latency.
+
+EVENT_PATH = "/en/eventi/full-experience-sotterranei-e-arena-percorso-didattico"
+CART_PATH = "/cart"
+AVAILABILITY_PATH = EVENT_PATH + "/availability" # Slot picker fragment only (probe mode target)
+
+SITE_TEXTS = {
+    "english": {"full_price": "Full price", "reduced_fare": "Reduced fare", "continue": "CONTINUE", "activity_in": "ACTIVITY IN",
+                "languages": {"ENGLISH": "ENGLISH", "ITALIAN": "ITALIAN", "SPANISH": "SPANISH", "FRENCH": "FRENCH"},
+                "not_available": "Tickets for this date are not yet on sale.", "cart": "Your cart"},
+    "italian": {"full_price": "Prezzo intero", "reduced_fare": "Tariffa ridotta", "continue": "CONTINUA", "activity_in": "ATTIVITÀ IN",
+                "languages": {"ENGLISH": "INGLESE", "ITALIAN": "ITALIANO", "SPANISH": "SPAGNOLO", "FRENCH": "FRANCESE"},
+                "not_available": "I biglietti per questa data non sono ancora in vendita.", "cart": "Il tuo carrello"},
+}
+
+# Optional page weight similar to the real site (--page-assets): path -> (content type, bytes)
+PAGE_ASSETS = {
+    **{f"/static/img/gallery-{i}.jpg": ("image/jpeg", 48 * 1024) for i in range(1, 7)},
+    "/static/img/logo.svg": ("image/svg+xml", 6 * 1024),
+    "/static/fonts/site.woff2": ("font/woff2", 64 * 1024),
+    "/gtm.js": ("application/javascript", 90 * 1024),
+}
+
+DEFAULT_SLOT_TIMES = ["9:00 AM", "9:30 AM", "10:00 AM", "11:00 AM"]
+DEFAULT_LANGUAGES = ["ITALIAN", "ENGLISH", "SPANISH"]
+
+# Client-side behaviour of the real widget: choosing a slot fetches the tariffs,
+# the buy button only activates once a quantity is set, and "continue" posts to the cart.
+PAGE_SCRIPT = """
+(function () {
+  var cfg = %(config)s;
+  var texts = cfg.texts;
+  var pendingPicker = null;
+  function tariffRow(key) {
+    return '<div class="tariff-option" data-tariff="' + key + '">' +
+      '<span class="title">' + texts[key] + '</span>' +
+      '<button type="button" class="minus"><span class="fa-minus"></span></button>' +
+      '<span class="quantity">0</span>' +
+      '<button type="button" class="plus"><span class="fa-plus"></span></button>' +
+      '</div>';
+  }
+  function refreshBuyButton() {
+    var total = 0;
+    document.querySelectorAll('div.abc-tariffpicker span.quantity').forEach(function (q) { total += parseInt(q.textContent, 10) || 0; });
+    var buy = document.getElementById('buy-button');
+    if (!buy) return;
+    if (total > 0) { buy.classList.remove('disabled'); buy.removeAttribute('aria-disabled'); }
+    else { buy.classList.add('disabled'); buy.setAttribute('aria-disabled', 'true'); }
+  }
+  document.addEventListener('click', function (ev) {
+    var label = ev.target.closest('div.abc-slotpicker-group label');
+    if (label) {
+      var input = label.querySelector('input[type=radio]');
+      if (!input || input.disabled || label.classList.contains('unselectable')) return;
+      input.checked = true;
+      window.__mockSelectedSlot = input.value;
+      var old = document.querySelector('div.abc-tariffpicker');
+      if (old) old.remove();
+      clearTimeout(pendingPicker); // A label click is re-dispatched to its radio: render once
+      pendingPicker = setTimeout(function () {
+        var picker = document.createElement('div');
+        picker.className = 'abc-tariffpicker';
+        picker.innerHTML = tariffRow('full_price') + tariffRow('reduced_fare');
+        document.getElementById('tariff-anchor').appendChild(picker);
+        refreshBuyButton();
+      }, cfg.tariffRenderDelayMs);
+      return;
+    }
+    var plus = ev.target.closest('div.tariff-option button.plus, div.tariff-option button.minus');
+    if (plus) {
+      var qty = plus.parentElement.querySelector('span.quantity');
+      var value = (parseInt(qty.textContent, 10) || 0) + (plus.classList.contains('plus') ? 1 : -1);
+      qty.textContent = String(Math.max(0, value));
+      refreshBuyButton();
+      return;
+    }
+    var buy = ev.target.closest('a#buy-button');
+    if (buy) {
+      ev.preventDefault();
+      if (buy.classList.contains('disabled')) return;
+      var params = new URLSearchParams({slot: window.__mockSelectedSlot || ''});
+      document.querySelectorAll('div.tariff-option').forEach(function (row) {
+        params.set(row.getAttribute('data-tariff'), row.querySelector('span.quantity').textContent);
+      });
+      setTimeout(function () { window.location.href = cfg.cartPath + '?' + params.toString(); }, cfg.continueDelayMs);
+    }
+  }, true);
+})();
+"""
+
+
+class MockTicketServer:
+    """Threaded HTTP server imitating the ticketing site for offline runs and benchmarks."""
+
+    def __init__(self, release_at, host="127.0.0.1", port=0, latency=0.0, latency_jitter=0.0,
+                 slot_times=None, languages=None, sold_out_times=None, site_language="english",
+                 tariff_render_delay=0.03, continue_delay=0.05, clock_skew=0.0, page_assets=False):
+        self.release_at = release_at # Epoch seconds at which the slots appear
+        self.latency = latency # Fixed server delay added to every response (seconds)
+        self.latency_jitter = latency_jitter # Extra uniform random delay (seconds)
+        self.slot_times = list(slot_times or DEFAULT_SLOT_TIMES)
+        self.languages = list(languages or DEFAULT_LANGUAGES)
+        self.sold_out_times = set(sold_out_times or [])
+        self.site_language = site_language
+        self.tariff_render_delay = tariff_render_delay
+        self.continue_delay = continue_delay
+        self.clock_skew = clock_skew # Offset applied to the HTTP Date header (reference clock stand-in)
+        self.page_assets = page_assets # Reference PAGE_ASSETS from the event page
+        self.events = [] # (epoch, kind, path) tuples, useful for benchmarks
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def event_url(self):
+        return self.base_url + EVENT_PATH
+
+    @property
+    def availability_url(self):
+        return self.base_url + AVAILABILITY_PATH
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-ticket-server", daemon=True)
+        self._thread.start()
+        logging.info(f"Mock ticket server listening on {self.base_url} (release at {self.release_at:.3f}, latency {self.latency * 1000:.0f}ms)")
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def released(self, now=None):
+        return (time.time() if now is None else now) >= self.release_at
+
+    def record(self, kind, path):
+        with self._lock:
+            self.events.append((time.time(), kind, path))
+
+    def first_event(self, kind):
+        with self._lock:
+            for ts, event_kind, _ in self.events:
+                if event_kind == kind:
+                    return ts
+        return None
+
+    # --- HTML rendering ---
+
+    def render_slot_group(self):
+        texts = SITE_TEXTS[self.site_language]
+        parts = ['<div class="abc-slotpicker-group">']
+        for language in self.languages:
+            parts.append(f'<h3 class="lang_section">{texts["activity_in"]} {texts["languages"][language]}</h3>')
+            for index, slot_time in enumerate(self.slot_times):
+                sold_out = slot_time in self.sold_out_times
+                label_class = "abc-slot unselectable" if sold_out else "abc-slot"
+                disabled = " disabled" if sold_out else ""
+                value = f"{language.lower()}-{index}"
+                parts.append(f'<label class="{label_class}"><input type="radio" name="slot" value="{value}"{disabled}>'
+                             f'<div><span>{slot_time}</span></div></label>')
+        parts.append('</div>')
+        return "".join(parts)
+
+    def render_availability(self):
+        if self.released():
+            return self.render_slot_group()
+        return f'<div class="abc-no-availability">{SITE_TEXTS[self.site_language]["not_available"]}</div>'
+
+    def render_event_page(self):
+        texts = SITE_TEXTS[self.site_language]
+        content = self.render_availability()
+        config = json.dumps({
+            "texts": {"full_price": texts["full_price"], "reduced_fare": texts["reduced_fare"]},
+            "tariffRenderDelayMs": int(self.tariff_render_delay * 1000),
+            "continueDelayMs": int(self.continue_delay * 1000),
+            "cartPath": CART_PATH,
+        })
+        head, assets = "", ""
+        if self.page_assets:
+            head = ("<style>@font-face{font-family:Site;src:url(/static/fonts/site.woff2) format('woff2')}"
+                    "body{font-family:Site,sans-serif}</style><script async src=\"/gtm.js\"></script>")
+            assets = "".join(f'<img src="{path}" alt="">' for path in PAGE_ASSETS if path.startswith("/static/img/"))
+        return ("<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Colosseum - Full Experience</title>"
+                f"{head}</head><body>"
+                f"<h1>Full Experience Underground and Arena</h1>{assets}"
+                f"<div id=\"slot-anchor\">{content}</div>"
+                "<div id=\"tariff-anchor\"></div>"
+                f"<a id=\"buy-button\" class=\"btn disabled\" aria-disabled=\"true\" href=\"{CART_PATH}\">{texts['continue']}</a>"
+                f"<script>{PAGE_SCRIPT % {'config': config}}</script>"
+                "</body></html>")
+
+    def render_cart_page(self, query):
+        texts = SITE_TEXTS[self.site_language]
+        items = "".join(f"<li>{key}: {values[0]}</li>" for key, values in sorted(query.items()))
+        return (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{texts['cart']}</title></head><body>"
+                f"<h1 class=\"cart-title\">{texts['cart']}</h1><ul class=\"cart-items\">{items}</ul></body></html>")
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def date_time_string(self, timestamp=None):
+                # Date header doubles as the reference clock stand-in for clock sync tests
+                return formatdate((time.time() if timestamp is None else timestamp) + server.clock_skew, usegmt=True)
+
+            def handle(self):
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass # Browser dropped a keep-alive connection (reload abandoned its subresources)
+
+            def log_message(self, format, *args):
+                logging.debug("mock-server: " + format % args)
+
+            def _send(self, status, body, content_type="text/html; charset=utf-8"):
+                delay = server.latency + (random.uniform(0, server.latency_jitter) if server.latency_jitter else 0.0)
+                if delay > 0:
+                    time.sleep(delay)
+                payload = body if isinstance(body, bytes) else body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                if self.command != "HEAD":
+                    try:
+                        self.wfile.write(payload)
+                    except (BrokenPipeError, ConnectionResetError):
+                        # Browser abandoned the load (e.g. the next reload started first)
+                        server.record("aborted", self.path)
+
+            def do_HEAD(self):
+                self._send(200, "")
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path == AVAILABILITY_PATH:
+                    server.record("probe", self.path)
+                    self._send(200, server.render_availability())
+                elif parsed.path == CART_PATH:
+                    server.record("cart", self.path)
+                    self._send(200, server.render_cart_page(parse_qs(parsed.query)))
+                elif parsed.path in PAGE_ASSETS:
+                    server.record("asset", self.path)
+                    content_type, size = PAGE_ASSETS[parsed.path]
+                    self._send(200, bytes(size), content_type=content_type)
+                elif parsed.path in ("/", EVENT_PATH):
+                    server.record("event_released" if server.released() else "event", self.path)
+                    self._send(200, server.render_event_page())
+                else:
+                    self._send(404, "<html><body>Not found</body></html>")
+
+        return Handler
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Serve an offline stand-in of the Colosseum ticketing page.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--release-in", type=float, default=30.0, help="Seconds from now until slots are released")
+    parser.add_argument("--latency", type=float, default=0.0, help="Fixed server latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Additional random latency in seconds")
+    parser.add_argument("--language", choices=sorted(SITE_TEXTS), default="english")
+    parser.add_argument("--slot", action="append", dest="slots", help="Slot time text (repeatable)")
+    parser.add_argument("--sold-out", action="append", default=[], help="Slot time text rendered as unselectable")
+    parser.add_argument("--clock-skew", type=float, default=0.0, help="Skew applied to the Date header in seconds")
+    parser.add_argument("--page-assets", action="store_true", help="Add images, a web font and a tag manager script to the event page")
+    args = parser.parse_args()
+
+    mock = MockTicketServer(time.time() + args.release_in, port=args.port, latency=args.latency,
+                            latency_jitter=args.jitter, slot_times=args.slots, sold_out_times=args.sold_out,
+                            site_language=args.language, clock_skew=args.clock_skew, page_assets=args.page_assets).start()
+    logging.info(f"Event page: {mock.event_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        mock.stop()
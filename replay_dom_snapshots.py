@@ -0,0 +1,165 @@
+import os
+import sys
+import json
+import gzip
+import argparse
+
+import ColosseumFastTicket as cft
+
+
+# --- Offline replay of recorded DOM snapshots against the bot's selectors ---
+# Loads snapshots written by DomSnapshotRecorder (DOM_SNAPSHOT_ENABLED) into a local browser,
+# evaluates every selector the bot relies on and reports match counts and per-selector
+# evaluation time. A markup change on the live site shows up here before the drop.
+
+# Page state -> selectors that must match at least once in it
+EXPECTED_MATCHES = {
+    "release": ["PRIMARY_CONTAINER_SELECTOR", "language headers", "AVAILABLE_SLOT_LABEL_XPATH",
+                "SELECTABLE_SLOT_LABEL_CSS", "SLOT_TIME_TEXT_XPATH", "slot resolution"],
+    "slot_selected": ["TICKET_TYPE_CONTAINER_SELECTOR", "plan row_full_price", "plan row_reduced_fare",
+                      "TICKET_PLUS_BTN_SELECTOR", "CONTINUE_BUTTON_SELECTOR"],
+    "quantities_set": ["CONTINUE_BUTTON_SELECTOR"],
+}
+
+LOAD_SNAPSHOT_JS = "document.open(); document.write(arguments[0]); document.close();"
+
+# arguments: [specs, resolver cfg, repeat]. Specs run in order; `provides` stores the first match
+# as a named context (container, label, row) for the specs after it.
+REPLAY_EVALUATE_JS = cft.SLOT_RESOLVER_FN + """
+var specs = arguments[0], resolverCfg = arguments[1], repeat = arguments[2];
+var contexts = {document: document}, results = [];
+function run(spec, context) {
+  if (spec.kind === 'css') return Array.prototype.slice.call(context.querySelectorAll(spec.expr));
+  if (spec.kind === 'xpath') {
+    var snapshot = document.evaluate(spec.expr, context, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null), nodes = [];
+    for (var i = 0; i < snapshot.snapshotLength; i++) nodes.push(snapshot.snapshotItem(i));
+    return nodes;
+  }
+  var resolved = resolveSlot(context, resolverCfg);
+  run.detail = resolved.reasons.join(',') + (resolved.fallback ? ' (fallback)' : '');
+  return resolved.label ? [resolved.label] : [];
+}
+specs.forEach(function (spec) {
+  var context = contexts[spec.context];
+  if (!context) { results.push({name: spec.name, matches: null, us: null, error: 'no ' + spec.context}); return; }
+  var nodes = [], error = null, started = performance.now();
+  run.detail = null;
+  try {
+    for (var i = 0; i < repeat; i++) nodes = run(spec, context);
+  } catch (e) {
+    error = String(e);
+  }
+  var us = (performance.now() - started) * 1000 / repeat;
+  if (spec.provides && nodes.length) contexts[spec.provides] = nodes[0];
+  results.push({name: spec.name, matches: error ? null : nodes.length, us: us, error: error, detail: run.detail});
+});
+return results;
+"""
+
+
+def selector_specs(plan):
+    """Every selector of the hot path, in evaluation order, for one SelectorPlan."""
+    return [
+        {"name": "PRIMARY_CONTAINER_SELECTOR", "kind": "css", "expr": cft.PRIMARY_CONTAINER_SELECTOR, "context": "document", "provides": "container"},
+        {"name": "TIME_SLOT_CONTAINER_SELECTOR", "kind": "css", "expr": cft.TIME_SLOT_CONTAINER_SELECTOR, "context": "document"},
+        {"name": "language headers", "kind": "css", "expr": "h3.lang_section", "context": "container"},
+        {"name": "AVAILABLE_SLOT_LABEL_XPATH", "kind": "xpath", "expr": cft.AVAILABLE_SLOT_LABEL_XPATH, "context": "container", "provides": "label"},
+        {"name": "SELECTABLE_SLOT_LABEL_CSS", "kind": "css", "expr": cft.SELECTABLE_SLOT_LABEL_CSS, "context": "container"},
+        {"name": "SLOT_TIME_TEXT_XPATH", "kind": "xpath", "expr": cft.SLOT_TIME_TEXT_XPATH, "context": "label"},
+        {"name": "slot resolution", "kind": "resolver", "expr": None, "context": "container"},
+        {"name": "TICKET_TYPE_CONTAINER_SELECTOR", "kind": "css", "expr": cft.TICKET_TYPE_CONTAINER_SELECTOR, "context": "document"},
+        {"name": "plan row_full_price", "kind": "xpath", "expr": plan.xpaths["row_full_price"], "context": "document", "provides": "row"},
+        {"name": "plan row_reduced_fare", "kind": "xpath", "expr": plan.xpaths["row_reduced_fare"], "context": "document"},
+        {"name": "TICKET_PLUS_BTN_SELECTOR", "kind": "css", "expr": cft.TICKET_PLUS_BTN_SELECTOR, "context": "row"},
+        {"name": "CONTINUE_BUTTON_SELECTOR", "kind": "css", "expr": cft.CONTINUE_BUTTON_SELECTOR, "context": "document"},
+    ]
+
+
+def load_index(directory):
+    """index.jsonl entries, oldest first."""
+    path = os.path.join(directory, "index.jsonl")
+    with open(path, encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def select_snapshots(entries, states=None, replay_all=False):
+    """Latest entry per (state, snapshot) pair; without replay_all only the latest snapshot of each state."""
+    chosen = {}
+    for entry in entries:
+        if states and entry["state"] not in states:
+            continue
+        key = (entry["state"], entry["hash"]) if replay_all else entry["state"]
+        chosen[key] = entry
+    return sorted(chosen.values(), key=lambda e: e["captured_at"])
+
+
+def replay_snapshot(driver, directory, entry, preferences, repeat):
+    """Loads one snapshot into `driver` and evaluates the selector plan of its site language."""
+    with gzip.open(os.path.join(directory, entry["hash"] + ".html.gz"), "rt", encoding="utf-8") as fh:
+        html = fh.read()
+    driver.get("about:blank")
+    driver.execute_script(LOAD_SNAPSHOT_JS, html)
+    plan = cft.SelectorPlan(entry.get("site_language") or "english", preferences)
+    rows = driver.execute_script(REPLAY_EVALUATE_JS, selector_specs(plan), plan.slot_resolution_arg(), repeat)
+    expected = EXPECTED_MATCHES.get(entry["state"], [])
+    for row in rows:
+        row["missing"] = row["name"] in expected and not row["matches"]
+    return {"entry": entry, "plan": plan.id, "selectors": rows}
+
+
+def print_report(reports, repeat):
+    missing_total = 0
+    print("=" * 78)
+    print(f" DOM snapshot replay: {len(reports)} snapshots, mean of {repeat} evaluations per selector")
+    for report in reports:
+        entry = report["entry"]
+        print("-" * 78)
+        print(f" [{entry['state']}] {entry['hash']} run {entry['run']} ({entry['bytes'] / 1024:.1f} KiB) {entry['url']}")
+        print(f" plan: {report['plan']}")
+        print(f"   {'selector':<34}{'matches':>8}{'us':>10}  note")
+        for row in report["selectors"]:
+            matches = "-" if row["matches"] is None else str(row["matches"])
+            timing = "-" if row["us"] is None else f"{row['us']:.1f}"
+            note = row["error"] or row.get("detail") or ""
+            if row["missing"]:
+                note = ("MISSING (expected in this state) " + note).strip()
+                missing_total += 1
+            print(f"   {row['name']:<34}{matches:>8}{timing:>10}  {note}")
+    print("=" * 78)
+    if missing_total:
+        print(f" {missing_total} expected selector(s) matched nothing - VERIFY THE SELECTORS AGAINST THE LIVE SITE!")
+    else:
+        print(" All expected selectors matched.")
+    print("=" * 78)
+    return missing_total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded DOM snapshots and evaluate the bot's selectors offline.")
+    parser.add_argument("--dir", default=cft.DOM_SNAPSHOT_DIR, help="Snapshot directory (DOM_SNAPSHOT_DIR)")
+    parser.add_argument("--state", action="append", dest="states", help="Only replay this page state (repeatable)")
+    parser.add_argument("--all", action="store_true", help="Replay every distinct snapshot, not only the latest per state")
+    parser.add_argument("--repeat", type=int, default=200, help="Evaluations per selector for the timing")
+    parser.add_argument("--headed", action="store_true", help="Show the browser window")
+    parser.add_argument("--json", dest="json_path", help="Write the raw results to this file")
+    args = parser.parse_args()
+
+    entries = select_snapshots(load_index(args.dir), args.states, args.all)
+    if not entries:
+        sys.exit(f"No snapshots in {args.dir} (record some with DOM_SNAPSHOT_ENABLED = True)")
+
+    cft.BROWSER_HEADLESS = not args.headed
+    cft.USE_DIRECT_CDP = cft.NETWORK_POLICY_ENABLED = False
+    bot = cft.ColosseumTicketBot()
+    bot.setup_driver()
+    try:
+        reports = [replay_snapshot(bot.driver, args.dir, entry, bot.slot_preferences, args.repeat) for entry in entries]
+    finally:
+        bot.close()
+
+    cft.flush_logs()
+    missing = print_report(reports, args.repeat)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump(reports, fh, indent=2)
+    sys.exit(1 if missing else 0)
@@ -0,0 +1,170 @@
+import sys
+import json
+import argparse
+import statistics
+
+import ColosseumFastTicket as cft
+
+
+# --- Cross-run latency report from the run history store ---
+# Every run of the bot (and every benchmark cycle with --history) writes its phase timings,
+# wake-up jitter, refresh count, outcome and a config snapshot to RUN_HISTORY_DB
+# (RunHistoryStore). This report shows per-phase percentiles, wake-up jitter and what changed
+# between the latest run and the ones before it (timings and config).
+
+# Phase groups in report order (see RunHistoryStore for the naming)
+PHASE_GROUPS = ("release->", "span:", "wait:", "state:", "startup:", "resync:")
+PERCENTILES = (50, 95, 99)
+# Constants that differ on every run by design: not reported as config changes
+CONFIG_DIFF_IGNORE = ("TARGET_DATE", "ACTIVATION_TIME", "BASE_URL")
+
+
+def percentiles(values):
+    """{pct: value} for PERCENTILES (nearest rank) of a non-empty list."""
+    return {pct: cft.nearest_rank(values, pct / 100.0) for pct in PERCENTILES}
+
+
+def ordered_phases(phases_by_run):
+    """Phase names grouped by PHASE_GROUPS; release milestones in time order, the rest by name."""
+    values = {}
+    for phases in phases_by_run.values():
+        for name, ms in phases.items():
+            values.setdefault(name, []).append(ms)
+
+    def key(name):
+        group = next((i for i, prefix in enumerate(PHASE_GROUPS) if name.startswith(prefix)), len(PHASE_GROUPS))
+        return (group, statistics.median(values[name]) if group == 0 else 0, name)
+    return sorted(values, key=key), values
+
+
+def phase_table(phases_by_run):
+    names, values = ordered_phases(phases_by_run)
+    return [dict(phase=name, n=len(values[name]), **{f"p{pct}": v for pct, v in percentiles(values[name]).items()})
+            for name in names]
+
+
+def jitter_table(jitter_by_run):
+    """Per wait label: n, percentiles and max of the wake-up overshoot (us); plus the histogram over all labels."""
+    merged = {}
+    for samples in jitter_by_run.values():
+        for label, values in samples.items():
+            merged.setdefault(label, []).extend(values)
+    rows = [dict(label=label, n=len(values), max=max(values), **{f"p{pct}": v for pct, v in percentiles(values).items()})
+            for label, values in sorted(merged.items())]
+    everything = [v for values in merged.values() for v in values]
+    return rows, histogram(everything)
+
+
+def histogram(values_us):
+    """[(bucket label, count)] over DeadlineWaiter.HISTOGRAM_BUCKETS_US."""
+    buckets = cft.DeadlineWaiter.HISTOGRAM_BUCKETS_US
+    counts = [0] * (len(buckets) + 1)
+    for value in values_us:
+        counts[next((i for i, upper in enumerate(buckets) if value <= upper), len(buckets))] += 1
+    labels = [f"<={upper}us" for upper in buckets] + [f">{buckets[-1]}us"]
+    return list(zip(labels, counts))
+
+
+def config_changes(previous, current):
+    """['NAME: old -> new', ...] for every config constant (but CONFIG_DIFF_IGNORE) that differs between two snapshots."""
+    changes = []
+    for name in sorted(set(previous) | set(current)):
+        if name not in CONFIG_DIFF_IGNORE and previous.get(name) != current.get(name):
+            changes.append(f"{name}: {json.dumps(previous.get(name))} -> {json.dumps(current.get(name))}")
+    return changes
+
+
+def run_over_run(runs, phases_by_run):
+    """Latest run vs the previous run and vs the median of all earlier runs, per phase of the latest run."""
+    if len(runs) < 2:
+        return []
+    latest, previous, earlier = runs[-1], runs[-2], runs[:-1]
+    rows = []
+    names, _ = ordered_phases({latest["id"]: phases_by_run[latest["id"]]})
+    for name in names:
+        value = phases_by_run[latest["id"]][name]
+        before = phases_by_run[previous["id"]].get(name)
+        history = [phases_by_run[run["id"]][name] for run in earlier if name in phases_by_run[run["id"]]]
+        median = statistics.median(history) if history else None
+        rows.append({"phase": name, "latest": value, "previous": before,
+                     "vs_previous": value - before if before is not None else None,
+                     "median_earlier": median, "vs_median": value - median if median is not None else None})
+    return rows
+
+
+def format_cell(value, width=10, digits=1):
+    return f"{value:>{width}.{digits}f}" if value is not None else f"{'-':>{width}}"
+
+
+def print_report(runs, phases_by_run, jitter_by_run, include_failed):
+    timed = [run for run in runs if include_failed or run["success"]]
+    timed_phases = {run["id"]: phases_by_run[run["id"]] for run in timed}
+    print("=" * 96)
+    print(f" Run history: {len(runs)} runs ({sum(r['success'] for r in runs)} secured); "
+          f"percentiles over {len(timed)} {'runs' if include_failed else 'secured runs'}")
+    print("-" * 96)
+    print(f" {'id':>4}  {'started':<25}{'label':<11}{'outcome':<12}{'attempts':>9}{'refreshes':>10}"
+          f"{'container':>11}{'continue':>10}  config")
+    previous = None
+    for run in runs:
+        phases = phases_by_run[run["id"]]
+        changes = config_changes(previous["config"], run["config"]) if previous else []
+        print(f" {run['id']:>4}  {run['started_at']:<25}{(run['label'] or '-'):<11}{run['outcome']:<12}"
+              f"{run['attempts'] if run['attempts'] is not None else '-':>9}{run['refresh_count'] if run['refresh_count'] is not None else '-':>10}"
+              f"{format_cell(phases.get('release->container_detected'), 11)}{format_cell(phases.get('release->continue_clicked'))}"
+              f"  {f'{len(changes)} changed' if changes else ''}")
+        previous = run
+
+    print("-" * 96)
+    print(f" {'phase (ms; release-> = after activation)':<44}{'n':>5}" + "".join(f"{'p' + str(p):>10}" for p in PERCENTILES))
+    for row in phase_table(timed_phases):
+        print(f" {row['phase']:<44}{row['n']:>5}" + "".join(format_cell(row[f'p{p}']) for p in PERCENTILES))
+
+    rows, buckets = jitter_table({run["id"]: jitter_by_run[run["id"]] for run in runs})
+    print("-" * 96)
+    print(f" {'wake-up jitter (us)':<44}{'n':>5}" + "".join(f"{'p' + str(p):>10}" for p in PERCENTILES) + f"{'max':>10}")
+    for row in rows:
+        print(f" {row['label']:<44}{row['n']:>5}" + "".join(format_cell(row[f'p{p}']) for p in PERCENTILES) + format_cell(row["max"]))
+    if rows:
+        print(" histogram: " + ", ".join(f"{label}: {count}" for label, count in buckets if count))
+
+    comparison = run_over_run(runs, phases_by_run)
+    if comparison:
+        latest, before = runs[-1], runs[-2]
+        print("-" * 96)
+        print(f" Run #{latest['id']} ({latest['outcome']}) vs #{before['id']} ({before['outcome']}) and vs the median of {len(runs) - 1} earlier runs")
+        print(f" {'phase (ms)':<44}{'latest':>10}{'previous':>10}{'delta':>10}{'median':>10}{'delta':>10}")
+        for row in comparison:
+            print(f" {row['phase']:<44}{format_cell(row['latest'])}{format_cell(row['previous'])}{format_cell(row['vs_previous'])}"
+                  f"{format_cell(row['median_earlier'])}{format_cell(row['vs_median'])}")
+        changes = config_changes(before["config"], latest["config"])
+        print(" config changes: " + ("; ".join(changes) if changes else "none"))
+    print("=" * 96)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-phase latency report and run-over-run comparison from the run history store.")
+    parser.add_argument("--db", default=cft.RUN_HISTORY_DB, help="History database (RUN_HISTORY_DB)")
+    parser.add_argument("--last", type=int, default=20, help="Only the newest N runs (0 = all)")
+    selection = parser.add_mutually_exclusive_group()
+    selection.add_argument("--label", help="Only runs with this label (e.g. 'benchmark'); default: live runs (no label)")
+    selection.add_argument("--all", action="store_true", dest="all_runs", help="Live runs and every labelled run together")
+    parser.add_argument("--include-failed", action="store_true", help="Include failed runs in the percentiles")
+    parser.add_argument("--json", dest="json_path", help="Write the selected runs with their phases and jitter to this file")
+    args = parser.parse_args()
+
+    store = cft.RunHistoryStore(args.db)
+    try:
+        runs = store.runs(limit=args.last, label=args.label, live_only=not args.all_runs)
+        ids = [run["id"] for run in runs]
+        phases_by_run, jitter_by_run = store.phases(ids), store.jitter(ids)
+    finally:
+        store.close()
+    if not runs:
+        selected = f"label {args.label!r}" if args.label else "any label" if args.all_runs else "no label (live runs)"
+        sys.exit(f"No runs with {selected} recorded in {args.db}")
+
+    print_report(runs, phases_by_run, jitter_by_run, args.include_failed)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump([dict(run, phases=phases_by_run[run["id"]], jitter=jitter_by_run[run["id"]]) for run in runs], fh, indent=2)
@@ -0,0 +1,29 @@
+import ColosseumFastTicket as cft
+from ColosseumFastTicket import ClockSample, ClockSync
+
+
+def test_filter_outliers_keeps_short_sample_lists():
+    samples = [ClockSample(0.5, 0.2, 0.1), ClockSample(-3.0, 0.01, 0.005)]
+    assert ClockSync.filter_outliers(samples) == samples
+
+
+def test_filter_outliers_drops_queued_round_trips():
+    fast = [ClockSample(0.010, 0.020, 0.010), ClockSample(0.011, 0.022, 0.011), ClockSample(0.009, 0.021, 0.0105)]
+    queued = ClockSample(0.060, 0.200, 0.100)
+    assert ClockSync.filter_outliers(fast + [queued]) == fast
+
+
+def test_filter_outliers_drops_offsets_far_from_the_median():
+    close = [ClockSample(0.010, 0.020, 0.001), ClockSample(0.011, 0.020, 0.001), ClockSample(0.012, 0.020, 0.001)]
+    stepped = ClockSample(0.500, 0.020, 0.001) # Same round trip, but the reference clock jumped
+    assert ClockSync.filter_outliers(close + [stepped]) == close
+
+
+def test_estimate_intersects_the_sample_bounds():
+    samples = iter([ClockSample(0.010, 0.020, 0.010), ClockSample(0.016, 0.020, 0.010), ClockSample(0.012, 0.020, 0.010)])
+    sync = ClockSync(lambda: next(samples), samples=3)
+    estimate = sync.estimate()
+    assert estimate.samples_used == 3
+    # [0.000, 0.020] n [0.006, 0.026] n [0.002, 0.022] = [0.006, 0.020]
+    assert abs(estimate.offset - 0.013) < 1e-9
+    assert abs(estimate.uncertainty - 0.007) < 1e-9
@@ -0,0 +1,26 @@
+import pytest
+
+from ColosseumFastTicket import default_core_split
+
+
+@pytest.mark.parametrize("available, expected", [
+    ({0}, (None, None)), # Only the priority is raised
+    ({0, 1}, ([1], [0])),
+    ({0, 1, 2}, ([1, 2], [0])),
+    ({0, 1, 2, 3}, ([2, 3], [0, 1])),
+    ({0, 1, 2, 3, 4}, ([3, 4], [1, 2])), # Core 0 left to the OS
+    (set(range(8)), ([6, 7], [1, 2, 3, 4, 5])),
+])
+def test_default_core_split(available, expected):
+    assert default_core_split(available) == expected
+
+
+def test_uses_the_cores_actually_available():
+    # A restricted affinity mask (e.g. taskset) need not start at core 0 or be contiguous
+    assert default_core_split({9, 2, 5, 7}) == ([7, 9], [2, 5])
+
+
+def test_bot_and_browser_never_share_a_core():
+    for count in range(2, 17):
+        bot, browser = default_core_split(set(range(count)))
+        assert bot and browser and not set(bot) & set(browser)
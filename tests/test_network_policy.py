@@ -0,0 +1,52 @@
+import pytest
+
+from ColosseumFastTicket import NETWORK_ALLOW_PATTERNS, NETWORK_BLOCK_PATTERNS, NetworkPolicy
+
+
+@pytest.fixture
+def policy():
+    return NetworkPolicy(NETWORK_BLOCK_PATTERNS, NETWORK_ALLOW_PATTERNS)
+
+
+@pytest.mark.parametrize("url", [
+    "https://ticketing.colosseo.it/img/arena.jpg",
+    "https://ticketing.colosseo.it/fonts/icons.woff2?v=3",
+    "https://www.googletagmanager.com/gtm.js?id=GTM-X",
+    "https://connect.facebook.net/en_US/fbevents.js",
+])
+def test_blocks_page_weight(policy, url):
+    assert policy.blocks(url)
+
+
+@pytest.mark.parametrize("url", [
+    "https://ticketing.colosseo.it/en/eventi/full-experience-sotterranei-e-arena-percorso-didattico",
+    "https://ticketing.colosseo.it/js/app.js",
+    "https://ticketing.colosseo.it/css/style.css",
+])
+def test_keeps_the_page_itself(policy, url):
+    assert not policy.blocks(url)
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.google.com/recaptcha/api2/logo_48.png",
+    "https://challenges.cloudflare.com/turnstile/v0/b/icon.svg",
+])
+def test_allow_patterns_win(policy, url):
+    assert not policy.blocks(url)
+
+
+def test_patterns_match_the_whole_url():
+    policy = NetworkPolicy(["*.png"])
+    assert policy.blocks("https://a.test/x.png")
+    assert not policy.blocks("https://a.test/x.png?size=2") # No trailing '*': the URL must end there
+    assert not NetworkPolicy(["a.test/*"]).blocks("https://a.test/x") # No leading '*': the URL must start there
+
+
+def test_regex_characters_are_literal():
+    policy = NetworkPolicy(["*/track.js?id=(1)*"])
+    assert policy.blocks("https://a.test/track.js?id=(1)&x=2")
+    assert not policy.blocks("https://a.test/trackXjs?id=(1)")
+
+
+def test_empty_block_list_blocks_nothing():
+    assert not NetworkPolicy([], ["*"]).blocks("https://a.test/x.png")
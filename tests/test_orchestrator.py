@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+from datetime import datetime
+
+import pytest
+import pytz
+
+import ColosseumFastTicket as cft
+from ColosseumFastTicket import AcquisitionOrchestrator
+
+
+class FakeBot:
+    """The bot methods the orchestrator calls; the fast loop runs until it succeeds, is stopped or the browser closes."""
+
+    attempt_count = 0
+
+    def __init__(self, loop_seconds=0.0, honour_stop=True):
+        self.loop_seconds = loop_seconds
+        self.honour_stop = honour_stop
+        self.stop_requested = threading.Event()
+        self.closed = threading.Event()
+        self.secured = False
+
+    def prepare_run(self):
+        return True
+
+    def handle_initial_load(self, url):
+        return True
+
+    def event_url(self):
+        return "https://example.test/event"
+
+    def reference_now(self):
+        return datetime.now(pytz.utc)
+
+    def refresh_trigger_time(self):
+        return self.reference_now()
+
+    def wait_for_refresh_trigger(self):
+        pass
+
+    def refresh_window(self):
+        return True
+
+    def fast_loop_budget(self):
+        return 25.0
+
+    def run_fast_loop(self):
+        end = time.monotonic() + self.loop_seconds
+        while time.monotonic() < end:
+            if (self.honour_stop and self.stop_requested.is_set()) or self.closed.is_set():
+                return False
+            time.sleep(0.01)
+        return True
+
+    def ticket_secured(self):
+        self.secured = True
+
+    def close(self):
+        self.closed.set()
+
+
+@pytest.fixture(autouse=True)
+def quiet_side_tasks(monkeypatch):
+    monkeypatch.setattr(cft, "CLOCK_SYNC_ENABLED", False)
+    monkeypatch.setattr(cft, "READINESS_CHECK_ENABLED", False)
+    monkeypatch.setattr(cft, "ARMED_HANDOFF_SECONDS", 0.0)
+
+
+def test_successful_run_walks_every_state():
+    bot = FakeBot()
+    orchestrator = AcquisitionOrchestrator(bot)
+    assert asyncio.run(orchestrator.run()) is True
+    assert orchestrator.state == "secured"
+    assert list(orchestrator.durations) == ["initial_load", "armed", "refresh_window", "purchase"]
+    assert bot.secured and not bot.stop_requested.is_set()
+
+
+def cancel_during_purchase(orchestrator):
+    async def scenario():
+        task = asyncio.create_task(orchestrator.run())
+        while orchestrator.state != "purchase":
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        task.cancel() # What asyncio.run() does to the main task on Ctrl+C
+        await task
+    asyncio.run(scenario())
+
+
+def test_external_cancellation_propagates_and_stops_the_driver_thread():
+    bot = FakeBot(loop_seconds=10.0)
+    orchestrator = AcquisitionOrchestrator(bot)
+    with pytest.raises(asyncio.CancelledError):
+        cancel_during_purchase(orchestrator)
+    assert bot.stop_requested.is_set()
+    assert not bot.closed.is_set() # The loop left within INTERRUPT_STOP_GRACE: the browser stays open
+    assert orchestrator._driver_call.done()
+    assert orchestrator.failure == "interrupted"
+    assert orchestrator.state == "failed"
+
+
+def test_external_cancellation_closes_a_driver_thread_that_does_not_stop(monkeypatch):
+    monkeypatch.setattr(cft, "INTERRUPT_STOP_GRACE", 0.1)
+    bot = FakeBot(loop_seconds=10.0, honour_stop=False)
+    orchestrator = AcquisitionOrchestrator(bot)
+    with pytest.raises(asyncio.CancelledError):
+        cancel_during_purchase(orchestrator)
+    assert bot.closed.is_set()
+    assert orchestrator._driver_call.done()
+
+
+def test_watchdog_abandons_an_overrunning_state(monkeypatch):
+    monkeypatch.setattr(cft, "WATCHDOG_MARGIN", 0.1)
+    bot = FakeBot(loop_seconds=10.0)
+    bot.fast_loop_budget = lambda: 0.1
+    orchestrator = AcquisitionOrchestrator(bot)
+    started = time.monotonic()
+    assert asyncio.run(orchestrator.run()) is False # Not an interrupt: the run just fails
+    assert time.monotonic() - started < 5.0
+    assert orchestrator.failure == "watchdog: 'purchase' exceeded its budget"
+    assert bot.stop_requested.is_set()
+    assert orchestrator._driver_call.done()
+    assert not bot.secured
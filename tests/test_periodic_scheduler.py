@@ -0,0 +1,59 @@
+import time
+
+from ColosseumFastTicket import PeriodicScheduler
+
+
+class SleepWaiter:
+    """Stand-in for DEADLINE_WAITER: plain sleeps, records the deadlines it was asked for."""
+
+    def __init__(self):
+        self.deadlines = []
+
+    def wait_until_ns(self, deadline_ns, label):
+        self.deadlines.append(deadline_ns)
+        remaining = deadline_ns - time.perf_counter_ns()
+        if remaining > 0:
+            time.sleep(remaining / 1e9)
+
+
+def test_ticks_on_absolute_deadlines_until_the_window_ends():
+    start = time.perf_counter_ns()
+    waiter = SleepWaiter()
+    scheduler = PeriodicScheduler(start, 0.01, end_ns=start + 50_000_000, waiter=waiter)
+    indexes = []
+    while (index := scheduler.wait_next()) is not None:
+        indexes.append(index)
+    assert scheduler.max_ticks == 5
+    assert indexes == [0, 1, 2, 3, 4]
+    assert [planned for _, planned, _ in scheduler.ticks] == [start + k * 10_000_000 for k in range(5)]
+    assert all(actual >= planned for _, planned, actual in scheduler.ticks)
+    assert scheduler.skipped == 0
+
+
+def test_overrun_skips_missed_ticks_instead_of_bursting():
+    start = time.perf_counter_ns()
+    scheduler = PeriodicScheduler(start, 0.01, waiter=SleepWaiter())
+    assert scheduler.wait_next() == 0
+    time.sleep(0.035) # Work spanning at least three whole intervals
+    index = scheduler.wait_next()
+    assert index >= 3
+    assert scheduler.skipped == index - 1 # Only the tick that is due now fires
+    assert len(scheduler.ticks) == 2
+
+
+def test_due_tick_fires_without_waiting():
+    waiter = SleepWaiter()
+    scheduler = PeriodicScheduler(time.perf_counter_ns() - 5_000_000, 0.01, waiter=waiter)
+    assert scheduler.wait_next() == 0
+    assert waiter.deadlines == []
+
+
+def test_window_already_over():
+    start = time.perf_counter_ns() - 100_000_000
+    scheduler = PeriodicScheduler(start, 0.01, end_ns=start + 50_000_000, waiter=SleepWaiter())
+    assert scheduler.wait_next() is None
+    assert scheduler.summary() == "tick: no ticks"
+
+
+def test_open_ended_schedule_has_no_tick_bound():
+    assert PeriodicScheduler(0, 0.05).max_ticks is None
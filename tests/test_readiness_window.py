@@ -0,0 +1,52 @@
+import pytest
+
+import ColosseumFastTicket as cft
+from ColosseumFastTicket import nearest_rank, readiness_window
+
+
+@pytest.fixture(autouse=True)
+def readiness_constants(monkeypatch):
+    """Pins the tunables so the expected values below do not move with the shipped defaults."""
+    for name, value in {"MICRO_REFRESH_DURATION_BEFORE": 0.5, "MICRO_REFRESH_DURATION_AFTER": 0.7,
+                        "READINESS_MARGIN": 0.2, "READINESS_AFTER_RELOADS": 8, "READINESS_ARM_COMMANDS": 5,
+                        "READINESS_BEFORE_LIMITS": (0.3, 3.0), "READINESS_AFTER_LIMITS": (0.7, 10.0),
+                        "READINESS_LEAD_LIMITS": (0.5, 10.0)}.items():
+        monkeypatch.setattr(cft, name, value)
+
+
+def window(lead, before, after):
+    return {"MICRO_REFRESH_LEAD_TIME_SECONDS": lead, "MICRO_REFRESH_DURATION_BEFORE": before,
+            "MICRO_REFRESH_DURATION_AFTER": after}
+
+
+@pytest.mark.parametrize("values, fraction, expected", [
+    ([5, 1, 3, 2, 4], 0.5, 3),
+    ([5, 1, 3, 2, 4], 0.9, 5),
+    ([5, 1, 3, 2, 4], 0.0, 1),
+    ([7], 0.9, 7),
+])
+def test_nearest_rank(values, fraction, expected):
+    assert nearest_rank(values, fraction) == expected
+
+
+def test_without_page_samples_the_configured_window_is_kept():
+    # lead = before 0.5 + margin 0.2 + 5 commands of 10ms
+    assert readiness_window([10.0] * 5, [], []) == window(0.75, 0.5, 0.7)
+
+
+def test_window_from_measured_latencies():
+    result = readiness_window([10.0] * 10, [100.0] * 10, [400.0] * 10, clock_uncertainty=0.05)
+    # before = p90 TTFB 0.1 + uncertainty 0.05 + margin 0.2; after = 8 * (p90 reload 0.4 + p90 command 0.01)
+    assert result == window(0.6, 0.35, 3.28)
+
+
+def test_p90_ignores_a_single_slow_sample():
+    ttfb = [100.0] * 9 + [2000.0]
+    assert readiness_window([10.0] * 10, ttfb, [400.0] * 10) == readiness_window([10.0] * 10, [100.0] * 10, [400.0] * 10)
+
+
+def test_values_are_clamped_to_their_limits():
+    assert readiness_window([1.0], [1.0], [1.0]) == window(0.505, 0.3, 0.7) # lead = 0.3 + 0.2 + 5 * 0.001
+    slow = readiness_window([500.0], [9000.0], [9000.0], clock_uncertainty=1.0)
+    assert slow == window(5.7, 3.0, 10.0) # lead = 3.0 + 0.2 + 5 * 0.5
+
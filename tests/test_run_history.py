@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+import ColosseumFastTicket as cft
+import run_history
+from ColosseumFastTicket import RunHistoryStore, config_snapshot
+
+
+def test_config_snapshot_holds_plain_constants_only():
+    snapshot = config_snapshot()
+    assert snapshot["TARGET_DATE"] == cft.TARGET_DATE
+    assert snapshot["SLOT_PREFERENCES"] == cft.SLOT_PREFERENCES
+    assert "LOG_QUEUE" not in snapshot # A queue, not a constant
+    assert not any(name.endswith(("_JS", "_FN")) for name in snapshot) # In-page scripts are left out
+    assert all(name.isupper() and not name.startswith("_") for name in snapshot)
+    json.dumps(snapshot) # Stored as JSON
+
+
+def make_run(label=None, config=None, **columns):
+    run = {"started_at": "2025-10-15T07:00:00", "finished_at": "2025-10-15T07:00:05", "label": label,
+           "outcome": "secured", "success": 1, "attempts": 1, "refresh_count": 3, "refresh_mode": "interval",
+           "site_language": "english", "config": config or {"MICRO_REFRESH_INTERVAL": 0.1}}
+    run.update(columns)
+    return run
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = RunHistoryStore(str(tmp_path / "history.sqlite"))
+    yield store
+    store.close()
+
+
+def test_store_round_trip(store):
+    run_id = store.record_run(make_run(extra={"clock_resync_ms": [12.5]}),
+                              {"release->container": 310.0, "startup:driver": 900.0, "span:skipped": None},
+                              {"fast_loop": [40.0, 55.5]})
+    [row] = store.runs()
+    assert row["id"] == run_id
+    assert row["config"] == {"MICRO_REFRESH_INTERVAL": 0.1}
+    assert row["extra"] == {"clock_resync_ms": [12.5]}
+    assert store.phases([run_id]) == {run_id: {"release->container": 310.0, "startup:driver": 900.0}} # None not stored
+    assert store.jitter([run_id]) == {run_id: {"fast_loop": [40.0, 55.5]}}
+    assert store.phases([]) == {}
+
+
+def test_runs_filters_by_label_and_keeps_the_newest(store):
+    ids = [store.record_run(make_run(label=label), {}, {}) for label in (None, "benchmark", None, None, "benchmark")]
+    assert [r["id"] for r in store.runs()] == ids
+    assert [r["id"] for r in store.runs(live_only=True)] == [ids[0], ids[2], ids[3]]
+    assert [r["id"] for r in store.runs(label="benchmark")] == [ids[1], ids[4]]
+    assert [r["id"] for r in store.runs(limit=2, live_only=True)] == [ids[2], ids[3]] # Newest two, oldest first
+
+
+def test_config_changes_lists_differences_but_ignored_constants():
+    previous = {"MICRO_REFRESH_INTERVAL": 0.1, "TARGET_DATE": "2025-10-15", "STATE_WAITS": True, "OLD": 1}
+    current = {"MICRO_REFRESH_INTERVAL": 0.08, "TARGET_DATE": "2025-10-16", "STATE_WAITS": True, "NEW": [1, 2]}
+    assert run_history.config_changes(previous, current) == [
+        "MICRO_REFRESH_INTERVAL: 0.1 -> 0.08",
+        "NEW: null -> [1, 2]",
+        "OLD: 1 -> null",
+    ]
+    assert run_history.config_changes(current, current) == []
+
+
+def test_run_over_run_compares_the_latest_run():
+    runs = [{"id": 1}, {"id": 2}, {"id": 3}, {"id": 4}]
+    phases = {1: {"release->container": 300.0, "span:slot->qty": 50.0},
+              2: {"release->container": 340.0},
+              3: {"release->container": 320.0, "span:slot->qty": 70.0},
+              4: {"release->container": 310.0, "span:slot->qty": 40.0, "wait:continue": 12.0}}
+    rows = {row["phase"]: row for row in run_history.run_over_run(runs, phases)}
+    assert list(rows) == ["release->container", "span:slot->qty", "wait:continue"] # PHASE_GROUPS order
+    assert rows["release->container"] == {"phase": "release->container", "latest": 310.0, "previous": 320.0,
+                                          "vs_previous": -10.0, "median_earlier": 320.0, "vs_median": -10.0}
+    assert rows["span:slot->qty"]["median_earlier"] == 60.0 # Runs without the phase are left out
+    assert rows["wait:continue"]["previous"] is None and rows["wait:continue"]["vs_median"] is None
+
+
+def test_run_over_run_needs_two_runs():
+    assert run_history.run_over_run([{"id": 1}], {1: {"release->container": 300.0}}) == []
@@ -0,0 +1,51 @@
+import pytest
+
+import ColosseumFastTicket as cft
+from ColosseumFastTicket import SlotPreference, build_slot_preferences
+
+
+def test_empty_list_falls_back_to_the_default_slot():
+    assert build_slot_preferences([], "english", "09:00 AM") == [
+        SlotPreference("ENGLISH", "09:00 AM", cft.FULL_PRICE_TICKETS, cft.REDUCED_PRICE_TICKETS)]
+
+
+def test_entries_keep_their_rank_and_ticket_overrides():
+    preferences = build_slot_preferences([
+        {"language": "english", "time": "9:00 AM"},
+        {"language": "ITALIAN", "time": " 9:30 AM ", "full_price": 2, "reduced_fare": 0},
+    ], "ENGLISH", "09:00 AM")
+    assert preferences == [
+        SlotPreference("ENGLISH", "9:00 AM", cft.FULL_PRICE_TICKETS, cft.REDUCED_PRICE_TICKETS),
+        SlotPreference("ITALIAN", "9:30 AM", 2, 0),
+    ]
+
+
+def test_language_defaults_to_the_preferred_one():
+    [preference] = build_slot_preferences([{"time": "10:00 AM"}], "french", "09:00 AM")
+    assert preference.language == "FRENCH"
+
+
+@pytest.mark.parametrize("entry", [
+    {"language": "GERMAN", "time": "9:00 AM"}, # Unknown language
+    {"language": "ENGLISH", "time": "  "}, # No time
+    {"language": "ENGLISH", "time": "9:00 AM", "full_price": 0, "reduced_fare": 0}, # No tickets
+    {"language": "ENGLISH", "time": "9:00 AM", "full_price": -1, "reduced_fare": 2},
+])
+def test_unusable_entries_are_skipped(entry):
+    good = {"language": "ENGLISH", "time": "9:30 AM"}
+    assert [p.time for p in build_slot_preferences([entry, good], "ENGLISH", "09:00 AM")] == ["9:30 AM"]
+
+
+def test_no_usable_entry_raises():
+    with pytest.raises(ValueError, match="No usable slot preference"):
+        build_slot_preferences([{"language": "GERMAN", "time": "9:00 AM"}], "ENGLISH", "09:00 AM")
+
+
+@pytest.mark.parametrize("entry, message", [
+    ("ENGLISH 9:00 AM", "must be a dict"),
+    ({"language": "ENGLISH", "time": "9:00 AM", "full_price": "two"}, "whole numbers"),
+    ({"language": "ENGLISH", "time": "9:00 AM", "reduced_fare": None}, "whole numbers"),
+])
+def test_malformed_entries_raise(entry, message):
+    with pytest.raises(ValueError, match=message):
+        build_slot_preferences([entry], "ENGLISH", "09:00 AM")
@@ -0,0 +1,183 @@
+import math
+import json
+import logging
+import argparse
+from datetime import datetime
+
+import ColosseumFastTicket as cft
+from benchmark_check_for_tickets import run_once, percentile
+
+
+# --- Timing-parameter tuner against the offline mock server ---
+# Repeats the full check_for_tickets cycle against MockTicketServer with injected latency and
+# searches the timing constants one at a time (coordinate descent, largest to smallest value):
+# a smaller value is kept while it still succeeds in at least --target of --runs and its p50
+# time (see DETECTION_PARAMETERS) is not worse than the lowest p50 kept so far by more than
+# --tolerance-ms (noise; a too small delay shows up as fast-loop retries). Comparing against the
+# lowest rather than the last kept value keeps the tolerance from adding up over accepted steps.
+# Writes a JSON profile (TIMING_PROFILE_FILE) and a report.
+
+# Milestone span each constant is judged on: detection for the refresh interval, container-to-cart
+# for the rest (keeps the release-phase noise of the refresh window out of their comparison)
+DETECTION_PARAMETERS = ("MICRO_REFRESH_INTERVAL",)
+
+# Candidate values per constant (seconds), tried from the largest below the current value down
+SEARCH_GRID = {
+    "DELAY_AFTER_CONTINUE": [1.0, 0.5, 0.25, 0.1],
+    "DELAY_AFTER_SLOT_CLICK": [0.1, 0.05, 0.03, 0.02, 0.01, 0.0],
+    "DELAY_BETWEEN_PLUS_CLICKS": [0.05, 0.03, 0.02, 0.01, 0.0],
+    "DELAY_BETWEEN_QTY_SET": [0.05, 0.02, 0.01, 0.0],
+    "DELAY_AFTER_QTY_SET": [0.1, 0.05, 0.03, 0.02, 0.01, 0.0],
+    "FAST_CHECK_INTERVAL": [0.1, 0.075, 0.05, 0.03, 0.02, 0.01],
+    "FAST_LOOP_WAIT_TIMEOUT": [1.0, 0.75, 0.5, 0.3, 0.2],
+    "MICRO_REFRESH_INTERVAL": [0.15, 0.1, 0.075, 0.05, 0.03],
+}
+
+
+def current_parameters(names):
+    return {name: getattr(cft, name) for name in names}
+
+
+def evaluate(driver, params, args, required):
+    """Runs up to args.runs cycles with `params` applied; stops early once `required` successes are out of reach."""
+    for name, value in params.items():
+        setattr(cft, name, value)
+    latencies, detections, purchases, attempts, failures = [], [], [], [], 0
+    for _ in range(args.runs):
+        result = run_once(driver, args)
+        if result["success"] and result["cart_reached"] is not None and result["container_detected"] is not None:
+            latencies.append(result["cart_reached"])
+            detections.append(result["container_detected"])
+            purchases.append(result["cart_reached"] - result["container_detected"])
+            attempts.append(result["attempts"])
+        else:
+            failures += 1
+            if args.runs - failures < required:
+                break
+    return {"params": dict(params), "successes": len(latencies), "runs": len(latencies) + failures,
+            "reliable": len(latencies) >= required, "attempts": sum(attempts) / len(attempts) if attempts else None,
+            "p50": percentile(latencies, 50), "p90": percentile(latencies, 90),
+            "detect_p50": percentile(detections, 50), "purchase_p50": percentile(purchases, 50)}
+
+
+def describe(params):
+    return ", ".join(f"{name}={value * 1000:.0f}ms" for name, value in params.items())
+
+
+def tune(driver, args):
+    """Coordinate descent over SEARCH_GRID. Returns (best params, baseline trial, list of all trials)."""
+    # With STATE_WAITS the post-action delays are not slept: tuning them would only measure noise
+    skipped = cft.STATE_WAIT_DELAYS if cft.STATE_WAITS else ()
+    names = [name for name in SEARCH_GRID if (not args.only or name in args.only) and name not in skipped]
+    required = math.ceil(args.target * args.runs)
+    best = current_parameters(names)
+    baseline = evaluate(driver, best, args, required)
+    trials = [dict(baseline, parameter="(baseline)", accepted=baseline["reliable"])]
+    logging.warning(f"Baseline: {baseline['successes']}/{baseline['runs']} ok, p50 {format_ms(baseline['p50'])}ms ({describe(best)})")
+    if not baseline["reliable"]:
+        logging.error("The current constants are not reliable against the mock: fix them (or the mock) before tuning.")
+        return best, baseline, trials
+    lowest = {metric: baseline[metric] for metric in ("detect_p50", "purchase_p50")}
+
+    for name in names:
+        metric = "detect_p50" if name in DETECTION_PARAMETERS else "purchase_p50"
+        for value in [v for v in SEARCH_GRID[name] if v < best[name]]:
+            candidate = dict(best, **{name: value})
+            trial = evaluate(driver, candidate, args, required)
+            accepted = trial["reliable"] and trial[metric] <= lowest[metric] + args.tolerance_ms
+            trials.append(dict(trial, parameter=name, accepted=accepted))
+            logging.warning(f"{name}={value * 1000:.0f}ms: {trial['successes']}/{trial['runs']} ok, {metric} "
+                            f"{format_ms(trial[metric])}ms (lowest {format_ms(lowest[metric])}ms) -> {'kept' if accepted else 'rejected'}")
+            if not accepted:
+                break # Smaller values only get less reliable
+            best = candidate
+            for kept in lowest:
+                lowest[kept] = min(lowest[kept], trial[kept])
+    for name, value in best.items():
+        setattr(cft, name, value)
+    return best, baseline, trials
+
+
+def format_ms(value):
+    return f"{value:.1f}" if value is not None else "-"
+
+
+def write_report(path, args, baseline, final, trials):
+    lines = [
+        f"# Timing tuning report ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')})",
+        "",
+        f"Mock latency {args.latency * 1000:.0f}ms + jitter {args.jitter * 1000:.0f}ms, {args.runs} runs per setting, "
+        f"reliability target {args.target:.0%}, tolerance {args.tolerance_ms:.0f}ms.",
+        "",
+        "| parameter | value (ms) | ok / runs | p50 cart (ms) | p90 cart (ms) | p50 detect (ms) | p50 purchase (ms) | fast-loop attempts | kept |",
+        "|---|---|---|---|---|---|---|---|---|",
+    ]
+    for trial in trials:
+        value = trial["params"].get(trial["parameter"])
+        shown = f"{value * 1000:.0f}" if value is not None else "-"
+        lines.append(f"| {trial['parameter']} | {shown} | {trial['successes']}/{trial['runs']} | {format_ms(trial['p50'])} | "
+                     f"{format_ms(trial['p90'])} | {format_ms(trial['detect_p50'])} | {format_ms(trial['purchase_p50'])} | "
+                     f"{format_ms(trial['attempts'])} | {'yes' if trial['accepted'] else 'no'} |")
+    lines += [
+        "",
+        "| | ok / runs | p50 cart (ms) | p90 cart (ms) |",
+        "|---|---|---|---|",
+        f"| baseline | {baseline['successes']}/{baseline['runs']} | {format_ms(baseline['p50'])} | {format_ms(baseline['p90'])} |",
+        f"| tuned (confirmation) | {final['successes']}/{final['runs']} | {format_ms(final['p50'])} | {format_ms(final['p90'])} |",
+        "",
+        "| parameter | baseline (ms) | tuned (ms) |",
+        "|---|---|---|",
+    ]
+    lines += [f"| {name} | {baseline['params'][name] * 1000:.0f} | {value * 1000:.0f} |" for name, value in final["params"].items()]
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write("\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search the fastest reliable timing constants against the offline mock server.")
+    parser.add_argument("--runs", type=int, default=20, help="check_for_tickets cycles per candidate setting")
+    parser.add_argument("--target", type=float, default=0.99, help="Required success ratio per setting")
+    parser.add_argument("--tolerance-ms", type=float, default=10.0, help="A smaller value may be this much slower (p50) and still be kept")
+    parser.add_argument("--latency", type=float, default=0.03, help="Mock server latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Additional random mock latency in seconds")
+    parser.add_argument("--lead", type=float, default=2.5, help="Seconds between cycle start and slot release")
+    parser.add_argument("--language", choices=["english", "italian"], default="english")
+    parser.add_argument("--only", action="append", choices=sorted(SEARCH_GRID), help="Tune only this constant (repeatable)")
+    parser.add_argument("--profile", default="timing_profile.json", help="Output profile (load it with TIMING_PROFILE_FILE)")
+    parser.add_argument("--report", default="timing_profile_report.md")
+    parser.add_argument("--fixed-delays", action="store_true", help="Tune the DELAY_* sleeps (STATE_WAITS off) as well")
+    parser.add_argument("--headed", action="store_true", help="Show the browser window")
+    parser.add_argument("--verbose", action="store_true", help="Keep the bot's INFO logging")
+    args = parser.parse_args()
+    args.port, args.probe_fragment, args.page_assets, args.orchestrator, args.history = 0, False, False, False, None # run_once() settings
+
+    cft.BROWSER_HEADLESS = not args.headed
+    cft.STATE_WAITS = not args.fixed_delays
+    cft.READINESS_CHECK_ENABLED = False # It would rewrite the refresh window between trials
+    if cft.TIMING_PROFILE_FILE:
+        cft.load_timing_profile(cft.TIMING_PROFILE_FILE) # Continue from an earlier profile
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+    setup_bot = cft.ColosseumTicketBot()
+    setup_bot.setup_driver()
+    try:
+        best, baseline, trials = tune(setup_bot.driver, args)
+        final = evaluate(setup_bot.driver, best, args, math.ceil(args.target * args.runs)) if baseline["reliable"] else baseline
+    finally:
+        setup_bot.close()
+
+    write_report(args.report, args, baseline, dict(final, params=best), trials)
+    cft.flush_logs()
+    if not final["reliable"]:
+        raise SystemExit(f"No reliable setting found (report: {args.report}); profile not written.")
+    profile = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "conditions": {"latency": args.latency, "jitter": args.jitter, "runs": args.runs, "target": args.target},
+        "result": {"successes": final["successes"], "runs": final["runs"], "p50_ms": final["p50"], "p90_ms": final["p90"]},
+        "parameters": best,
+    }
+    with open(args.profile, "w", encoding="utf-8") as fh:
+        json.dump(profile, fh, indent=2)
+    print(f"Profile written to {args.profile} ({describe(best)})")
+    print(f"Report written to {args.report}: baseline p50 {format_ms(baseline['p50'])}ms -> tuned p50 {format_ms(final['p50'])}ms "
+          f"({final['successes']}/{final['runs']} ok)")